@@ -1,8 +1,9 @@
-from typing import Any
+from typing import Any, Iterator, NamedTuple, Optional
 from pathlib import Path
-from shutil import copy, which
+from shutil import which
 from argparse import ArgumentParser, Namespace
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
 
 from pydantic_yaml import YamlModel as BaseModel
@@ -12,6 +13,7 @@ import json
 
 import subprocess
 from subprocess import run as subprocess_run
+import functools
 import glob
 import itertools
 import random
@@ -31,6 +33,10 @@ random.seed(1919)
 TIMEOUT_TIGRESS = timedelta(minutes=1).total_seconds()
 TIMEOUT_C_OBFUS = timedelta(seconds=10).total_seconds()
 
+# appended to finished outputs, so existing outputs can be recognized (and skipped) when rerunning
+VARIANT_HEADER = "// variants: "
+EXPANDED_VARIANT_HEADER = "// expanded variants: "
+
 class ObfuscationDirectoryStatistics(BaseModel):
     obfuscation_count: dict[str, int] = Field(default_factory=dict)
     failed_obfuscation_count: dict[str, int] = Field(default_factory=lambda: defaultdict(int))
@@ -56,6 +62,25 @@ class TigressObfuscationVariant:
             self.args[k] = _format_str(v)
 
 
+class ObfuscationTask(NamedTuple):
+    """Obfuscation of one source file into one output file (run independently of other tasks)."""
+    src_in: Path
+    src_out: Path
+    variants: list[ObfuscationVariant] # candidates, one is chosen at random per attempt
+    expanded_variant: Optional[ObfuscationVariant] # expanded variant to use (None chooses one of its expansions at random)
+    num_retry: int
+    validate: bool # whether outputs must compile
+    seed: int
+
+
+class ObfuscationResult(NamedTuple):
+    src_out: Path
+    variant: Optional[ObfuscationVariant] # None if obfuscation failed
+    expanded_variant: Optional[ObfuscationVariant]
+    failed_variants: list[ObfuscationVariant] # variants of failed attempts
+    skipped: bool # output existed already
+
+
 class TigressSpec(BaseModel):
     global_options: list[str]
     global_params: dict[str, str]
@@ -103,6 +128,9 @@ def get_args() -> Namespace:
     parser.add_argument(
         "--output", "-o", help="Path to output directory", required=True
     )
+    parser.add_argument(
+        "--workers", "-j", help="Number of files obfuscated in parallel", type=int, default=1
+    )
     parser.add_argument("input", help="Path to input directory", nargs="+")
     return parser.parse_args()
 
@@ -151,14 +179,16 @@ def obfuscate_file(
             if out:
                 print(out)
         else:
-            # builtin obfuscation
+            # builtin obfuscations (comma-separated ones are applied in turn on one AST)
             args = Namespace()
-            args.obfuscations = [var_op]
+            args.obfuscations = var_op.split(",")
             args.output_path = out_src
             args.prog_path = in_src
-            p = multiprocessing.Process(target=obf_main, args=(args, False))
+            # (forked processes reseed random, so the seed is passed as tigress --Seed is)
+            args.seed = random.randint(0, 2 ** 32)
+            p = multiprocessing.Process(target=obf_main, args=(args, True))
             p.start()
-            p.join(TIMEOUT_C_OBFUS)
+            p.join(TIMEOUT_C_OBFUS * len(args.obfuscations))
             if p.is_alive():
                 print(f"Timeout while obfuscating {in_src} with {var_op}")
                 p.kill()
@@ -180,58 +210,162 @@ def expand_variant(
     return list(itertools.product(*variants_per_step))
 
 
+def read_variant_header(src_path: Path) -> Optional[tuple[ObfuscationVariant, ObfuscationVariant]]:
+    """Returns the variant and expanded variant a finished output was obfuscated with (None if unfinished)."""
+    try:
+        lines = src_path.read_text().splitlines()[-2:]
+    except FileNotFoundError:
+        return None
+    if len(lines) != 2 or not lines[0].startswith(VARIANT_HEADER) or not lines[1].startswith(EXPANDED_VARIANT_HEADER):
+        return None
+    return (
+        tuple(lines[0][len(VARIANT_HEADER):].split(", ")),
+        tuple(lines[1][len(EXPANDED_VARIANT_HEADER):].split(", ")),
+    )
+
+
+def write_variant_header(src_path: Path, variant: ObfuscationVariant, expanded_variant: ObfuscationVariant) -> None:
+    with src_path.open("a") as f:
+        f.write(f"\n{VARIANT_HEADER}{', '.join(variant)}\n")
+        f.write(f"{EXPANDED_VARIANT_HEADER}{', '.join(expanded_variant)}\n")
+
+
+def pipeline_stages(expanded_variant: ObfuscationVariant) -> list[str]:
+    """Groups consecutive builtin steps into one stage (run without writing and parsing C in between)."""
+    stages = []
+    for step in expanded_variant:
+        if ":" not in step and stages and ":" not in stages[-1]:
+            stages[-1] += f",{step}"
+        else:
+            stages.append(step)
+    return stages
+
+
+def obfuscate_steps(
+    src_in: Path,
+    src_out: Path,
+    expanded_variant: ObfuscationVariant,
+    tigress_options: dict[str, dict[str, list[str]]],
+) -> bool:
+    stages = pipeline_stages(expanded_variant)
+    src_out_in = src_out.with_suffix(".in.c")
+    stage_in = src_in
+    try:
+        for i, stage in enumerate(stages):
+            # stages alternate between the two files, so the last one writes src_out
+            stage_out = src_out if (len(stages) - i) % 2 == 1 else src_out_in
+            stage_out.unlink(missing_ok=True)
+            if not obfuscate_file(stage_in, stage_out, stage, tigress_options) or not stage_out.exists():
+                src_out.unlink(missing_ok=True)
+                return False
+            stage_in = stage_out
+        return True
+    finally:
+        src_out_in.unlink(missing_ok=True)
+
+
+def run_obfuscation_task(
+    task: ObfuscationTask, tigress_options: dict[str, dict[str, list[str]]]
+) -> ObfuscationResult:
+    existing = read_variant_header(task.src_out)
+    if existing is not None:
+        variant, expanded_variant = existing
+        if variant in task.variants and (
+            expanded_variant == task.expanded_variant
+            if task.expanded_variant is not None
+            else expanded_variant in expand_variant(variant, tigress_options)
+        ):
+            return ObfuscationResult(task.src_out, variant, expanded_variant, [], True)
+
+    # seeded per task, so outputs do not depend on the order (or process) tasks are run in
+    random_state = random.getstate()
+    random.seed(task.seed)
+    try:
+        failed_variants = []
+        for _ in range(task.num_retry):
+            variant = random.choice(task.variants)
+            expanded_variant = task.expanded_variant or random.choice(expand_variant(variant, tigress_options))
+
+            if not obfuscate_steps(task.src_in, task.src_out, expanded_variant, tigress_options):
+                failed_variants.append(variant)
+            format_c_source(task.src_out)
+
+            if task.src_out.exists() and (not task.validate or validate_source(task.src_out)):
+                write_variant_header(task.src_out, variant, expanded_variant)
+                return ObfuscationResult(task.src_out, variant, expanded_variant, failed_variants, False)
+            task.src_out.unlink(missing_ok=True)
+
+        return ObfuscationResult(task.src_out, None, None, failed_variants, False)
+    finally:
+        random.setstate(random_state)
+
+
+def run_obfuscation_tasks(
+    tasks: list[ObfuscationTask], tigress_options: dict[str, dict[str, list[str]]], workers: int = 1
+) -> Iterator[ObfuscationResult]:
+    """Runs tasks on the given number of worker processes, yielding their results in order."""
+    run_task = functools.partial(run_obfuscation_task, tigress_options=tigress_options)
+    if workers <= 1:
+        yield from map(run_task, tasks)
+        return
+    # (unlike multiprocessing.Pool, its workers may start processes for builtin obfuscations)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(run_task, tasks)
+
+
+def _report(p: Path, results: list[ObfuscationResult]) -> None:
+    num_failed = sum(result.variant is None for result in results)
+    num_skipped = sum(result.skipped for result in results)
+    print(f"Obfuscated {len(results) - num_failed - num_skipped} files of {p} "
+          f"({num_skipped} existing outputs skipped, {num_failed} failed)")
+
+
 def obfuscate_directory_with_sampling(
     p: Path,
     output: Path,
     variants: list[tuple[str, ...]],
     tigress_options,
     sample_size: int,
+    workers: int = 1,
 ) -> ObfuscationDirectoryStatistics:
     output_path = output / p.name
     output_path.mkdir(parents=True, exist_ok=True)
 
+    tasks = [
+        ObfuscationTask(
+            Path(src_in),
+            output_path / f"{Path(src_in).stem}-{idx:03d}.c",
+            variants,
+            None,
+            num_retry=10,
+            validate=True,
+            seed=random.getrandbits(32),
+        )
+        for idx in range(sample_size)
+        for src_in in sorted(glob.glob(str(p / "*.c")))
+    ]
+
+    # aggregated here (in task order), not by the workers
     stats = ObfuscationDirectoryStatistics()
     for v in variants:
         stats.obfuscation_count[str(v)] = 0
 
-    for idx in range(sample_size):
-        for src_in in glob.glob(str(p / "*.c")):
-            src_out = output_path / f"{Path(src_in).stem}-{idx:03d}.c"
-            src_out_in = src_out.with_suffix(".in.c")
-
-            num_retry = 10
-            while num_retry > 0:
-                num_retry -= 1
-                copy(src_in, src_out_in)
-                variant = random.choice(variants)
-                expanded_variant = random.choice(expand_variant(variant, tigress_options))
-
-                for step in expanded_variant:
-                    if not obfuscate_file(src_out_in, src_out, step, tigress_options) or not src_out.exists():
-                        src_out.unlink(missing_ok=True)
-                        stats.failed_obfuscation_count[str(variant)] += 1
-                        break
-                    copy(src_out, src_out_in)
-
-                format_c_source(src_out)
-                src_out_in.unlink()
-
-                if src_out.exists() and validate_source(src_out):
-                    num_retry = -1
-                
-                    stats.obfuscation_count[str(variant)] += 1
-                    for v in expanded_variant:
-                        if ":" not in v:
-                            continue
-                        var, sub_var = v.split(":")
-                        stats.obfuscation_variant_count[var][sub_var] += 1
-                    stats.detailed_config[src_out.name] = expanded_variant
-                    with src_out.open("a") as f:
-                        f.write(f"\n// variants: {', '.join(variant)}\n")
-                        f.write(f"// expanded variants: {', '.join(expanded_variant)}\n")
-            
-            if num_retry != -1:
-                stats.failed_files.append(src_out.name)
+    results = list(run_obfuscation_tasks(tasks, tigress_options, workers))
+    for result in results:
+        for variant in result.failed_variants:
+            stats.failed_obfuscation_count[str(variant)] += 1
+        if result.variant is None:
+            stats.failed_files.append(result.src_out.name)
+            continue
+
+        stats.obfuscation_count[str(result.variant)] += 1
+        for v in result.expanded_variant:
+            if ":" not in v:
+                continue
+            var, sub_var = v.split(":")
+            stats.obfuscation_variant_count[var][sub_var] += 1
+        stats.detailed_config[result.src_out.name] = result.expanded_variant
+    _report(p, results)
 
     with (output_path / "stats.json").open("w") as f:
         json.dump(stats.dict(), f, indent=2)
@@ -254,11 +388,12 @@ def validate_source(src_path: Path) -> bool:
         return False
 
 def obfuscate_directory(
-    p: Path, output: Path, variants: list[tuple[str, ...]], tigress_options, repeat=1
+    p: Path, output: Path, variants: list[tuple[str, ...]], tigress_options, repeat=1, workers=1
 ) -> None:
     output_path = output / p.name
     output_path.mkdir(parents=True, exist_ok=True)
 
+    tasks = []
     for idx, variant in enumerate(variants):
         expanded_variants = expand_variant(variant, tigress_options)
         for sub_idx, expanded_variant in enumerate(expanded_variants):
@@ -269,20 +404,22 @@ def obfuscate_directory(
                 f.write("\n".join(expanded_variant))
 
             for _ in range(repeat):
-                for src_in in glob.glob(str(p / "*.c")):
+                for src_in in sorted(glob.glob(str(p / "*.c"))):
                     if _ == 0:
                         src_out = output_variant_dir_path / Path(src_in).name
                     else:
                         src_out = output_variant_dir_path / f"{Path(src_in).stem}_{_}{Path(src_in).suffix}"
-                    src_out_in = src_out.with_suffix(".in.c")
-                    copy(src_in, src_out_in)
-                    for step in expanded_variant:
-                        if not obfuscate_file(src_out_in, src_out, step, tigress_options):
-                            src_out.unlink(missing_ok=True)
-                            break
-                        copy(src_out, src_out_in)
-                    format_c_source(src_out)
-                    src_out_in.unlink()
+                    tasks.append(ObfuscationTask(
+                        Path(src_in),
+                        src_out,
+                        [variant],
+                        expanded_variant,
+                        num_retry=1,
+                        validate=False,
+                        seed=random.getrandbits(32),
+                    ))
+
+    _report(p, list(run_obfuscation_tasks(tasks, tigress_options, workers)))
 
 
 def format_c_source(src_path: Path) -> None:
@@ -306,7 +443,7 @@ typedef void* __builtin_va_list;"""
         src_lines = src_file.readlines()
 
     with open(src_path, "w") as src_file:
-        src_file.write(HEADERS)
+        src_file.write(HEADERS + "\n")
         src_file.writelines(src_lines)
 
     # preprocess the source file for headers, comments removal etc.
@@ -340,10 +477,11 @@ def main():
                 spec.variants,
                 tigress_options,
                 args.sample,
+                args.workers,
             )
         else:
             obfuscate_directory(
-                Path(p), Path(args.output) / spec.name, spec.variants, tigress_options, args.repeat
+                Path(p), Path(args.output) / spec.name, spec.variants, tigress_options, args.repeat, args.workers
             )
 
 
@@ -61,7 +61,8 @@ class LoopUnrollVisitor(CodeGenVisitor):
         new_body_stmts = []
         for _ in range(self.num_internal_unroll):
             if_body = self.visit(node.stmt)
-            if_body.block_items.append(self.visit(node.next))
+            if node.next is not None:
+                if_body.block_items.append(self.visit(node.next))
             if_stmt = If(self.visit(node.cond), if_body, None)
             new_body_stmts.append(if_stmt)
         new_body = Compound(new_body_stmts)
@@ -77,7 +78,8 @@ class LoopUnrollVisitor(CodeGenVisitor):
                 new_for.init = None
             for _ in range(self.num_pre_unroll):
                 if_body = self.visit(node.stmt)
-                if_body.block_items.append(self.visit(node.next))
+                if node.next is not None:
+                    if_body.block_items.append(self.visit(node.next))
                 if_stmt = If(self.visit(node.cond), if_body, None)
                 new_stmts.append(if_stmt)
             new_stmts.append(new_for)
@@ -1,7 +1,11 @@
-from pycparser import c_ast, parse_file
-import tempfile
+from pycparser import c_ast, c_parser
+import functools
+import shlex
+import subprocess
 from typing import Any
 
+CPP_ARGS = r'-I./resources/fake_libc_include'
+
 HEADERS="""#define __attribute__(x)
 #define __extension__
 #define __restrict
@@ -216,6 +220,35 @@ typedef enum memory_order
   memory_order_seq_cst
 } memory_order;"""
 
+@functools.lru_cache(maxsize=None)
+def _pyc_parser() -> c_parser.CParser:
+    """ Get the pycparser parser used by pyc_parse.
+
+    Creating a parser builds its parsing tables, which takes longer than
+    parsing most programs, so it is created once and reused.
+
+    Returns:
+    parser (c_parser.CParser) -- pycparser parser
+    """
+    return c_parser.CParser()
+
+@functools.lru_cache(maxsize=256)
+def preprocess(prog: str, cpp_args: str = CPP_ARGS) -> str:
+    """ Expand includes and macros of a program with cpp (fed on stdin).
+
+    Outputs are cached by program, as the same programs (e.g., templates and
+    unchanged sources of further obfuscation steps) are parsed repeatedly.
+
+    Arguments:
+    prog (str) -- C program to preprocess
+    cpp_args (str) -- C preprocessor arguments
+
+    Returns:
+    prog (str) -- preprocessed program
+    """
+    return subprocess.run(["cpp", *shlex.split(cpp_args), "-"], input=prog, stdout=subprocess.PIPE,
+                          check=True, encoding="utf-8").stdout
+
 def pyc_parse(prog: str) -> c_ast.Node:
     """ Parse C program to pyc ast.
 
@@ -225,14 +258,7 @@ def pyc_parse(prog: str) -> c_ast.Node:
     Returns:
     ast (c_ast.Node) -- parsed AST
     """
-    tmp = tempfile.NamedTemporaryFile()
-    with open(tmp.name, "w") as f:
-        # header_prog = "{}\n\n{}".format(HEADERS, prog)
-        # print(header_prog)
-        # f.write(header_prog)
-        f.write(prog)
-
-    return parse_file(tmp.name, use_cpp=True, cpp_args=r'-I./resources/fake_libc_include')
+    return _pyc_parser().parse(preprocess(prog))
 
 def pyc_parse_file(file_path: str) -> c_ast.Node:
     """ Parse C program at pathto pyc ast.
@@ -246,4 +272,4 @@ def pyc_parse_file(file_path: str) -> c_ast.Node:
     with open(file_path, "r") as f:
         prog = f.read()
 
-    return pyc_parse(visitor, prog)
+    return pyc_parse(prog)
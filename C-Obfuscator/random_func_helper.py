@@ -3,8 +3,8 @@ from pathlib import Path
 
 from pycparser.c_ast import *
 from pycparser import c_ast
-from parser_tools import pyc_parse
-from pycparser import parse_file, c_generator
+from parser_tools import pyc_parse, pyc_parse_file
+from pycparser import c_generator
 
 from code_gen_visitor import CodeGenVisitor
 from batch_runner import validate_source
@@ -136,7 +136,7 @@ class RandomFuncVisitor(CodeGenVisitor):
 
 
 def process_file(src: Path, dst: Path, visitor_type: str, validate: bool = False):
-    ast = parse_file(src, use_cpp=True, cpp_args=r"-I./resources/fake_libc_include")
+    ast = pyc_parse_file(src)
 
     match visitor_type:
         case "small_program":
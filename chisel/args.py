@@ -29,19 +29,28 @@ def get_cline_args(cli_args=None):
     parser.add_argument("--disable_trace_pruning", help="disables trace pruning", action="store_true")
     parser.add_argument("--disable_syntax_pruning", help="disables syntax pruning", action="store_true")
     parser.add_argument("--disable_analysis_pruning", help="disables analysis pruning", action="store_true")
-    parser.add_argument("--search_model", help="search model, e.g., 'size' for size-based enumeration -- options are {'size', 'random'} (default is 'size')", type=str, default='size')
+    parser.add_argument("--disable_alignment", help="disables solving straight-line holes by aligning their traces", action="store_true")
+    parser.add_argument("--search_model", help="search model, e.g., 'size' for size-based enumeration -- options are {'size', 'random', 'cost'} (default is 'size')", type=str, default='size')
     parser.add_argument("--checker", help="equivalence checker, e.g., 'io' for testing based checking -- options are {'io'} (default is 'io')", type=str, default='io')
-    parser.add_argument("--deobfuscator", help="which deobfuscator to use -- options are {'enum', 'decomp'} (default is 'decomp')", type=str, default="decomp")
+    parser.add_argument("--deobfuscator", help="which deobfuscator to use -- options are {'enum', 'decomp', 'bottomup'} (default is 'decomp')", type=str, default="decomp")
     parser.add_argument("--use_cppyy", help="use cppyy for to compile programs", action="store_true")
+    parser.add_argument("--validate_solution", help="after synthesis, compare outputs of solution and obfuscated program on N generated inputs (default 0, i.e., disabled)", type=int, default=0)
+    parser.add_argument("--validation_workers", help="number of parallel processes used for --validate_solution (default 4)", type=int, default=4)
+    parser.add_argument("--check_solution_io", help="after synthesis, compare outputs of solution and obfuscated program on the trace inputs", action="store_true")
     parser.add_argument("--enable_compile", help="disable precompiling of trace utils", action="store_true")
     parser.add_argument("--disable_precompile", help="disable precompiling of trace utils", action="store_true")
     parser.add_argument("--precompile_type", help="set precompiling language ('c', 'cpp')", type=str, default="c")
     parser.add_argument("--func_name", help="name of function to deobfuscate (default is 'OBF_FUNC')", type=str, default="OBF_FUNC")
     parser.add_argument("--disable_parallel", help="whether to run synthesis in parallel", action="store_true")
     parser.add_argument("--ablation", help="which ablation to run -- options are {'1a', '1b', '2', '3'} (default is None)", type=str, default=None)
-    parser.add_argument("src_path", help="path to program to be deobfuscated", type=Path)
+    parser.add_argument("--from_trace_bundle", "--from-trace-bundle", help="run synthesis on traces from a trace bundle instead of generating them (no gcc/GDB or source needed; default None)", type=Path, default=None)
+    parser.add_argument("--save_trace_bundle", "--save-trace-bundle", help="path to save generated traces to as a trace bundle (default None)", type=Path, default=None)
+    parser.add_argument("--ast_cache_dir", help="directory to cache parsed ASTs of programs in across runs, e.g., .ast_cache (default None, i.e., not cached across runs)", type=Path, default=None)
+    parser.add_argument("src_path", help="path to program to be deobfuscated (optional with --from_trace_bundle)", type=Path, nargs="?", default=None)
 
     args = parser.parse_args(cli_args)
+    if args.src_path is None and args.from_trace_bundle is None:
+        parser.error("the following arguments are required: src_path (or --from_trace_bundle)")
 
     set_global_args(args)
     return args
@@ -56,4 +65,8 @@ def add_config_args(parser: ArgumentParser):
     parser.add_argument("--label_path", help="path to label -- should only be set for debugging! (default None)", type=str, default=None)
     parser.add_argument("--save_results", help="give path to save results to (default None)", type=Path, default=None)
     parser.add_argument("--timeout", help="synthesis timeout in seconds (default 60)", type=int, default=300)
-    parser.add_argument("--max_cand_record", help="maximum number of caniddates to record for statistics during synthesis (default 100)", type=int, default=100)
+    parser.add_argument("--seed", help="random seed for synthesis, for reproducible runs (default None)", type=int, default=None)
+    parser.add_argument("--profile", help="record time spent in each synthesis phase (reported in results)", action="store_true")
+    parser.add_argument("--profile_trace", help="path to write Chrome trace JSON of synthesis phases to (enables profiling; default None)", type=Path, default=None)
+    parser.add_argument("--max_worklist_size", help="maximum number of candidates kept in the synthesis worklist, lowest priority candidates are dropped beyond it (default 0, i.e., unbounded)", type=int, default=0)
+    parser.add_argument("--max_cand_record", help="maximum number of candidates (formatted) to record per category for statistics during synthesis (default 0, i.e., disabled)", type=int, default=0)
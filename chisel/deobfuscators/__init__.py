@@ -1,2 +1,3 @@
 from deobfuscators.decompositional_deobfuscator import DecompositionalDeobfuscator
 from deobfuscators.enumerative_deobfuscator import EnumerativeDeobfuscator
+from deobfuscators.bottom_up_deobfuscator import BottomUpDeobfuscator
@@ -0,0 +1,193 @@
+import logging
+import time
+from typing import *
+
+from analysis import Analysis
+from args import get_cline_args
+from checkers import EquivalenceChecker
+from config import SynthesisConfig
+from deobfuscators.decompositional_deobfuscator import DecompositionalDeobfuscator
+from formatters import Formatter
+from grammar import *
+from langs.c.c_runner import TraceRunnerState
+from program import Node, Program, ValueNode
+from pruners import Pruner
+from runners import TraceIdxNotFoundException, TraceEndException
+from search_models import SearchModel
+from stats import Stats
+from trace import Trace, TraceSource
+from utils import SynthesisTimeoutException, statement_is_return
+from profiling import profiled
+
+
+class BottomUpDeobfuscator(DecompositionalDeobfuscator):
+    """Decompositional deobfuscator which fills statement holes bottom-up.
+
+    Statement sequences are grown one statement at a time and grouped by their effect on the hole's
+    traces (trace index and state reached in each trace), keeping only the first (shortest) sequence
+    of each class.
+    """
+
+    def _execute_stmt(self, runner, trace: Trace, node: ValueNode, state: TraceRunnerState) -> Optional[Tuple[TraceRunnerState, bool]]:
+        """ Executes a single statement on (a copy of) the trace state.
+
+        Arguments:
+        runner (CRunner) -- trace runner
+        trace (Trace) -- trace of hole
+        node (ValueNode) -- statement node
+        state (TraceRunnerState) -- state reached by sequence so far
+
+        Returns:
+        state (TraceRunnerState) -- state after statement
+        done (bool) -- whether statement matched the last item of the trace
+        (None if statement cannot be executed on trace)
+        """
+        state = TraceRunnerState(
+            state=dict(state.state),
+            trace_index=state.trace_index,
+            guard_result=state.guard_result,
+            loop_break=state.loop_break,
+            pruned_variables=set(state.pruned_variables),
+        )
+        try:
+            return runner.execute_node(None, trace, node, state, False), False
+        except TraceEndException:
+            return state, True
+        except TraceIdxNotFoundException:
+            return None
+
+    @staticmethod
+    def _satisfies(traces: List[Trace], effects: Tuple[Tuple[TraceRunnerState, bool], ...]) -> Optional[Tuple[str, ...]]:
+        """ Checks if a sequence with the given effects satisfies all traces (same check as for complete programs).
+
+        Returns:
+        pruned (tuple(str)) -- sorted pruned variables (None if not satisfied)
+        """
+        pruned = set()
+        for trace, (state, done) in zip(traces, effects):
+            if not done and not (
+                all(
+                    trace.items[-1].post_state.get(k) == state.state.get(k)
+                    for k in trace.items[-1].post_state.keys()
+                    if not pruned or k not in pruned
+                )
+                and state.trace_index >= 0
+                and not statement_is_return(trace.items[-1].source.src)
+            ):
+                return None
+            pruned.update(state.pruned_variables)
+        return tuple(sorted(pruned))
+
+    @profiled("bottom_up_hole_synthesis")
+    def deobfuscate(
+        self,
+        src_path: str,
+        search_model: SearchModel,
+        checker: EquivalenceChecker,
+        pruner: Pruner,
+        next_unk: Callable[[Program], Node],
+        analysis: Analysis,
+        formatter: Formatter,
+        start_sym: Nonterminal,
+        traces: List[Trace],
+        inputs: List[Any],
+        decl_vars: Dict[TraceSource, Set[str]],
+        used_vars: Dict[TraceSource, Set[str]],
+        obfus_func_signature: Any,
+        start_time: int,
+        stats: Stats,
+        config: SynthesisConfig,
+        initial_prog: Program | None,
+        return_on_first: bool = False,
+        allow_control_flow: bool = False,
+    ) -> tuple[bool, dict[tuple[str, ...], Program]]:
+        """
+        Deobfuscates a statement hole by enumerating statement sequences bottom-up,
+        keeping one sequence per observationally equivalent class.
+        Falls back to top-down enumeration for holes which are not statement sequences.
+
+        Arguments:
+        (same as `DecompositionalDeobfuscator.deobfuscate`)
+
+        Returns:
+        timeout (bool) -- whether synthesis timed out
+        mvs (tuple(str)) -- set of maximal variables used in traces
+        prog (Program) -- program matching specification (or None if timeout reached)
+        """
+        runner = getattr(pruner, "runner", None)
+        if initial_prog is not None or start_sym != self.grammar.start or runner is None or not traces:
+            return super().deobfuscate(
+                src_path, search_model, checker, pruner, next_unk, analysis, formatter, start_sym, traces, inputs,
+                decl_vars, used_vars, obfus_func_signature, start_time, stats, config, initial_prog,
+                return_on_first=return_on_first, allow_control_flow=allow_control_flow,
+            )
+
+        args = get_cline_args()
+        synthesis_start_time = time.time()
+
+        _, stmts = analysis.get_guards_and_stmts_from_path(src_path, traces)
+        nodes = [
+            ValueNode(None, Production(SOURCE_STMT_NONTERM, SOURCE_STMT_NAME, [src]), src)
+            for src in sorted(set(s.src for s in stmts))
+        ]
+
+        # each entry: (statements, effect on each trace)
+        level = [((), tuple((TraceRunnerState(state=trace.items[0].pre_state.copy(), pruned_variables=set()), False) for trace in traces))]
+        seen = set()
+        max_var_set_map = {}
+        max_len = max(len(trace) for trace in traces) + 1
+
+        for _ in range(max_len):
+            next_level = []
+            for seq, effects in level:
+                for node in nodes:
+                    if time.time() - start_time > args.timeout:
+                        # exit synthesis loop if timeout passed
+                        stats.deobfuscation_time = time.time() - start_time
+                        raise SynthesisTimeoutException()
+
+                    if time.time() - synthesis_start_time > config.synthesis_timeout.total_seconds():
+                        logging.info("Synthesis timeout reached")
+                        return True, max_var_set_map
+
+                    stats.num_iter += 1
+
+                    new_effects = []
+                    for trace, (state, done) in zip(traces, effects):
+                        # NOTE: execution stops once last trace item is matched
+                        effect = (state, True) if done else self._execute_stmt(runner, trace, node, state)
+                        if effect is None:
+                            break
+                        new_effects.append(effect)
+
+                    if len(new_effects) < len(traces):
+                        # statement does not match some trace
+                        stats.num_pruned += 1
+                        continue
+
+                    signature = tuple(
+                        (done, state.trace_index, state.loop_break, frozenset(state.state.items()), frozenset(state.pruned_variables))
+                        for state, done in new_effects
+                    )
+                    if signature in seen:
+                        # observationally equivalent to a sequence already enumerated
+                        stats.num_equivalent_pruned += 1
+                        continue
+                    seen.add(signature)
+
+                    new_seq = seq + (node.val,)
+                    stats.num_candidates += 1
+                    k = self._satisfies(traces, new_effects)
+                    if k is not None:
+                        # ensure minimality
+                        if k not in max_var_set_map:
+                            max_var_set_map[k] = self._seq_program(start_sym, new_seq, obfus_func_signature)
+                        if not k or return_on_first:
+                            return False, max_var_set_map
+                    next_level.append((new_seq, tuple(new_effects)))
+
+            if not next_level:
+                break
+            level = next_level
+
+        return False, max_var_set_map
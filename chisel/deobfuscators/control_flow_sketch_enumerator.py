@@ -23,6 +23,7 @@ from stats import Stats
 from config import HeuristicConfig, HeuristicRules
 
 import objregex as ore
+from profiling import profiled
 
 Subtrace: TypeAlias = tuple[SlimTraceItem, ...]
 UnknownTraceMap: TypeAlias = dict[UnknownNode, tuple[Subtrace, ...]]
@@ -183,6 +184,7 @@ class ControlFlowSketchEnumerator:
                             f"pruning infeasible partial sketch: {new_sketch.prog}"
                         )
 
+    @profiled("sketch_enumeration")
     def expand_hole(self, sketch: ControlFlowSketch) -> list[ControlFlowSketch]:
         next_unk = sketch.prog.leftmost_unknown()
         assert next_unk, "No unknown nodes left in program"
@@ -276,7 +278,7 @@ class ControlFlowSketchEnumerator:
         # ignore all guards and just expand statement hole
         if common_stmts_src:
             new_prog = sketch.prog.copy()
-            new_prog.unknowns.remove(next_unk.id)
+            new_prog.remove_unknown(next_unk.id)
 
             # re-add line information
             subtraces = tuple(
@@ -930,23 +932,17 @@ class ControlFlowSketchEnumerator:
                         return None
                     case None, _:
                         if_node = ValueNode(node.id, self.grammar.get_prod("If"), "If")
-                        prog.nodes[node.id] = if_node
-                        prog.children[node.id].remove(true_branch)
+                        prog.set_node(node.id, if_node)
+                        prog.remove_child(node.id, true_branch)
                         assert len(prog.children[node.id]) == 2
                         del prog[true_branch]
-
-                        if node is prog.root:
-                            prog.root = if_node
                         node = if_node
                     case _, None:
                         if_node = ValueNode(node.id, self.grammar.get_prod("If"), "If")
-                        prog.nodes[node.id] = if_node
-                        prog.children[node.id].remove(false_branch)
+                        prog.set_node(node.id, if_node)
+                        prog.remove_child(node.id, false_branch)
                         assert len(prog.children[node.id]) == 2
                         del prog[false_branch]
-
-                        if node is prog.root:
-                            prog.root = if_node
                         node = if_node
 
             case ValueNode(val="If"):
@@ -1105,6 +1101,7 @@ class ControlFlowSketchEnumerator:
     ) -> Optional[tuple[Program, UnknownTraceMap]]:
         return self._dsd_while_disj(grammar, guards, traces, swap=True)
 
+    @profiled("sketch_reduction")
     def reduce_from_stmt_map(
         self, program: Program, trace_map: dict[UnknownNode, list[Trace]]
     ) -> Optional[Program]:
@@ -1125,9 +1122,9 @@ class ControlFlowSketchEnumerator:
         """Add explicit unknowns to the given sketch."""
         # recover unknowns to the program
         prog = sketch.prog
-        prog.unknowns += [
+        prog.add_unknowns(
             i for i, node in prog.nodes.items() if isinstance(node, UnknownNode)
-        ]
+        )
 
         implicit_hole_nodes = [k for k in sketch.stmt_map if isinstance(k, ValueNode)]
 
@@ -1144,12 +1141,11 @@ class ControlFlowSketchEnumerator:
             new_unk_node = UnknownNode(-1, self.grammar.start)
             prog.add_node(new_seq_node, parent_id)
             prog.add_node(new_unk_node, new_seq_node.id)
-            prog.parent[k.id] = new_seq_node.id
-            prog.children[new_seq_node.id].append(k.id)
-            prog.unknowns.append(new_unk_node.id)
+            prog.add_child(new_seq_node.id, k.id)
+            prog.add_unknowns([new_unk_node.id])
 
             if parent_id != -1:
-                prog.children[parent_id].remove(k.id)
+                prog.remove_child(parent_id, k.id)
 
             sketch.stmt_map[new_unk_node] = sketch.stmt_map.pop(k)
 
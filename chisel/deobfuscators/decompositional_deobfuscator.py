@@ -19,26 +19,25 @@ from pruners import Pruner, NoPruner
 from runners import *
 from search_models import SearchModel
 from stats import Stats
-from trace import Trace
+from trace import Trace, TraceSourceKind
 from extractor import *
 from input_spec import InputSpec
 
 from langs.c.c_runner import TraceRunnerState
 
-from utils import SynthesisTimeoutException
+from utils import SynthesisTimeoutException, statement_is_break
 from deobfuscators.control_flow_sketch_enumerator import *
 from config import get_synthesis_config, SynthesisConfig
+from profiling import profiled
 
 
 class DecompositionalDeobfuscator:
     """Synthesizes deobfuscated program given sketch and trace specs by solving each hole *mostly* separately."""
 
     grammar: Grammar
-    cache: set[str]
 
     def __init__(self, grammar: Grammar):
         self.grammar = grammar
-        self.cache = set()
 
     @staticmethod
     def _trace_is_consistent(trace: Trace):
@@ -64,6 +63,7 @@ class DecompositionalDeobfuscator:
             st = item.post_state
         return inconsistent_vars
 
+    @profiled("phantom_eval")
     def _phantom_eval(
         self,
         initial_mvs: set[str],
@@ -120,9 +120,7 @@ class DecompositionalDeobfuscator:
             trace_spec[unk] = min_trace
 
             codes = [s.src for s in min_trace[0].sources] if min_trace else []
-            prog.nodes[unk.id] = DummyNode(unk.id, codes)
-            if prog.root.id == unk.id:
-                prog.root = prog.nodes[unk.id]
+            prog.set_node(unk.id, DummyNode(unk.id, codes))
 
         for unk in list(trace_spec):
             if not trace_spec[unk]:
@@ -145,12 +143,164 @@ class DecompositionalDeobfuscator:
 
         stats.phantom_solution = formatter.format(prog)
         for unk_id, unk in unks.items():
-            prog.nodes[unk_id] = unk
-            if prog.root.id == unk_id:
-                prog.root = prog.nodes[unk_id]
+            prog.set_node(unk_id, unk)
 
         return res | discarded_vars
 
+    @staticmethod
+    def _lcs(a: Sequence[str], b: Sequence[str]) -> List[str]:
+        """Computes longest common subsequence of two sequences."""
+        lens = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+        for i in range(len(a) - 1, -1, -1):
+            for j in range(len(b) - 1, -1, -1):
+                lens[i][j] = lens[i + 1][j + 1] + 1 if a[i] == b[j] else max(lens[i + 1][j], lens[i][j + 1])
+
+        res = []
+        i, j = 0, 0
+        while i < len(a) and j < len(b):
+            if a[i] == b[j]:
+                res.append(a[i])
+                i, j = i + 1, j + 1
+            elif lens[i + 1][j] >= lens[i][j + 1]:
+                i += 1
+            else:
+                j += 1
+        return res
+
+    def _align_straight_line(
+        self, nonterm: Nonterminal, traces: List[Trace], signature: Any
+    ) -> Optional[Program]:
+        """ Constructs the sequence of statements common to all traces (progressive LCS alignment).
+
+        Arguments:
+        nonterm (Nonterminal) -- nonterminal of hole
+        traces ([Trace]) -- (minimized) traces of hole
+        signature (FunctionSignature) -- signature of function being deobfuscated
+
+        Returns:
+        prog (Program) -- straight-line program (None if hole is not a statement sequence)
+        """
+        if not traces or nonterm != self.grammar.start:
+            return None
+
+        aligned = None
+        for trace in traces:
+            stmts = [s.src for s in trace.sources if s.kind == TraceSourceKind.STATEMENT]
+            aligned = stmts if aligned is None else self._lcs(aligned, stmts)
+        if not aligned:
+            return None
+
+        return self._seq_program(nonterm, aligned, signature)
+
+    @staticmethod
+    def _satisfied_traces_pruned_vars(prog: Program, traces: List[Trace], runner: Runner) -> Optional[set[str]]:
+        """ Checks that a complete program matches every trace to its end.
+
+        Arguments:
+        prog (Program) -- complete program
+        traces ([Trace]) -- traces of hole
+        runner (Runner) -- runner to replay traces with
+
+        Returns:
+        pruned (set[str]) -- variables pruned while matching the traces (None if some trace is not matched)
+        """
+        pruned = set()
+        for trace in traces:
+            # NOTE: Doesn't use inputs so set to None as it can be fetched from trace!
+            check = False
+            try:
+                state = TraceRunnerState(
+                    state=trace.items[0].pre_state.copy(),
+                    pruned_variables=set(),
+                )
+                state = runner.execute_node(
+                    prog, trace, prog.root, state, False
+                )
+                if (
+                    all(
+                        trace.items[-1].post_state.get(k) == state.state.get(k)
+                        for k in trace.items[-1].post_state.keys()
+                        if not pruned or k not in pruned
+                    )
+                    and state.trace_index >= 0
+                    and not statement_is_return(trace.items[-1].source.src)
+                ):
+                    check = True
+                else:
+                    check = False  # force trace evaluates to the end
+            except TraceIdxNotFoundException as e:
+                check = False
+            except UnknownEncounterException as e:
+                raise e  # Should never happen...
+            except TraceEndException as e:
+                check = True  # Matching final element of trace is success
+
+            pruned.update(state.pruned_variables)
+
+            if not check:
+                return None
+        return pruned
+
+    def _seq_program(self, nonterm: Nonterminal, stmts: Sequence[str], signature: Any) -> Program:
+        """ Constructs the straight-line program executing the statements in order.
+
+        Arguments:
+        nonterm (Nonterminal) -- start nonterminal of program
+        stmts ([str]) -- (non-empty) sequence of statements
+        signature (FunctionSignature) -- signature of function being deobfuscated
+
+        Returns:
+        prog (Program) -- Seq/Single program of statements
+        """
+        prog = Program(nonterm, function_signature=signature)
+        for i, stmt in enumerate(stmts):
+            unk = prog.leftmost_unknown()
+            prog.expand(unk.id, self.grammar.get_prod("Single" if i == len(stmts) - 1 else "Seq"))
+            unk = prog.leftmost_unknown()
+            prog.expand(unk.id, self.grammar.get_prod("Stmt"))
+            unk = prog.leftmost_unknown()
+            prog.expand(unk.id, Production(SOURCE_STMT_NONTERM, SOURCE_STMT_NAME, [stmt]))
+
+        return prog
+
+    @staticmethod
+    def _trace_consistent_prods(
+        prog: Program,
+        unk: UnknownNode,
+        prods: List[Production],
+        traces: List[Trace],
+        pruner: Pruner,
+    ) -> List[Production]:
+        """ Filters statement productions to those which can match a remaining trace item of every trace reaching the unknown.
+
+        Arguments:
+        prog (Program) -- partial program (already checked by the pruner)
+        unk (UnknownNode) -- statement unknown to be expanded
+        prods ([Production]) -- candidate statement productions
+        traces ([Trace]) -- traces for hole
+        pruner (Pruner) -- pruner (runner gives the codes of trace items)
+
+        Returns:
+        prods ([Production]) -- productions consistent with all traces
+        """
+        runner = getattr(pruner, "runner", None)
+        if runner is None or not prog.trace_stops:
+            return prods
+
+        allowed = None
+        for i, (trace_idx, unk_id) in prog.trace_stops.items():
+            if unk_id != unk.id:
+                continue
+            codes = runner.next_trace_codes(traces[i], trace_idx)
+            if codes is not None:
+                allowed = codes if allowed is None else allowed & codes
+
+        if allowed is None:
+            return prods
+
+        codes = [getattr(p.args[0], "src", p.args[0]) for p in prods]
+        return [p for p, c in zip(prods, codes) if c in allowed or statement_is_break(c)]
+
     def deobfuscate_decomp(
         self,
         src_path: str,
@@ -198,7 +348,7 @@ class DecompositionalDeobfuscator:
             extraction_time,
             num_loc,
         ) = trace_info
-        stats.gdb_times.append(trace_time)
+        stats.gdb_times.add(trace_time)
         stats.extraction_time = extraction_time
         stats.num_lines = num_loc
 
@@ -324,6 +474,7 @@ class DecompositionalDeobfuscator:
         stats.deobfuscation_time = time.time() - start_time
         return None
 
+    @profiled("sketch_completion")
     def deobfuscate_decomp_inner(
         self,
         src_path: str,
@@ -379,7 +530,6 @@ class DecompositionalDeobfuscator:
 
         if syn_config.disable_decomposition:
             pruner.cache.clear()
-            self.cache.clear()
 
             current_variable_set = (
                 (initial_mvs | mvs_closure) - invalid_variables
@@ -465,7 +615,16 @@ class DecompositionalDeobfuscator:
         unk_to_pruned_var_map = {}
 
         for unk, utraces in trace_specs.items():
-            self.cache.clear()
+            if not get_cline_args().disable_alignment:
+                # try straight-line program from trace alignment before enumerating
+                aligned = self._align_straight_line(unk.nonterm, utraces, sketch.signature)
+                # check_eq only runs traces which have inputs, so subtraces (e.g., of loop bodies) are replayed too
+                if aligned is not None and checker.check_eq(aligned, src_path, utraces, inputs, stats) and \
+                        self._satisfied_traces_pruned_vars(aligned, utraces, pruner.runner) is not None:
+                    stats.num_aligned_holes += 1
+                    unk_to_pruned_var_map[unk] = [((), aligned)]
+                    continue
+
             timed_out, pruned_var_prog_map = self.deobfuscate(
                 src_path,
                 search_model,
@@ -558,6 +717,7 @@ class DecompositionalDeobfuscator:
 
         return None
 
+    @profiled("hole_synthesis")
     def deobfuscate(
         self,
         src_path: str,
@@ -636,14 +796,16 @@ class DecompositionalDeobfuscator:
             for g in guards:
                 print(g)
 
-        worklist = PriorityQueue(priority=search_model.priority)
+        # NOTE: worklist drops duplicate partial programs when they are added
+        worklist = PriorityQueue(
+            priority=search_model.priority,
+            key=Program.key,
+            max_size=args.max_worklist_size,
+        )
 
+        search_model.reset(traces, grammar)
         worklist.add(prog, stats)
 
-        # Keep track of grammar per program (b/c we can remove stmts/guards from grammar)
-        grammars = {}
-        grammars[prog] = grammar
-
         max_var_set_map = {}
 
         while len(worklist) > 0:
@@ -662,63 +824,18 @@ class DecompositionalDeobfuscator:
             stats.num_iter += 1
 
             prog = worklist.pop()  # Get highest priority program
-            grammar = grammars[prog]  # Get associated grammar
 
-            prog_str = formatter.format(prog)
             if args.debug in ["all", "print-partial"]:
-                print(prog_str)
+                print(formatter.format(prog))
                 print("--")
 
-            if prog_str in self.cache:
-                # Ignore partial programs that have already been processed
-                continue
-
-            self.cache.add(prog_str)  # add partial program to cache
-
             if prog.complete():
                 # If program is complete, check if it matches specification
                 stats.num_candidates += 1
-                stats.candidates.append(prog)
-                traces_satisfied = True
-                pruned = set()
-                for trace in traces:
-                    # NOTE: Doesn't use inputs so set to None as it can be fetched from trace!
-                    # NOTE: Assumes pruner has runner defined!
-                    check = False
-                    try:
-                        state = TraceRunnerState(
-                            state=trace.items[0].pre_state.copy(),
-                            pruned_variables=set(),
-                        )
-                        state = pruner.runner.execute_node(
-                            prog, trace, prog.root, state, False
-                        )
-                        if (
-                            all(
-                                trace.items[-1].post_state.get(k) == state.state.get(k)
-                                for k in trace.items[-1].post_state.keys()
-                                if not pruned or k not in pruned
-                            )
-                            and state.trace_index >= 0
-                            and not statement_is_return(trace.items[-1].source.src)
-                        ):
-                            check = True
-                        else:
-                            check = False  # force trace evaluates to the end
-                    except TraceIdxNotFoundException as e:
-                        check = False
-                    except UnknownEncounterException as e:
-                        raise e  # Should never happen...
-                    except TraceEndException as e:
-                        check = True  # Matching final element of trace is success
-
-                    pruned.update(state.pruned_variables)
-
-                    if not check:
-                        traces_satisfied = False
-                        break
-
-                if traces_satisfied:
+                stats.sample(stats.candidates, prog)
+                # NOTE: Assumes pruner has runner defined!
+                pruned = self._satisfied_traces_pruned_vars(prog, traces, pruner.runner)
+                if pruned is not None:
                     k = tuple(sorted(pruned))
 
                     # ensure minimality
@@ -732,30 +849,27 @@ class DecompositionalDeobfuscator:
             if pruner.prune(prog, src_path, traces, inputs, stats, allow_return=allow_control_flow) and not config.disable_trace_pruning:
                 # If partial program should be pruned, continue without adding expansions
                 stats.num_pruned += 1
-                stats.pruned.append(prog)
-                stats.pruned_times.append(time.time() - prune_start)
+                stats.sample(stats.pruned, prog)
+                stats.pruned_times.add(time.time() - prune_start)
                 continue
 
             stats.num_not_pruned += 1
-            stats.not_pruned.append(prog)
-            stats.not_pruned_times.append(time.time() - prune_start)
+            stats.sample(stats.not_pruned, prog)
+            stats.not_pruned_times.add(time.time() - prune_start)
 
             # Add all expansions of partial program for next unknown
             unk = next_unk(prog)
             prods = grammar.productions[unk.nonterm]
+            if unk.nonterm == SOURCE_STMT_NONTERM and not config.disable_trace_pruning:
+                prods = self._trace_consistent_prods(prog, unk, prods, traces, pruner)
 
             for prod in prods:
                 new_prog = prog.copy()
                 new_prog.expand(unk.id, prod)
 
-                # construct grammar for program to be added
-                new_grammar = grammar
                 if not args.disable_syntax_pruning:
-                    if unk.nonterm in [SOURCE_GUARD_NONTERM, SOURCE_STMT_NONTERM]:
-                        # Adjust DSL to remove stmts/guards which dominate current
-                        new_grammar = grammar.copy()
-                        # NOTE: we keep production for current stmt/guard
-                        # to handle duplicates
+                    # NOTE: we keep production for current stmt/guard
+                    # to handle duplicates (so grammar stays the same)
 
                     # See if program can be pruned because too few stmts/guards
                     min_needed_stmts = 0
@@ -767,20 +881,19 @@ class DecompositionalDeobfuscator:
                         elif unode.nonterm in self.grammar.guard_nterms:
                             min_needed_guards += 1
                     if (
-                        len(new_grammar.productions[SOURCE_STMT_NONTERM])
+                        len(grammar.productions[SOURCE_STMT_NONTERM])
                         < min_needed_stmts
-                        or len(new_grammar.productions[SOURCE_GUARD_NONTERM])
+                        or len(grammar.productions[SOURCE_GUARD_NONTERM])
                         < min_needed_guards
                     ):
                         stats.num_pruned += 1
-                        stats.pruned.append(new_prog)
-                        stats.pruned_times.append(time.time() - prune_start)
+                        stats.sample(stats.pruned, new_prog)
+                        stats.pruned_times.add(time.time() - prune_start)
                         stats.num_syntax_pruned += 1
-                        stats.syntax_pruned.append(new_prog)
+                        stats.sample(stats.syntax_pruned, new_prog)
                         continue
 
                 worklist.add(new_prog, stats)
-                grammars[new_prog] = new_grammar
 
         return False, max_var_set_map
     
@@ -801,7 +914,7 @@ class DecompositionalDeobfuscator:
             if prog.complete():
 
                 unk_ids = [nid for nid, node in prog.nodes.items() if isinstance(node, UnknownNode)]
-                prog.unknowns.extend(unk_ids)
+                prog.add_unknowns(unk_ids)
 
                 yield prog
                 continue
@@ -829,7 +942,7 @@ class DecompositionalDeobfuscator:
                 if prod is None:
                     # expand this unknown as a statement hole
                     new_prog = prog.copy()
-                    new_prog.unknowns.remove(next_unk.id)
+                    new_prog.remove_unknown(next_unk.id)
                     queue.append(new_prog)
                     continue
 
@@ -69,7 +69,7 @@ class EnumerativeDeobfuscator():
         trace_start = time.time()
         traces = generate_traces(src_path, inputs, "OBF_FUNC")
         trace_time = time.time() - trace_start
-        stats.gdb_times.append(trace_time)
+        stats.gdb_times.add(trace_time)
 
         # Retrieve relevant guards and statements
         extraction_start = time.time()
@@ -170,7 +170,7 @@ class EnumerativeDeobfuscator():
             if prog.complete():
                 # If program is complete, check if it matches specification
                 stats.num_candidates += 1
-                stats.candidates.append(prog)
+                stats.sample(stats.candidates, prog)
                 if checker.check_eq(prog, src_path, traces, inputs, stats):
                     stats.solution = prog
                     stats.deobfuscation_time = time.time()-start_time
@@ -186,24 +186,24 @@ class EnumerativeDeobfuscator():
             if not args.disable_analysis_pruning and \
                not analysis.is_valid(prog, decl_vars, used_vars):
                 stats.num_pruned += 1
-                stats.pruned.append(prog)
-                stats.pruned_times.append(time.time()-analysis_start)
+                stats.sample(stats.pruned, prog)
+                stats.pruned_times.add(time.time()-analysis_start)
                 stats.num_analysis_pruned += 1
-                stats.analysis_pruned.append(prog)
-                stats.analysis_pruned_times.append(time.time()-analysis_start)
+                stats.sample(stats.analysis_pruned, prog)
+                stats.analysis_pruned_times.add(time.time()-analysis_start)
                 continue
 
             prune_start = time.time()
             if pruner.prune(prog, src_path, traces, inputs, stats):
                 # If partial program should be pruned, continue withut adding expansions
                 stats.num_pruned += 1
-                stats.pruned.append(prog)
-                stats.pruned_times.append(time.time()-prune_start)
+                stats.sample(stats.pruned, prog)
+                stats.pruned_times.add(time.time()-prune_start)
                 continue
 
             stats.num_not_pruned += 1
-            stats.not_pruned.append(prog)
-            stats.not_pruned_times.append(time.time()-prune_start)
+            stats.sample(stats.not_pruned, prog)
+            stats.not_pruned_times.add(time.time()-prune_start)
 
             # Add all expansions of partial program for next unknown
             unk = next_unk(prog)
@@ -238,10 +238,10 @@ class EnumerativeDeobfuscator():
                     if len(new_grammar.productions[SOURCE_STMT_NONTERM]) < min_needed_stmts or \
                        len(new_grammar.productions[SOURCE_GUARD_NONTERM]) < min_needed_guards:
                         stats.num_pruned += 1
-                        stats.pruned.append(new_prog)
-                        stats.pruned_times.append(time.time()-prune_start)
+                        stats.sample(stats.pruned, new_prog)
+                        stats.pruned_times.add(time.time()-prune_start)
                         stats.num_syntax_pruned += 1
-                        stats.syntax_pruned.append(new_prog)
+                        stats.sample(stats.syntax_pruned, new_prog)
                         continue
 
                 worklist.add(new_prog, stats)
@@ -0,0 +1,246 @@
+"""Runs chisel on benchmark directories, scheduling all work on one pool of worker processes.
+
+Run from the chisel directory:
+
+    python evaluate.py --input_dir DIR [DIR ...] --stats_dir OUT [--timeout 1200] [--workers N] [--chisel_args "..."]
+
+Each benchmark is split into a trace generation task followed by one synthesis task per heuristic
+config (as in runner.py), and all tasks share the same workers, so at most --workers tasks run at once.
+Workers are forked from this (already initialized) process instead of starting a new interpreter per
+benchmark; trace and compile caches are shared between them. Results are written to
+STATS_DIR/<program>.json as runner.py --save_results does, and benchmarks with an existing result
+are skipped, so an interrupted evaluation can be resumed by running the same command again.
+"""
+import logging
+import multiprocessing
+import os
+import shlex
+import sys
+import time
+import traceback
+from argparse import ArgumentParser, Namespace
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import *
+
+from args import clear_global_args, get_cline_args
+from config import HeuristicConfig, MAX_GDB_GENERATION_TIME, get_all_configs, get_minimal_config
+# imported here (runner.py imports them on use) so forked workers start with all synthesis modules loaded
+import runner
+import deobfuscators, extractor, input_spec_data, langs.c
+
+PREPARE = "prepare"
+SYNTHESIZE = "synthesize"
+
+
+@dataclass(eq=False)
+class Benchmark:
+    src_path: Path
+    out_path: Path
+    cli_args: List[str] # runner.py arguments
+    configs: List[HeuristicConfig]
+    trace_info: Any = None
+    results: Dict[int, Tuple[bool, str, str]] = field(default_factory=dict) # config index -> run_inner result
+    pending: int = 0 # unfinished synthesis tasks
+    start_time: Optional[float] = None
+
+
+@dataclass(eq=False)
+class Task:
+    bench: Benchmark
+    kind: str # PREPARE or SYNTHESIZE
+    config_idx: int = -1
+    process: Optional[multiprocessing.Process] = None
+    conn: Optional[Connection] = None
+    deadline: float = 0.0
+
+
+def _task_main(conn: Connection, kind: str, cli_args: List[str], config: Optional[HeuristicConfig], trace_info: Any):
+    """Entry point of worker processes (sends back the result of the task)."""
+    try:
+        clear_global_args()
+        args = get_cline_args(cli_args)
+        if kind == PREPARE:
+            res = runner.prepare_run(args)
+        else:
+            res = runner.run_inner(args, config, trace_info)
+        conn.send((True, res))
+    except BaseException:
+        conn.send((False, traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+class Evaluation():
+    """Schedules the tasks of all benchmarks on a fixed number of worker processes."""
+
+    def __init__(self, benchmarks: List[Benchmark], workers: int, timeout: int, grace: int):
+        self.ctx = multiprocessing.get_context("fork")
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.grace = grace # extra time per task before it is killed
+        self.total = len(benchmarks)
+        self.finished = 0
+        self.num_solved = 0
+        self.start_time = time.time()
+        self.ready = deque(Task(bench, PREPARE) for bench in benchmarks)
+        self.running: Dict[Connection, Task] = {}
+
+    def _start(self, task: Task):
+        recv_conn, send_conn = self.ctx.Pipe(duplex=False)
+        config = task.bench.configs[task.config_idx] if task.kind == SYNTHESIZE else None
+        trace_info = task.bench.trace_info if task.kind == SYNTHESIZE else None
+        task.process = self.ctx.Process(target=_task_main, args=(send_conn, task.kind, task.bench.cli_args, config, trace_info),
+                                        daemon=True)
+        task.process.start()
+        send_conn.close()
+        task.conn = recv_conn
+        limit = MAX_GDB_GENERATION_TIME if task.kind == PREPARE else self.timeout
+        task.deadline = time.time() + limit + self.grace
+        if task.bench.start_time is None:
+            task.bench.start_time = time.time()
+        self.running[recv_conn] = task
+
+    def _stop(self, task: Task):
+        if task.process.is_alive():
+            task.process.kill()
+        task.process.join()
+        task.conn.close()
+
+    def _finish(self, bench: Benchmark, result: Optional[Tuple[bool, str, str]], status: str):
+        """Writes the result of a benchmark (if any) and cancels its remaining tasks."""
+        for task in [t for t in self.ready if t.bench is bench]:
+            self.ready.remove(task)
+        for conn, task in list(self.running.items()):
+            if task.bench is bench:
+                del self.running[conn]
+                self._stop(task)
+        bench.trace_info = None
+
+        if result is not None:
+            # written atomically, so an interrupted write is not mistaken for a result on resume
+            tmp_path = bench.out_path.with_name(bench.out_path.name + ".tmp")
+            tmp_path.write_text(result[1])
+            os.replace(tmp_path, bench.out_path)
+        self.finished += 1
+        self.num_solved += status == "solved"
+        elapsed = time.time() - bench.start_time
+        print("[{}/{}] {}: {} ({:.1f}s) -- {} running, {} queued, {} solved, {:.0f}s elapsed".format(
+            self.finished, self.total, bench.src_path, status, elapsed, len(self.running), len(self.ready),
+            self.num_solved, time.time() - self.start_time), flush=True)
+
+    def _finish_unsolved(self, bench: Benchmark):
+        # as runner.run_processes, report the last config (nothing if all were killed)
+        last = bench.results[max(bench.results)] if bench.results else None
+        self._finish(bench, last, "unsolved" if last is not None else "killed")
+
+    def _handle(self, task: Task, ok: bool, res: Any):
+        bench = task.bench
+        if task.kind == PREPARE:
+            if not ok:
+                # reported like runner.py reports exceptions
+                self._finish(bench, (False, res, ""), "error")
+                return
+            bench.trace_info = res
+            bench.pending = len(bench.configs)
+            # synthesis tasks go first, so started benchmarks finish (and release their traces) early
+            for i in reversed(range(len(bench.configs))):
+                self.ready.appendleft(Task(bench, SYNTHESIZE, i))
+            return
+
+        bench.pending -= 1
+        bench.results[task.config_idx] = res if ok else (False, res, "")
+        if ok and res[0]:
+            self._finish(bench, res, "solved")
+        elif bench.pending == 0:
+            self._finish_unsolved(bench)
+
+    def run(self):
+        try:
+            while self.ready or self.running:
+                while self.ready and len(self.running) < self.workers:
+                    self._start(self.ready.popleft())
+
+                next_deadline = min(task.deadline for task in self.running.values())
+                for conn in wait(list(self.running), timeout=max(0.0, next_deadline - time.time())):
+                    task = self.running.pop(conn, None)
+                    if task is None:
+                        continue # cancelled by a task handled before
+                    try:
+                        ok, res = conn.recv()
+                    except EOFError:
+                        ok, res = False, "Worker exited with code {}".format(task.process.exitcode)
+                    self._stop(task)
+                    self._handle(task, ok, res)
+
+                now = time.time()
+                for conn, task in list(self.running.items()):
+                    if task.deadline > now or conn not in self.running:
+                        continue
+                    del self.running[conn]
+                    self._stop(task)
+                    logging.warning(f"Killed {task.kind} task of {task.bench.src_path} after exceeding its time limit")
+                    if task.kind == PREPARE:
+                        self._finish(task.bench, None, "killed")
+                    else:
+                        task.bench.pending -= 1
+                        if task.bench.pending == 0:
+                            self._finish_unsolved(task.bench)
+        finally:
+            for task in self.running.values():
+                self._stop(task)
+            self.running.clear()
+
+
+def collect_benchmarks(args: Namespace) -> Tuple[List[Benchmark], int]:
+    """Returns benchmarks of the input directories without results, and the number of skipped ones."""
+    args.stats_dir.mkdir(parents=True, exist_ok=True)
+    chisel_args = shlex.split(args.chisel_args)
+
+    # configs as chosen by runner.main
+    clear_global_args()
+    cline_args = get_cline_args(["--timeout={}".format(args.timeout), *chisel_args, "DUMMY.c"])
+    configs = [get_minimal_config()] if cline_args.disable_parallel or cline_args.ablation == "1a" else get_all_configs()
+    clear_global_args()
+
+    benchmarks = []
+    skipped = 0
+    for input_dir in args.input_dir:
+        for src_path in sorted(input_dir.glob("*.c")):
+            out_path = args.stats_dir / "{}.json".format(src_path.stem.removesuffix(".out"))
+            if out_path.exists():
+                skipped += 1
+                continue
+            cli_args = ["--timeout={}".format(args.timeout), *chisel_args, str(src_path)]
+            benchmarks.append(Benchmark(src_path, out_path, cli_args, configs))
+    return benchmarks, skipped
+
+
+def main():
+    parser = ArgumentParser(description="run chisel on benchmark directories")
+    parser.add_argument("--input_dir", help="directories of obfuscated programs", type=Path, nargs="+", required=True)
+    parser.add_argument("--stats_dir", help="directory to write results to", type=Path, required=True)
+    parser.add_argument("--timeout", help="synthesis timeout in seconds (default 1200)", type=int, default=1200)
+    parser.add_argument("--workers", help="number of tasks run at once (default is the number of cores)", type=int, default=os.cpu_count())
+    parser.add_argument("--grace", help="seconds a task may exceed its time limit before it is killed (default 120)", type=int, default=120)
+    parser.add_argument("--chisel_args", help="additional arguments to runner.py (default '')", type=str, default="")
+    parser.add_argument("--verbose", help="show synthesis logs of workers", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    benchmarks, skipped = collect_benchmarks(args)
+    print("Running {} benchmarks on {} workers ({} skipped with existing results in {})".format(
+        len(benchmarks), args.workers, skipped, args.stats_dir), flush=True)
+
+    evaluation = Evaluation(benchmarks, args.workers, args.timeout, args.grace)
+    try:
+        evaluation.run()
+    except KeyboardInterrupt:
+        sys.exit("Interrupted -- run again to resume")
+    print("Solved {}/{} in {:.0f}s".format(evaluation.num_solved, len(benchmarks), time.time() - evaluation.start_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,32 +8,14 @@ function run_benchmark() {
 
     mkdir -p "${stats_dir}" && mkdir -p "${input_dir}"
 
-    # Set environment variables
-    export timeout="${timeout}"
-    export input_dir=`cd "${input_dir}"; pwd`
-    export stats_dir=`cd "${stats_dir}"; pwd`
-    export chisel_args="${chisel_args}"
-
-    # Create a directory for the benchmark
-    mkdir -p "${benchmark_name}" && cd "${benchmark_name}"
+    input_dir=`cd "${input_dir}"; pwd`
+    stats_dir=`cd "${stats_dir}"; pwd`
 
     echo "Running benchmark ${benchmark_name} with timeout ${timeout} seconds"
     echo "parallelism ${max_parallelism}, input directory ${input_dir}, statistics directory ${stats_dir}"
     echo "chisel arguments ${chisel_args}"
-    echo "max timeout variable ${proc_timeout}"
-
-    # Run CMake to generate the Makefile
-    cmake .. || {
-        # If there's an error, go back and remove the directory
-        cd ..
-        rm -rf "${benchmark_name}"
-        exit 1
-    }
 
-    # Run make with the specified parallelism
-    make -j"${max_parallelism}" -k benchmark
-
-    # Return to the parent directory
-    cd .. && rm -rf "${benchmark_name}"
+    # Benchmarks with existing results in the statistics directory are skipped
+    (cd .. && python3 evaluate.py --input_dir "${input_dir}" --stats_dir "${stats_dir}" \
+        --timeout "${timeout}" --workers "${max_parallelism}" --chisel_args "${chisel_args}")
 }
-
@@ -1,7 +1,6 @@
 #!/bin/bash
 
 source ./run_benchmark.sh
-export proc_timeout="22m"
 
 timeout=1200
 max_parallelism=14
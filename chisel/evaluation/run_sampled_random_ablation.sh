@@ -3,7 +3,6 @@
 source ./run_benchmark.sh
 export timeout=1200
 export max_parallelism=9
-export proc_timeout="22m"
 
 run_sampled_random_ablation() {
     local num_obfus=$1
@@ -1,3 +1,4 @@
 from extractor.trace_extractor import generate_traces, extract_param_types
 from extractor.input_generator import generate_examples
 from extractor.decl_extractor import parse_c_decls
+from extractor.trace_bundle import TraceBundle
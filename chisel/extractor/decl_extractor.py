@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from typing import *
+
 from pycparser import c_ast, c_generator
 from langs.c.c_parser import CParser
 
@@ -28,7 +30,8 @@ def _parse_params(func_decl) -> list[FunctionParameter]:
     return [FunctionParameter(param.name, _generate_c_str(param.type), _generate_c_str(param)) for param in params]
 
 
-def parse_c_decls(src_path: str) -> list:
+def parse_c_decls(src_path: str, ast: Any = None) -> list:
+    """Returns signatures of functions defined in the program (parsed from src_path unless its AST is given)."""
 
     class FuncDefVisitor(c_ast.NodeVisitor):
         def __init__(self) -> None:
@@ -45,7 +48,8 @@ def parse_c_decls(src_path: str) -> list:
             self.decls.append(FunctionSignature(
                 node.decl.name, params, ret_type))
 
-    ast = CParser().parse(src_path)
+    if ast is None:
+        ast = CParser().parse(src_path)
 
     def_visitor = FuncDefVisitor()
     def_visitor.visit(ast)
@@ -1,9 +1,5 @@
+import functools
 import sys
-from hypothesis import strategies as st
-
-# Turn off the warning of st.examples()
-if not hasattr(sys, "ps1"):
-    sys.ps1 = ""
 
 UINT_MAX = 2**16 - 1
 # INT_MIN = -2**15
@@ -21,25 +17,37 @@ UINT32_MAX = 2**32 - 1
 INT32_MIN = -2**31
 INT32_MAX = 2**31 - 1
 
-C_TYPE_STRATEGY_MAPPER = {
-    "int": st.integers(min_value=INT_MIN, max_value=INT_MAX),
-    "long": st.integers(min_value=INT_MIN, max_value=INT_MAX),
-    "unsigned int": st.integers(min_value=0, max_value=UINT_MAX),
-    "unsigned long": st.integers(min_value=0, max_value=ULONG_MAX),
-    "char": st.integers(min_value=SCHAR_MIN, max_value=SCHAR_MAX),
-    "unsigned char": st.integers(min_value=0, max_value=UCHAR_MAX),
-
-    "int32_t": st.integers(min_value=INT32_MIN, max_value=INT32_MAX),
-    "uint32_t": st.integers(min_value=0, max_value=UINT32_MAX),
-    "size_t": st.integers(min_value=0, max_value=UINT_MAX),
+# value range per C type (hypothesis strategies are built on first use, as hypothesis is slow to import)
+C_TYPE_RANGES = {
+    "int": (INT_MIN, INT_MAX),
+    "long": (INT_MIN, INT_MAX),
+    "unsigned int": (0, UINT_MAX),
+    "unsigned long": (0, ULONG_MAX),
+    "char": (SCHAR_MIN, SCHAR_MAX),
+    "unsigned char": (0, UCHAR_MAX),
+
+    "int32_t": (INT32_MIN, INT32_MAX),
+    "uint32_t": (0, UINT32_MAX),
+    "size_t": (0, UINT_MAX),
 }
 
 
+@functools.lru_cache(maxsize=None)
+def _strategy(c_type: str):
+    # Turn off the warning of st.examples()
+    if not hasattr(sys, "ps1"):
+        sys.ps1 = ""
+    from hypothesis import strategies as st
+
+    min_value, max_value = C_TYPE_RANGES[c_type]
+    return st.integers(min_value=min_value, max_value=max_value)
+
+
 def generate_examples(c_type: str, num_examples: int = 100) -> set:
-    strategy = C_TYPE_STRATEGY_MAPPER.get(c_type)
-    if strategy is None:
+    if c_type not in C_TYPE_RANGES:
         raise ValueError(f"Unknown C type: {c_type}")
-    
+    strategy = _strategy(c_type)
+
     results = set()
     for _ in range(num_examples * 2):
         results.add(strategy.example())
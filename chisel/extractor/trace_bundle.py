@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import Any
+
+from extractor.decl_extractor import FunctionSignature
+from input_spec import InputSpec
+from trace import Trace
+from utils import load_from_bin, save_to_bin
+
+TRACE_BUNDLE_VERSION = 1
+
+
+@dataclass
+class TraceBundle:
+    """Everything synthesis needs about an obfuscated program, so it can run without gcc/GDB or the source."""
+
+    src_path: str  # path of program the traces were generated from
+    func_name: str  # name of obfuscated function
+    inputs: list[InputSpec]
+    func_decls: list[FunctionSignature]
+    signature: FunctionSignature  # signature of obfuscated function
+    decl_vars: dict[str, set[tuple[str, str]]]  # (negated guards included)
+    used_vars: dict[str, set[str]]
+    left_vars: dict[str, set[str]]
+    negation_map: dict[str, str]  # guard to its negation added during trace generation
+    traces: list[Trace]
+    trace_time: float  # time (sec) taken to generate traces
+    extraction_time: float  # time (sec) taken to analyze source
+    num_loc: int
+    version: int = TRACE_BUNDLE_VERSION
+
+    def trace_info(self) -> tuple:
+        """Returns the trace info tuple passed to deobfuscators."""
+        return (
+            self.inputs,
+            self.func_decls,
+            self.signature,
+            self.decl_vars,
+            self.used_vars,
+            self.left_vars,
+            self.traces,
+            self.trace_time,
+            self.extraction_time,
+            self.num_loc,
+        )
+
+    def save(self, out_path: Any):
+        """ Saves bundle to a binary file.
+
+        Arguments:
+        out_path (str) -- path to output file
+        """
+        save_to_bin(self, str(out_path))
+
+    @staticmethod
+    def load(src_path: Any) -> "TraceBundle":
+        """ Loads bundle from a binary file.
+
+        Arguments:
+        src_path (str) -- path to bundle
+
+        Returns:
+        bundle (TraceBundle) -- loaded bundle
+        """
+        bundle = load_from_bin(str(src_path))
+        if not isinstance(bundle, TraceBundle) or bundle.version != TRACE_BUNDLE_VERSION:
+            raise Exception("{} is not a trace bundle of version {}".format(src_path, TRACE_BUNDLE_VERSION))
+
+        # traces created from now on (e.g., minimized copies) must not reuse ids of loaded traces
+        Trace.trace_id = max([Trace.trace_id] + [t.trace_id + 1 for t in bundle.traces])
+        return bundle
@@ -8,11 +8,11 @@ from itertools import takewhile
 
 import os
 import json
-import tempfile
 import logging
 import pickle
 
 from input_spec import InputSpec
+from scratch import scratch_file
 
 from trace import Trace, TraceSource, TraceSourceKind, SlimTraceItem
 from extractor.utils import compile_c_program
@@ -40,7 +40,7 @@ def _generate_trace(
     input_spec: Optional[InputSpec],
     args_type: Literal["func_args", "cli_args", "analyze"],
 ) -> GDBOutput | None:
-    output_path = tempfile.mkstemp()[1]
+    output_path = scratch_file(suffix=".json")
     config = {
         "output_path": output_path,
         "executable": executable,
@@ -1,51 +1,151 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import os
 import tempfile
+import time
+from pathlib import Path
 from subprocess import CalledProcessError
 from subprocess import run as subprocess_run
 from contextlib import contextmanager
 
+COMPILE_CACHE_PATH = Path(".compile_cache")
+MAX_COMPILE_CACHE_SIZE = 512 * 1024 * 1024 # bytes; least recently used artifacts are evicted beyond it
+EVICTION_GRACE_PERIOD = 10 * 60 # seconds; artifacts used more recently are never evicted (may be in use)
+
+_cache_sizes : dict[Path, int] = {} # cache directory -> bytes it held at last scan plus artifacts added since
+
+
+@functools.lru_cache(maxsize=None)
+def _compiler_id(compiler: str) -> str:
+    """Returns version string of compiler (part of the cache key, so upgrading it invalidates artifacts)."""
+    return subprocess_run([compiler, "--version"], capture_output=True, check=True, encoding="utf-8").stdout
+
+
+def _scan(cache_dir: Path) -> list[tuple[float, int, Path]]:
+    """Returns (mtime, size, path) of every artifact in cache_dir."""
+    entries = []
+    for path in cache_dir.glob("*/*"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue # evicted concurrently
+        entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def _evict(cache_dir: Path, max_size: int):
+    """Removes least recently used artifacts until cache_dir holds at most max_size bytes."""
+    entries = _scan(cache_dir)
+    total = sum(size for _, size, _ in entries)
+
+    now = time.time()
+    for mtime, size, path in sorted(entries):
+        if total <= max_size or now - mtime < EVICTION_GRACE_PERIOD:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+    _cache_sizes[cache_dir] = total
+
+
+def _add_to_cache_size(cache_dir: Path, out_path: Path, max_size: int):
+    """Accounts for a new artifact in cache_dir, and evicts once the running total exceeds max_size.
+
+    The total is only rescanned then, so artifacts added by other processes are noticed late.
+    """
+    if cache_dir not in _cache_sizes:
+        _cache_sizes[cache_dir] = sum(size for _, size, _ in _scan(cache_dir))
+    else:
+        try:
+            _cache_sizes[cache_dir] += out_path.stat().st_size
+        except FileNotFoundError:
+            pass # evicted concurrently
+    if _cache_sizes[cache_dir] > max_size:
+        _evict(cache_dir, max_size)
+
+
+def compile_cached(flags: list[str], src_path: str | None = None, src: str | None = None,
+                   compiler: str = "gcc", cache_dir: Path | str | None = None) -> str:
+    """
+    Compiles a C program (given as path or source) through a content-addressed cache, so each distinct
+    (source, compiler, flags) is compiled once. Safe to use from concurrent processes.
+
+    Arguments:
+    flags ([str]) -- compiler flags (e.g., ["-g", "-O0"])
+    src_path (str) -- path to the C source file
+    src (str) -- C source (if src_path is None)
+    compiler (str) -- compiler executable
+    cache_dir (Path) -- cache directory (default COMPILE_CACHE_PATH)
+
+    Returns:
+    out_path (str) -- path to the compiled artifact (do not modify or remove it)
+
+    Raises:
+    CalledProcessError -- if compilation fails
+    """
+    cache_dir = Path(cache_dir or COMPILE_CACHE_PATH)
+    if src is None:
+        with open(src_path, "r") as f:
+            src = f.read()
+
+    key_parts = [_compiler_id(compiler), "\0".join(flags), src]
+    if src_path is not None and "-g" in flags:
+        # debug info refers to the source path (e.g., GDB traces report it)
+        key_parts.append(str(Path(src_path).resolve()))
+    key = hashlib.sha256("\0\0".join(key_parts).encode("utf-8")).hexdigest()
+    out_path = cache_dir / key[:2] / (key + (".so" if "-shared" in flags else ""))
+
+    if out_path.exists():
+        try:
+            os.utime(out_path) # mark as recently used
+        except FileNotFoundError:
+            pass
+        else:
+            return str(out_path)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_out_path = tempfile.mkstemp(dir=out_path.parent, prefix=".tmp-")
+    os.close(fd)
+    os.remove(tmp_out_path) # let the compiler create it (with exec permissions)
+    tmp_src_path = None
+    try:
+        if src_path is None:
+            fd, tmp_src_path = tempfile.mkstemp(dir=out_path.parent, prefix=".tmp-", suffix=".c")
+            with os.fdopen(fd, "w") as f:
+                f.write(src)
+        subprocess_run([compiler, *flags, "-o", tmp_out_path, src_path or tmp_src_path],
+                       capture_output=True, check=True, timeout=10, encoding="utf-8")
+        # atomic, so concurrent users never see partially written artifacts
+        os.replace(tmp_out_path, out_path)
+    finally:
+        for path in (tmp_out_path, tmp_src_path):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+    _add_to_cache_size(cache_dir, out_path, MAX_COMPILE_CACHE_SIZE)
+    return str(out_path)
+
 
 @contextmanager
 def compile_c_program(src_path: str) -> str:
     """
     Compile a C program and return the path to the executable.
-    Use `with` statements to automatically remove the output file.
+    Executables are cached (see compile_cached), so the path must not be modified.
 
     Arguments:
     src_path (str) -- Path to the C source file
 
     Returns:
-    exe_path (str) -- Path to the compiled executable; None if compilation failed
+    exe_path (str) -- Path to the compiled executable
     """
     try:
-        # create temp file for the executable
-        # remove it beforehand to avoid GDB exit code 126
-        _, out_path = tempfile.mkstemp()
-        os.remove(out_path)
-        import time
-        start = time.time()
-        result = subprocess_run(["gcc", "-g", "-O0", "-o", out_path, src_path],
-                                capture_output=True, check=True, timeout=10, encoding="utf-8")
-        total = time.time()-start
-        if src_path.startswith("/tmp"):
-            # print(" ".join(["gcc", "-g", "-O0", "-o", out_path, src_path]))
-            # print(total)
-            with open(src_path, "r") as f:
-                src = f.read()
-            if "trace" in src and total > 1:
-                with open("tmp.c", "w") as f:
-                    f.write(src)
-        #     raise Exception()
-        assert result.returncode == 0
-        yield out_path
+        exe_path = compile_cached(["-g", "-O0"], src_path=src_path)
     except CalledProcessError as ex:
         print(ex.stdout)
         print(ex.stderr)
         raise
-    finally:
-        try:
-            os.remove(out_path)
-        except:
-            pass
+    yield exe_path
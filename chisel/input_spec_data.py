@@ -1,5 +1,8 @@
 from pathlib import Path
+from typing import Optional
+import functools
 import json
+import re
 
 from input_spec import InputSpec
 
@@ -188,125 +191,122 @@ INPUT_SPECS = {
 }
 
 
-BASIC_ALGORITHMS_DATA = [
-    ("random1.c", "randomFuns"),
-    ("anagram.c", "anagram"),
-    ("armstrong.c", "armstrong"),
-    ("binaryadd.c", "binaryadd"),
-    ("binarymult.c", "binarymult"),
-    ("binarysearch.c", "binarysearch"),
-    ("binarysearchrec.c", "binarysearchrec"),
-    ("bubblesort.c", "bubblesort"),
-    ("comparestrings.c", "comparestrings"),
-    ("concatstrings.c", "concatstrings"),
-    ("decimaltobinary.c", "1ints"),
-    ("decimaltohex.c", "1ints"),
-    ("decimaltooctal.c", "1ints"),
-    ("factorial.c", "1ints"),
-    ("factorialrec.c", "1ints"),
-    ("fib.c", "1ints"),
-    ("floyd.c", "1ints"),
-    ("frequency.c", "frequency"),
-    ("gcd.c", "2ints"),
-    ("gcdrec.c", "2ints"),
-    ("lcm.c", "2ints"),
-    ("linearsearch.c", "binarysearch"),
-    ("insertionsort.c", "bubblesort"),
-    ("mergesort.c", "mergesort"),
-    ("minmaxarray.c", "bubblesort"),
-    ("multtable.c", "1ints"),
-    ("perfect.c", "perfect"),
-    ("prime.c", "1ints"),
-    ("printinitials.c", "str_only"),
-    ("pyramid.c", "1ints"),
-    ("quicksort.c", "quicksort"),
-    ("random.c", "1ints"),
-    ("reverse.c", "alldigits"),
-    ("romannumerals.c", "alldigits"),
-    ("selectionsort.c", "bubblesort"),
-    ("stringtoASCII.c", "stringtoASCII"),
-    ("sumrec.c", "1ints"),
-    ("vowels.c", "str_only"),
-    ("numtowords.c", "alldigits"),
-    ("palindrome.c", "palindrome"),
-    ("iofile.c", "str_len"),
-    ("legacy", "legacy"),
-    ("bkdrhash.c", "simple-hash-functions"),
-    ("bphash.c", "simple-hash-functions"),
-    ("dekhash.c", "simple-hash-functions"),
-    ("djbhash.c", "simple-hash-functions"),
-    ("elfhash.c", "simple-hash-functions"),
-    ("fnvhash.c", "simple-hash-functions"),
-    ("jshash.c", "simple-hash-functions"),
-    ("pjwhash.c", "simple-hash-functions"),
-    ("rshash.c", "simple-hash-functions"),
-    ("sdbmhash.c", "simple-hash-functions"),
-    ("random2.c", "random2"),
-    ("nohash.c", "simple-hash-functions"),
+# input specs of benchmark programs (variants "<name>-NNN.c" of them use the same)
+BASIC_ALGORITHMS_INPUT_MAP = {
+    "random1.c": "randomFuns",
+    "anagram.c": "anagram",
+    "armstrong.c": "armstrong",
+    "binaryadd.c": "binaryadd",
+    "binarymult.c": "binarymult",
+    "binarysearch.c": "binarysearch",
+    "binarysearchrec.c": "binarysearchrec",
+    "bubblesort.c": "bubblesort",
+    "comparestrings.c": "comparestrings",
+    "concatstrings.c": "concatstrings",
+    "decimaltobinary.c": "1ints",
+    "decimaltohex.c": "1ints",
+    "decimaltooctal.c": "1ints",
+    "factorial.c": "1ints",
+    "factorialrec.c": "1ints",
+    "fib.c": "1ints",
+    "floyd.c": "1ints",
+    "frequency.c": "frequency",
+    "gcd.c": "2ints",
+    "gcdrec.c": "2ints",
+    "lcm.c": "2ints",
+    "linearsearch.c": "binarysearch",
+    "insertionsort.c": "bubblesort",
+    "mergesort.c": "mergesort",
+    "minmaxarray.c": "bubblesort",
+    "multtable.c": "1ints",
+    "perfect.c": "perfect",
+    "prime.c": "1ints",
+    "printinitials.c": "str_only",
+    "pyramid.c": "1ints",
+    "quicksort.c": "quicksort",
+    "random.c": "1ints",
+    "reverse.c": "alldigits",
+    "romannumerals.c": "alldigits",
+    "selectionsort.c": "bubblesort",
+    "stringtoASCII.c": "stringtoASCII",
+    "sumrec.c": "1ints",
+    "vowels.c": "str_only",
+    "numtowords.c": "alldigits",
+    "palindrome.c": "palindrome",
+    "iofile.c": "str_len",
+    "legacy": "legacy",
+    "bkdrhash.c": "simple-hash-functions",
+    "bphash.c": "simple-hash-functions",
+    "dekhash.c": "simple-hash-functions",
+    "djbhash.c": "simple-hash-functions",
+    "elfhash.c": "simple-hash-functions",
+    "fnvhash.c": "simple-hash-functions",
+    "jshash.c": "simple-hash-functions",
+    "pjwhash.c": "simple-hash-functions",
+    "rshash.c": "simple-hash-functions",
+    "sdbmhash.c": "simple-hash-functions",
+    "random2.c": "random2",
+    "nohash.c": "simple-hash-functions",
+}
+
+# random programs "<size>-<n>.c" (and their variants) use the inputs of their size
+SIZED = [5, 10, 15, 20, 30]
+SIZED_PATTERN = re.compile(r"(\d+)-\d+(-\d{3})?\.c")
+VARIANT_PATTERN = re.compile(r"(.+)-\d{3}\.c")
+AIS_PATHS = [
+    Path(__file__).parent / "small_programs_input.json",
+    Path(__file__).parent / "random_programs_input.json",
 ]
 
 
-def load_ais_small_programs():
-    AIS_PATH = Path(__file__).parent / "small_programs_input.json"
-    if not AIS_PATH.exists():
-        return {}
+@functools.lru_cache(maxsize=None)
+def _load_ais_inputs() -> dict[str, tuple[str, list]]:
+    """Returns raw inputs of programs in the AIS input files (name to (file name, inputs), loaded on first use)."""
+    ais = {}
+    for ais_path in AIS_PATHS:
+        if ais_path.exists():
+            with open(ais_path) as f:
+                ais.update((fn, (ais_path.name, inputs)) for fn, inputs in json.load(f).items())
+    return ais
 
-    with open(AIS_PATH) as f:
-        ais = json.load(f)
 
-    ais_result = {}
-    for fn, inputs in ais.items():
-        ais_result[fn] = [
+def _ais_input_specs(fn: str) -> list[InputSpec]:
+    ais_name, inputs = _load_ais_inputs()[fn]
+    if ais_name == "small_programs_input.json":
+        return [
             InputSpec.from_vals(len(inp), f"{{{', '.join(map(str, inp))}}}")
             for inp in inputs
         ]
-    return ais_result
+    return [
+        InputSpec.from_vals(inp, localStaticState=2)
+        for inp in inputs
+    ]
 
-def load_ais_random_programs():
-    AIS_PATH = Path(__file__).parent / "random_programs_input.json"
-    if not AIS_PATH.exists():
-        return {}
 
-    with open(AIS_PATH) as f:
-        ais = json.load(f)
-
-    ais_result = {}
-    for fn, inputs in ais.items():
-        ais_result[fn] = [
-            InputSpec.from_vals(inp, localStaticState=2)
-            for inp in inputs
-        ]
-    return ais_result
-        
-
-
-
-
-SIZED = [5, 10, 15, 20, 30]
-BASIC_ALGORITHMS_DATA += tuple(
-    (f"{k[:-2]}-{i:03d}.c", v) for k, v in BASIC_ALGORITHMS_DATA for i in range(10)
-)
-BASIC_ALGORITHMS_DATA += tuple(
-    (f"{i}-{j+1}.c", f"size-{i}") for i in SIZED for j in range(11)
-)
-BASIC_ALGORITHMS_DATA += tuple(
-    (f"{i}-{j+1}-{k:03d}.c", f"size-{i}")
-    for i in SIZED
-    for j in range(11)
-    for k in range(2)
-)
+def get_input_specs(src_name: str) -> Optional[list[InputSpec]]:
+    """ Resolves the inputs of a benchmark program from its file name.
 
-INPUT_SPECS.update(load_ais_small_programs())
-INPUT_SPECS.update(load_ais_random_programs())
+    Arguments:
+    src_name (str) -- file name of the (obfuscated) program, e.g., "fib-003.c"
 
-BASIC_ALGORITHMS_DATA += tuple(zip(INPUT_SPECS, INPUT_SPECS))
+    Returns:
+    input_specs ([InputSpec]) -- inputs to trace the program on (None if unknown)
+    """
+    variant = VARIANT_PATTERN.fullmatch(src_name)
+    base_name = variant[1] + ".c" if variant else None
 
-for is_key in INPUT_SPECS:
-    if not is_key.lower().endswith(".c"):
-        continue
-    
-    src_name = is_key.removesuffix(".c")
-    BASIC_ALGORITHMS_DATA += [(f"{src_name}-{_:03d}.c", is_key) for _ in range(10)]
+    ais = _load_ais_inputs()
+    for name in (base_name, src_name):
+        if name in ais:
+            return _ais_input_specs(name)
+    if src_name in INPUT_SPECS:
+        return INPUT_SPECS[src_name]
 
+    sized = SIZED_PATTERN.fullmatch(src_name)
+    if sized and int(sized[1]) in SIZED:
+        return INPUT_SPECS[f"size-{sized[1]}"]
 
-BASIC_ALGORITHMS_INPUT_MAP = dict(BASIC_ALGORITHMS_DATA)
+    for name in (src_name, base_name):
+        if name in BASIC_ALGORITHMS_INPUT_MAP:
+            return INPUT_SPECS[BASIC_ALGORITHMS_INPUT_MAP[name]]
+    return None
@@ -9,7 +9,7 @@ def inspect(args: Namespace):
     stats = load_from_bin("tmp.bin")
     # stats = load_from_bin(os.path.join("results", "manual", "flatten2.c.bin"))
 
-    # print(stats.formatter.format(stats.candidates[-1]))
+    # print(stats.candidates[-1])
     print(stats)
 
 if __name__ == "__main__":
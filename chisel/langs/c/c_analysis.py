@@ -2,7 +2,6 @@ from collections import defaultdict
 from dataclasses import replace
 from pycparser import c_ast, c_generator, c_parser
 import re
-import tempfile
 from typing import *
 
 from analysis import Analysis
@@ -236,17 +235,11 @@ class CAnalysis(Analysis):
             src: C source code.
 
         Returns:
-            AST of C source code.
+            AST of C source code (cached, so it must not be modified).
         """
-        from pycparser import parse_file as c_parse_file
+        from langs.c.c_parser import parse_c_code
 
-        with tempfile.NamedTemporaryFile() as f:
-            prog_with_header = HEADERS + "\n" + src
-            f.write(prog_with_header.encode())
-            f.flush()
-
-            ast = c_parse_file(f.name, use_cpp=True, cpp_args=r'-I./resources/fake_libc_include')
-            return ast
+        return parse_c_code(HEADERS + "\n" + src)
 
 
     def get_guards(self, ast: Any, traces: list[Trace]) -> list[TraceSource]:
@@ -0,0 +1,353 @@
+import os
+import re
+import select
+import shutil
+import subprocess
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import *
+
+from extractor.decl_extractor import FunctionSignature
+from extractor.utils import compile_cached
+from scratch import scratch_subdir
+from input_spec import InputSpec
+
+# Harness process: loads compiled programs (shared objects) and calls their `main` in a loop, so
+# running a program on an input costs a function call instead of compiling and spawning a process.
+# Commands are read from and responses written to the pipes given as arguments (stdin/stdout stay free for the program):
+#   "L <path>"                -- load shared object (unloading the previous one) => "O" or "E <error>"
+#   "R <n>" + n argument lines -- call main(n+1, argv) with stdout captured => "D <return value>"
+# A program that exits or crashes takes the harness down with it; the server then restarts it.
+HARNESS_SRC = r"""
+#define _GNU_SOURCE
+#include <dlfcn.h>
+#include <fcntl.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+#define MAX_LINE (1 << 16)
+
+static char line[MAX_LINE];
+
+static int read_line(FILE *in) {
+  if (!fgets(line, MAX_LINE, in)) return 0;
+  line[strcspn(line, "\n")] = 0;
+  return 1;
+}
+
+int main(int argc, char **argv) {
+  FILE *cmd = fdopen(atoi(argv[2]), "r");
+  FILE *resp = fdopen(atoi(argv[3]), "w");
+  int capture = open(argv[1], O_RDWR | O_CREAT | O_TRUNC, 0600);
+  int saved_stdout = dup(1);
+  void *lib = NULL;
+  int (*entry)(int, char **) = NULL;
+
+  while (read_line(cmd)) {
+    if (line[0] == 'L') {
+      if (lib) dlclose(lib);
+      entry = NULL;
+      lib = dlopen(line + 2, RTLD_NOW | RTLD_LOCAL);
+      if (lib) entry = (int (*)(int, char **))dlsym(lib, "main");
+      if (!entry) fprintf(resp, "E %s\n", lib ? "no main" : dlerror());
+      else fprintf(resp, "O\n");
+    } else if (line[0] == 'R') {
+      int n = atoi(line + 2);
+      char **args = calloc(n + 2, sizeof(char *));
+      args[0] = "prog";
+      for (int i = 1; i <= n && read_line(cmd); i++) args[i] = strdup(line);
+
+      fflush(stdout);
+      ftruncate(capture, 0);
+      lseek(capture, 0, SEEK_SET);
+      dup2(capture, 1);
+      int ret = entry(n + 1, args);
+      fflush(stdout);
+      dup2(saved_stdout, 1);
+
+      for (int i = 1; i <= n; i++) free(args[i]);
+      free(args);
+      fprintf(resp, "D %d\n", ret);
+    } else {
+      break;
+    }
+    fflush(resp);
+  }
+  return 0;
+}
+"""
+
+
+class ExecStatus(Enum):
+    OK = auto() # main returned
+    EXIT = auto() # program called exit
+    CRASH = auto() # program was killed by a signal (e.g., failed assertion)
+    TIMEOUT = auto()
+    LOAD_ERROR = auto() # program could not be loaded (e.g., undefined symbol), stdout holds the error
+
+
+@dataclass(frozen=True)
+class ExecResult:
+    status: ExecStatus
+    ret: Optional[int] # return value of main (or exit code)
+    stdout: str
+
+
+class ExecServer():
+    """Runs compiled C programs in a persistent harness process (restarted if a program exits, crashes or hangs)."""
+
+    def __init__(self, timeout: float = 1.0, cflags: Sequence[str] = ("-O0",), cache_dir: Optional[str] = None):
+        self.timeout = timeout
+        self.cflags = list(cflags)
+        self.work_dir = scratch_subdir(prefix="exec_")
+        self.cache_dir = cache_dir # compile cache directory (default is the shared compile cache)
+        self.capture_path = os.path.join(self.work_dir, "stdout")
+        self.harness_path = None
+        self.proc = None
+        self.loaded = None # path of currently loaded shared object
+
+    def __enter__(self) -> "ExecServer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _start(self):
+        if self.harness_path is None:
+            src_path = os.path.join(self.work_dir, "harness.c")
+            with open(src_path, "w") as f:
+                f.write(HARNESS_SRC)
+            self.harness_path = os.path.join(self.work_dir, "harness")
+            # programs are linked against the harness's libraries, so those commonly used must be loaded
+            subprocess.run(["gcc", "-O2", "-o", self.harness_path, src_path, "-ldl", "-Wl,--no-as-needed", "-lm"],
+                           check=True, capture_output=True, timeout=30)
+
+        cmd_r, cmd_w = os.pipe()
+        resp_r, resp_w = os.pipe()
+        self.proc = subprocess.Popen([self.harness_path, self.capture_path, str(cmd_r), str(resp_w)],
+                                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                     pass_fds=(cmd_r, resp_w))
+        os.close(cmd_r)
+        os.close(resp_w)
+        self.cmd = os.fdopen(cmd_w, "w")
+        self.resp = os.fdopen(resp_r, "r")
+        self.loaded = None
+
+    def _stop(self):
+        if self.proc is None:
+            return
+        for f in (self.cmd, self.resp):
+            try:
+                f.close()
+            except OSError:
+                pass
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc = None
+        self.loaded = None
+
+    def close(self):
+        """Stops the harness and removes its files (compiled programs stay in the compile cache)."""
+        self._stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def compile(self, src: str) -> Optional[str]:
+        """ Compiles a C program into a shared object that can be run (compiled once per distinct source).
+
+        Arguments:
+        src (str) -- C program (with a main function)
+
+        Returns:
+        so_path (str) -- path to shared object (None if compilation failed)
+        """
+        try:
+            return compile_cached(self.cflags + ["-shared", "-fPIC"], src=src, cache_dir=self.cache_dir)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            return None
+
+    def _request(self, lines: List[str]) -> Optional[str]:
+        """Sends command lines to the harness and waits for its response (None if it died or timed out)."""
+        try:
+            self.cmd.write("".join(l + "\n" for l in lines))
+            self.cmd.flush()
+        except BrokenPipeError:
+            return None
+        ready, _, _ = select.select([self.resp], [], [], self.timeout)
+        if not ready:
+            return None
+        return self.resp.readline().rstrip("\n") or None
+
+    def _exit_code(self) -> Optional[int]:
+        """Returns exit code of harness if it terminated (None if it is still running, i.e., hangs)."""
+        try:
+            return self.proc.wait(timeout=0.1)
+        except subprocess.TimeoutExpired:
+            return None
+
+    def _read_stdout(self) -> str:
+        with open(self.capture_path, "r", errors="replace") as f:
+            return f.read()
+
+    def run(self, so_path: str, args: Sequence[Any], fresh: bool = False) -> ExecResult:
+        """ Runs main of a compiled program.
+
+        Arguments:
+        so_path (str) -- shared object (from compile)
+        args ([Any]) -- command line arguments
+        fresh (bool) -- reload program first, resetting its global variables
+
+        Returns:
+        result (ExecResult) -- how the program terminated and what it printed
+        """
+        if any("\n" in str(a) for a in args):
+            raise ValueError("Arguments must not contain newlines")
+
+        if self.proc is None or self.proc.poll() is not None:
+            self._stop()
+            self._start()
+        if fresh or self.loaded != so_path:
+            res = self._request(["L {}".format(so_path)])
+            if res is None or not res.startswith("O"):
+                self._stop()
+                return ExecResult(ExecStatus.LOAD_ERROR, None, res[2:] if res is not None else "load timed out")
+            self.loaded = so_path
+
+        res = self._request(["R {}".format(len(args))] + [str(a) for a in args])
+        if res is not None and res.startswith("D "):
+            return ExecResult(ExecStatus.OK, int(res[2:]), self._read_stdout())
+
+        # harness is gone (program exited or crashed) or hung
+        code = self._exit_code()
+        self._stop()
+        if code is None:
+            return ExecResult(ExecStatus.TIMEOUT, None, "")
+        if code < 0:
+            return ExecResult(ExecStatus.CRASH, None, self._read_stdout())
+        return ExecResult(ExecStatus.EXIT, code, self._read_stdout())
+
+
+IO_RET_MARKER = "__CHISEL_RET__"
+
+# printf conversion (and cast) for return values by type
+RET_FORMATS = {
+    "char": ("%d", "int"),
+    "short": ("%d", "int"),
+    "int": ("%d", "int"),
+    "long": ("%ld", "long"),
+    "long int": ("%ld", "long"),
+    "long long": ("%lld", "long long"),
+    "unsigned char": ("%u", "unsigned int"),
+    "unsigned int": ("%u", "unsigned int"),
+    "unsigned long": ("%lu", "unsigned long"),
+    "unsigned long int": ("%lu", "unsigned long"),
+    "unsigned long long int": ("%llu", "unsigned long long"),
+    "size_t": ("%zu", "size_t"),
+    "int32_t": ("%d", "int"),
+    "uint32_t": ("%u", "unsigned int"),
+    "bool": ("%d", "int"),
+    "_Bool": ("%d", "int"),
+    "float": ("%.9g", "double"),
+    "double": ("%.17g", "double"),
+    "char *": ("%s", "const char *"),
+}
+
+# (no includes: obfuscated programs are often preprocessed and redefine system types)
+IO_DRIVER_TEMPLATE = """#define main chisel_program_main
+{src}
+#undef main
+
+int printf(const char *, ...);
+int atoi(const char *);
+
+int main(int argc, char **argv) {{
+  switch (atoi(argv[1])) {{
+{cases}
+  default:
+    return 2;
+  }}
+  return 0;
+}}
+"""
+
+
+def _build_io_case(idx: int, func_name: str, signature: FunctionSignature, input_: InputSpec) -> str:
+    decls, outs, call_args = [], [], []
+    for i, (param, val) in enumerate(zip(signature.params, input_.args)):
+        name = "arg_{}".format(i)
+        val = str(val)
+        if val.startswith("{") or val.startswith('"'):
+            # array (or string) argument -- printed after the call as the function may modify it
+            elem_type = re.sub(r"\[.*?\]|\*", "", param.type).strip()
+            decls.append("{} {}[] = {};".format(elem_type, name, val))
+            if elem_type == "char":
+                outs.append('printf("%s\\n", {});'.format(name))
+            else:
+                outs.append('for (int i = 0; i < (int)(sizeof({0}) / sizeof({0}[0])); i++) printf("%lld ", (long long){0}[i]); printf("\\n");'.format(name))
+        else:
+            decls.append("{} {} = {};".format(param.type, name, val))
+        call_args.append(name)
+
+    call = "{}({})".format(func_name, ", ".join(call_args))
+    fmt = RET_FORMATS.get(signature.return_type)
+    if fmt is None and "*" not in signature.return_type and "struct" not in signature.return_type:
+        fmt = ("%lld", "long long") # other integral types
+    if signature.return_type == "void" or fmt is None:
+        ret = "{};".format(call)
+    else:
+        ret = 'printf("\\n{}{}\\n", ({}){});'.format(IO_RET_MARKER, fmt[0], fmt[1], call)
+
+    body = "\n".join("    " + l for l in decls + [ret] + outs)
+    return "  case {}: {{\n{}\n    break;\n  }}".format(idx, body)
+
+
+def build_io_driver(src: str, func_name: str, signature: FunctionSignature, inputs: List[InputSpec]) -> str:
+    """ Builds a program that calls the given function on one of the inputs (selected by argv[1]) and prints
+    its output, return value and final array arguments.
+
+    Arguments:
+    src (str) -- C program defining the function (a main function in it is renamed)
+    func_name (str) -- name of function to call
+    signature (FunctionSignature) -- signature of function
+    inputs ([InputSpec]) -- inputs (C expressions for each argument)
+
+    Returns:
+    driver (str) -- driver program
+    """
+    cases = [_build_io_case(i, func_name, signature, input_) for i, input_ in enumerate(inputs)]
+    return IO_DRIVER_TEMPLATE.format(src=src, cases="\n".join(cases))
+
+
+def check_io(server: ExecServer, orig_src: str, orig_func: str, sol_src: str, sol_func: str,
+             signature: FunctionSignature, inputs: List[InputSpec]) -> Optional[List[int]]:
+    """ Runs the original and deobfuscated programs on each input and compares their outputs.
+
+    Arguments:
+    server (ExecServer) -- server to run programs with
+    orig_src (str) -- original (obfuscated) program
+    orig_func (str) -- name of obfuscated function
+    sol_src (str) -- deobfuscated program
+    sol_func (str) -- name of deobfuscated function
+    signature (FunctionSignature) -- signature of both functions
+    inputs ([InputSpec]) -- inputs to compare on
+
+    Returns:
+    mismatches ([int]) -- indices of inputs with different results (None if a program does not compile or load)
+    """
+    orig_so = server.compile(build_io_driver(orig_src, orig_func, signature, inputs))
+    sol_so = server.compile(build_io_driver(sol_src, sol_func, signature, inputs))
+    if orig_so is None or sol_so is None:
+        return None
+
+    mismatches = []
+    for i in range(len(inputs)):
+        expected = server.run(orig_so, [i], fresh=True)
+        actual = server.run(sol_so, [i], fresh=True)
+        if ExecStatus.LOAD_ERROR in (expected.status, actual.status):
+            return None
+        if expected != actual:
+            mismatches.append(i)
+    return mismatches
@@ -7,6 +7,7 @@ from grammar import SOURCE_GUARD_NAME, SOURCE_STMT_NAME
 from program import *
 from trace import Trace
 from utils import cached_format
+from profiling import profiled
 
 default_val = {
     "string": '""',
@@ -258,7 +259,24 @@ class CFormatter(Formatter):
 
 
 
+    def format_function(self, prog: Program, func_name: str="DEOBF_FUNC") -> str:
+        """ Formats the given complete program as a standalone C function (with headers, but no main).
+
+        Arguments:
+        prog (Program) -- complete program to be formatted
+        func_name (str) -- name of function
+
+        Returns:
+        result (str) -- string resulting from formatting
+        """
+        body = self.format(prog, only_body=True)
+        params_decl = ", ".join([p.decl for p in prog.signature.params])
+        deobf_func_str = cached_format(DEOBF_FUNC_TEMPLATE, return_type=prog.signature.return_type,
+                                       func_name=func_name, params_decl=params_decl, body=body)
+        return headers + str(deobf_func_str)
+
     # pylint: disable=arguments-differ
+    @profiled("formatting")
     def format(self, prog: Program, trace: Trace=None,
                ret_val: str=None, unk: str=None, throw: bool=False,
                only_body: bool=False, precomp: bool=False) -> str:
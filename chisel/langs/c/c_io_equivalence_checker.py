@@ -6,6 +6,7 @@ from langs.c.c_runner import CRunner
 from program import Program
 from stats import Stats
 from trace import Trace
+from profiling import profiled
 
 class CIOEquivalenceChecker():
     """Parent class for equivalence checking."""
@@ -15,6 +16,7 @@ class CIOEquivalenceChecker():
         self.formatter = CFormatter()
         self.idx = 0
 
+    @profiled("verification")
     def check_eq(self, p1: Program, p2_path: str, traces: List[Trace], inputs: List[Any], stats: Stats) -> bool:
         """ Checks if two programs are equivalent.
 
@@ -31,6 +33,7 @@ class CIOEquivalenceChecker():
                 return False
         return True
     
+    @profiled("verification_pruning")
     def check_eq_pruning(self, p1: Program, traces: List[Trace]) -> set[str] | None:
         result_vars = set()
         for ins, trace in enumerate(traces):
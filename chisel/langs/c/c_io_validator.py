@@ -0,0 +1,162 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import *
+
+from extractor.decl_extractor import FunctionSignature
+from extractor.input_generator import C_TYPE_RANGES, generate_examples
+from input_spec import InputSpec
+from langs.c.c_exec_server import ExecResult, ExecServer, ExecStatus, build_io_driver
+
+MAX_REPORTED_MISMATCHES = 10 # number of mismatching inputs reported in detail
+
+
+def _literal_len(val: str) -> Optional[int]:
+    """Returns number of elements of an array/string literal (None if val is not one)."""
+    val = val.strip()
+    if val.startswith('"') and val.endswith('"'):
+        return len(val) - 2
+    if val.startswith("{") and val.endswith("}"):
+        inner = val[1:-1].strip()
+        return inner.count(",") + 1 if inner else 0
+    return None
+
+
+@dataclass
+class ValidationResult:
+    num_inputs: int = 0 # inputs compared
+    num_skipped: int = 0 # inputs the obfuscated program itself fails on (crash/timeout/nondeterministic result)
+    mismatches: list[dict[str, Any]] = field(default_factory=list) # first mismatching inputs with both results
+    num_mismatches: int = 0
+    error: Optional[str] = None # set if validation could not be run
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "Inputs": self.num_inputs,
+            "Skipped": self.num_skipped,
+            "Mismatches": self.num_mismatches,
+            "Mismatch Examples": self.mismatches,
+            "Error": self.error,
+        }
+
+
+class CIOValidator():
+    """Differential testing of a deobfuscated program against the obfuscated one on many generated inputs."""
+
+    def __init__(self, num_inputs: int = 200, workers: int = 4, timeout: float = 1.0, cache_dir: Optional[str] = None):
+        self.num_inputs = num_inputs
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+
+    def generate_inputs(self, signature: FunctionSignature, seed_inputs: List[InputSpec], seed: int = 0) -> List[InputSpec]:
+        """ Generates inputs by varying scalar arguments of the given inputs.
+
+        Array/string arguments (and scalars that hold their length) are taken from the given inputs, as
+        their sizes have to stay consistent; other scalars of supported types are drawn with generate_examples.
+
+        Arguments:
+        signature (FunctionSignature) -- signature of function
+        seed_inputs ([InputSpec]) -- known valid inputs (e.g., the trace inputs)
+        seed (int) -- random seed for combining values
+
+        Returns:
+        inputs ([InputSpec]) -- seed inputs followed by generated ones (up to num_inputs in total)
+        """
+        rng = random.Random(seed)
+        inputs = list(seed_inputs)[:self.num_inputs]
+        if not seed_inputs:
+            return inputs
+
+        lengths = [{_literal_len(str(v)) for v in s.args} - {None} for s in seed_inputs]
+        has_arrays = any(lengths)
+        varied = {}
+        for i, param in enumerate(signature.params):
+            if param.type not in C_TYPE_RANGES:
+                continue
+            if all(len(s.args) > i and str(s.args[i]).lstrip("-").isdigit() and int(s.args[i]) in lens
+                   for s, lens in zip(seed_inputs, lengths)):
+                continue # length of an array argument
+            values = generate_examples(param.type, self.num_inputs)
+            if has_arrays:
+                # scalars next to arrays are often indices, negative ones would just read out of bounds
+                values = {v for v in values if v >= 0}
+            if values:
+                varied[i] = sorted(values)
+        if not varied:
+            return inputs
+
+        seen = {tuple(map(str, s.args)) for s in inputs}
+        for _ in range(self.num_inputs * 4):
+            if len(inputs) >= self.num_inputs:
+                break
+            base = rng.choice(seed_inputs)
+            args = tuple(str(rng.choice(varied[i])) if i in varied else str(a) for i, a in enumerate(base.args))
+            if args not in seen:
+                seen.add(args)
+                inputs.append(InputSpec(args, base.array_size_map))
+        return inputs
+
+    def validate(self, orig_src: str, orig_func: str, sol_src: str, sol_func: str,
+                 signature: FunctionSignature, seed_inputs: List[InputSpec]) -> ValidationResult:
+        """ Runs the obfuscated and deobfuscated programs on generated inputs and compares their outputs.
+
+        Arguments:
+        orig_src (str) -- original (obfuscated) program
+        orig_func (str) -- name of obfuscated function
+        sol_src (str) -- deobfuscated program
+        sol_func (str) -- name of deobfuscated function
+        signature (FunctionSignature) -- signature of both functions
+        seed_inputs ([InputSpec]) -- known valid inputs (e.g., the trace inputs)
+
+        Returns:
+        result (ValidationResult) -- comparison summary
+        """
+        inputs = self.generate_inputs(signature, seed_inputs)
+
+        servers = [ExecServer(timeout=self.timeout, cache_dir=self.cache_dir) for _ in range(self.workers)]
+        try:
+            # one driver per program containing all inputs, compiled once and shared by all servers
+            orig_so = servers[0].compile(build_io_driver(orig_src, orig_func, signature, inputs))
+            if orig_so is None:
+                return ValidationResult(error="obfuscated program does not compile")
+            sol_so = servers[0].compile(build_io_driver(sol_src, sol_func, signature, inputs))
+            if sol_so is None:
+                return ValidationResult(error="deobfuscated program does not compile")
+
+            def run_chunk(w: int) -> List[Tuple[int, ExecResult, ExecResult, ExecResult]]:
+                # obfuscated program runs twice to detect inputs with nondeterministic results
+                return [(i, servers[w].run(orig_so, [i], fresh=True), servers[w].run(orig_so, [i], fresh=True),
+                         servers[w].run(sol_so, [i], fresh=True))
+                        for i in range(w, len(inputs), self.workers)]
+
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    runs = sorted((r for chunk in executor.map(run_chunk, range(self.workers)) for r in chunk), key=lambda r: r[0])
+            except Exception as e:
+                # raised in a worker thread (e.g., the harness cannot be built)
+                return ValidationResult(error="running programs failed: {}: {}".format(type(e).__name__, e))
+        finally:
+            for server in servers:
+                server.close()
+
+        for name, r in (("obfuscated", runs[0][1]), ("deobfuscated", runs[0][3])) if runs else ():
+            if r.status == ExecStatus.LOAD_ERROR:
+                return ValidationResult(error="{} program does not load: {}".format(name, r.stdout))
+
+        res = ValidationResult()
+        for i, expected, expected_again, actual in runs:
+            if expected.status in (ExecStatus.CRASH, ExecStatus.TIMEOUT) or expected != expected_again:
+                # not a valid input for the obfuscated program
+                res.num_skipped += 1
+                continue
+            res.num_inputs += 1
+            if expected != actual:
+                res.num_mismatches += 1
+                if len(res.mismatches) < MAX_REPORTED_MISMATCHES:
+                    res.mismatches.append({
+                        "Input": list(inputs[i].args),
+                        "Expected": [expected.status.name, expected.stdout],
+                        "Actual": [actual.status.name, actual.stdout],
+                    })
+        return res
@@ -1,20 +1,104 @@
 from typing import *
 
-import tempfile
+import functools
+import hashlib
+import logging
 import os
+import pickle
+import shlex
+import subprocess
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
 
+import pycparser
 from langs.parser import Parser
-from pycparser import parse_file
+from pycparser import c_ast, c_parser
 
 from langs.c.c_preprocessor import CPreprocessor
 
+CPP_ARGS = r"-I./resources/fake_libc_include"
+AST_CACHE_PATH = Path(".ast_cache")
+MAX_MEMORY_CACHE_SIZE = 16 # number of ASTs kept in memory (they can be large for obfuscated programs)
+
+_ast_cache : "OrderedDict[str, c_ast.FileAST]" = OrderedDict()
+
+
+def _load_cached_ast(path: Path) -> Optional[c_ast.FileAST]:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable AST cache entry {path}: {e}")
+        return None
+
+
+def _store_cached_ast(path: Path, ast: c_ast.FileAST):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(ast, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # atomic, so concurrent readers never see partially written entries
+        os.replace(tmp_path, path)
+    except RecursionError:
+        logging.warning(f"AST too deep to cache on disk: {path}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _pyc_parser() -> c_parser.CParser:
+    """Returns the parser shared by parse_c_code calls of this process (created once, as building its tables is slow)."""
+    return c_parser.CParser()
+
+
+def preprocess_c_code(code: str, cpp_args: str = CPP_ARGS) -> str:
+    """Runs the C preprocessor on code (passed through pipes, not files) and returns its output."""
+    return subprocess.run(["cpp", *shlex.split(cpp_args), "-"], input=code, stdout=subprocess.PIPE,
+                          check=True, encoding="utf-8").stdout
+
+
+def parse_c_code(code: str, cpp_args: str = CPP_ARGS, cache_dir: Optional[Path] = None) -> c_ast.FileAST:
+    """ Parses C code (run through the C preprocessor) into an AST, parsing each distinct code only once.
+
+    Arguments:
+    code (str) -- C code
+    cpp_args (str) -- C preprocessor arguments
+    cache_dir (Path) -- directory to also cache ASTs in across runs (default None, i.e., in memory only)
+
+    Returns:
+    ast (FileAST) -- AST of the code (shared by all callers, so it must not be modified)
+    """
+    key = hashlib.sha256("\0".join([pycparser.__version__, cpp_args, code]).encode("utf-8")).hexdigest()
+    ast = _ast_cache.get(key)
+    if ast is not None:
+        _ast_cache.move_to_end(key)
+        return ast
+
+    cache_path = Path(cache_dir) / key[:2] / key if cache_dir is not None else None
+    if cache_path is not None:
+        ast = _load_cached_ast(cache_path)
+    if ast is None:
+        ast = _pyc_parser().parse(preprocess_c_code(code, cpp_args))
+        if cache_path is not None:
+            _store_cached_ast(cache_path, ast)
+
+    _ast_cache[key] = ast
+    if len(_ast_cache) > MAX_MEMORY_CACHE_SIZE:
+        _ast_cache.popitem(last=False)
+    return ast
 
 
 class CParser(Parser):
     """Class for parsing C."""
 
-    def __init__(self) -> None:
+    def __init__(self, cache_dir: Optional[Path] = None) -> None:
         self.preprocessor = CPreprocessor()
+        self.cache_dir = cache_dir # on-disk AST cache (see parse_c_code)
         super().__init__()
 
     def parse(self, src_path: str) -> Any:
@@ -23,11 +107,4 @@ class CParser(Parser):
             code_lines = f.readlines()
         self.preprocessor._remove_tigress_jumptab(code_lines)
 
-        fh, file_name = tempfile.mkstemp(suffix=".c")
-        try:
-            os.write(fh, "".join(code_lines).encode())
-            os.close(fh)
-            ast = parse_file(file_name, use_cpp=True, cpp_args=r"-I./resources/fake_libc_include")
-        finally:
-            os.remove(file_name)
-        return ast
+        return parse_c_code("".join(code_lines), cache_dir=self.cache_dir)
@@ -5,7 +5,6 @@ import time
 from typing import *
 
 from extractor.utils import compile_c_program
-from paths import TMP_PATH
 from program import Node, Program, UnknownNode, ValueNode, GuardCompositionType, DummyNode
 from runners import (
     Runner,
@@ -16,6 +15,8 @@ from runners import (
 from utils import statement_is_break, statement_is_return
 from trace import Trace, TraceSourceKind
 from dataclasses import dataclass, replace
+from profiling import profiled
+from scratch import scratch_file
 
 @dataclass(frozen=True, eq=False, order=False)
 class TraceRunnerState:
@@ -119,13 +120,15 @@ class CRunner(Runner):
         Returns:
         check (bool) -- whether or not it completed
         """
-        tmp_path = os.path.join(TMP_PATH, "tmp.{}".format("c" if typ == "c" else "cpp"))
+        # unique names, as several runners may be active (the program includes trace headers
+        # from the scratch directory by name)
+        tmp_path = scratch_file(suffix=".c" if typ == "c" else ".cpp")
+        exec_path = scratch_file(suffix=".out")
         with open(tmp_path, "w") as f:
             f.write(prog)
         try:
             # Compile program
             compile_start = time.time()
-            exec_path = os.path.join(TMP_PATH, "a.out")
             if typ == "c":
                 g_cmd = "tcc {} {} -o {}".format(opath, tmp_path, exec_path)
             elif typ == "cpp":
@@ -143,7 +146,7 @@ class CRunner(Runner):
 
             # Run program
             exec_start = time.time()
-            exec_cmd = "./{} {}".format(exec_path, ins[0])
+            exec_cmd = "{} {}".format(exec_path, ins[0])
             ret_val = subprocess.call(
                 exec_cmd.split(), stderr=subprocess.DEVNULL, timeout=5
             )
@@ -158,6 +161,10 @@ class CRunner(Runner):
             return False
         except subprocess.TimeoutExpired as e:
             return False  # TODO: Should I really return False here?
+        finally:
+            for path in (tmp_path, exec_path):
+                if os.path.exists(path):
+                    os.remove(path)
 
         return True
 
@@ -176,9 +183,11 @@ class CRunner(Runner):
         res = self.trace_run_check(prog, ins, trace, allow_var_pruning)
         return res[0] and not res[1]
 
+    @profiled("trace_run")
     def trace_run_check(
-        self, prog: Program, ins: List[Any], trace: Trace, allow_var_pruning: bool, allow_unk: bool = False, ret_state: bool = False
-    ) -> Tuple[bool, bool, set[str] | None]:
+        self, prog: Program, ins: List[Any], trace: Trace, allow_var_pruning: bool, allow_unk: bool = False, ret_state: bool = False,
+        ret_trace_index: bool = False
+    ) -> Tuple[bool, bool, set[str] | None] | Tuple[bool, bool, set[str] | None, int, int | None]:
         """Runs program and returns true if prog runs and false if it has assertion error.
         Uses trace to execute program.
 
@@ -187,12 +196,21 @@ class CRunner(Runner):
         ins ([Any]) -- input values
         trace (Trace) -- source program trace
         ret_state (bool) -- option to return final state if found (and not last state)
+        ret_trace_index (bool) -- option to also return index of last trace item matched and unknown reached
 
         Returns:
         check (bool) -- whether or not it is safe
         check (bool) -- whether or not it completed the whole trace
         pruned_vars (set[str]) -- set of pruned variables if allow_var_pruning is True
+        trace_index (int) -- index of last trace item matched (only if ret_trace_index is True)
+        unknown_id (int | None) -- id of unknown execution stopped at, if any (only if ret_trace_index is True)
         """
+        res = self._trace_run_check(prog, trace, allow_var_pruning, allow_unk)
+        return res if ret_trace_index else res[:3]
+
+    def _trace_run_check(
+        self, prog: Program, trace: Trace, allow_var_pruning: bool, allow_unk: bool
+    ) -> Tuple[bool, bool, set[str] | None, int, int | None]:
         try:
             pruned_vars: set[str] | None = set() if allow_var_pruning else None
             state = TraceRunnerState(state=trace.items[0].pre_state.copy(), pruned_variables=pruned_vars)
@@ -203,20 +221,43 @@ class CRunner(Runner):
                 state.trace_index >= 0 and \
                     not statement_is_return(trace.items[-1].source.src):
                 completed = True
-            return True, completed, pruned_vars
+            return True, completed, pruned_vars, state.trace_index, None
         except TraceIdxNotFoundException as e:
-            return False, False, pruned_vars
+            return False, False, pruned_vars, -1, None
         except UnknownEncounterException as e:
-            return True, False, pruned_vars
+            return True, False, pruned_vars, e.trace_index, e.node_id
         except TraceEndException as e:
-            return True, True, pruned_vars
+            return True, True, pruned_vars, len(trace) - 1, None
+
+    @staticmethod
+    def next_trace_codes(trace: Trace, trace_index: int) -> Optional[set[str]]:
+        """ Returns codes which can match a trace item after the given index.
+
+        Any later item can match, not only the next one, as execute_node skips items which do not match
+        (e.g., dead code removed by variable pruning).
+
+        Arguments:
+        trace (Trace) -- source program trace
+        trace_index (int) -- index of last trace item matched
+
+        Returns:
+        codes (set[str]) -- codes of remaining trace items (None if the trace is exhausted)
+        """
+        if trace_index >= len(trace) - 1:
+            return None
+        codes = set()
+        for source in trace.sources[trace_index + 1:]:
+            codes.add(source.src)
+            if source.kind == TraceSourceKind.GUARD and source.src[0] == "!":
+                codes.add(source.src[1:].strip("() "))
+        return codes
 
     def execute_node(
         self, prog: Program, trace: Trace, node: Node, state: TraceRunnerState, allow_unknown: bool
     ) -> TraceRunnerState:
         if isinstance(node, UnknownNode):
             if not allow_unknown:
-                raise UnknownEncounterException()
+                raise UnknownEncounterException(state.trace_index, node.id)
             else:
                 return state
 
@@ -1,8 +1,10 @@
 import time
+from collections import Counter
 from typing import *
 
 from args import get_cline_args
 from extractor.utils import compile_c_program
+from input_spec import InputSpec
 from langs.c.c_formatter import CFormatter
 from langs.c.c_runner import CRunner
 from program import Program
@@ -10,6 +12,7 @@ from pruners import Pruner
 from stats import Stats
 from trace import Trace
 from utils import statement_is_return
+from profiling import profiled
 
 class CTracePruner(Pruner):
     """Checker for trace property on C programs."""
@@ -19,7 +22,48 @@ class CTracePruner(Pruner):
         self.formatter = CFormatter()
         self.cache = {}
         self.idx = 0
+        self.trace_orders = {} # hole (trace ids) -> order in which traces are checked
+        self.rejections = Counter() # input arguments -> number of candidates rejected by trace over session
 
+    @staticmethod
+    def _input_args(ins: Any) -> Tuple[str, ...]:
+        # inputs are InputSpecs, or argument values (e.g., for the enumerative deobfuscator)
+        return tuple(map(str, ins.args if isinstance(ins, InputSpec) else ins))
+
+    def trace_order(self, traces: List[Trace], inputs: List[Any]) -> List[int]:
+        """ Returns order in which to check traces for the current hole.
+
+        A new hole starts with the traces which rejected the most candidates so far in the session.
+
+        Arguments:
+        traces ([Trace]) -- list of traces of hole
+        inputs ([Any]) -- list of inputs
+
+        Returns:
+        order ([int]) -- indices into traces/inputs (traces without inputs are not checked, as before)
+        """
+        key = tuple(trace.trace_id for trace in traces)
+        if key not in self.trace_orders:
+            self.trace_orders[key] = sorted(range(min(len(traces), len(inputs))),
+                                            key=lambda i: -self.rejections[self._input_args(inputs[i])])
+        return self.trace_orders[key]
+
+    def record_rejection(self, order: List[int], pos: int, ins: Any, stats: Stats):
+        """ Moves the rejecting trace to the front of the hole's order and updates rejection counts.
+
+        Arguments:
+        order ([int]) -- order of traces for hole (modified in place)
+        pos (int) -- position of rejecting trace in order
+        ins (Any) -- input of rejecting trace
+        stats (Stats) -- object to track statistics
+        """
+        if pos > 0:
+            order.insert(0, order.pop(pos))
+        args = self._input_args(ins)
+        self.rejections[args] += 1
+        stats.trace_rejection_counts[", ".join(args)] += 1
+
+    @profiled("pruning")
     def prune(self, p1: Program, p2_path: str, traces: List[Trace], inputs: List[Any], stats: Stats, allow_return: bool=False) -> bool:
         """ Checks if the partial program can be pruned.
 
@@ -39,18 +83,25 @@ class CTracePruner(Pruner):
         check (bool) -- true if should be pruned, false otherwise
         """
         prune_start = time.time()
-        cache_key = str(p1)
+        p1.trace_stops = None
+        cache_key = p1.key()
         if cache_key in self.cache:
             stats.num_trace_pruned_cached += 1
             if self.cache[cache_key]:
                 stats.num_trace_pruned += 1
-                stats.trace_pruned.append(p1)
+                stats.sample(stats.trace_pruned, p1)
                 return True
             else:
                 return False
-        for ins, trace in zip(inputs, traces):
+        order = self.trace_order(traces, inputs)
+        depth = 1.0
+        stops = {}
+        for pos, i in enumerate(order):
+            ins, trace = inputs[i], traces[i]
             try:
-                safe, complete, _ = self.runner.trace_run_check(p1, ins, trace, allow_var_pruning=True)
+                safe, complete, _, trace_idx, unk_id = self.runner.trace_run_check(p1, ins, trace, allow_var_pruning=True, ret_trace_index=True)
+                depth = min(depth, (trace_idx + 1) / max(1, len(trace)))
+                stops[i] = (trace_idx, unk_id)
                 if not safe:
                     succeed = False
                 else:
@@ -62,15 +113,18 @@ class CTracePruner(Pruner):
                 succeed = False # NOTE: Prune syntax errors?
 
             if not succeed:
+                self.record_rejection(order, pos, ins, stats)
                 self.cache[cache_key] = True
                 stats.num_trace_pruned += 1
-                stats.trace_pruned.append(p1)
-                stats.trace_pruned_times.append(time.time()-prune_start)
+                stats.sample(stats.trace_pruned, p1)
+                stats.trace_pruned_times.add(time.time()-prune_start)
                 stats.num_trace_pruned_assert += 1
-                stats.trace_pruned_assert.append(p1)
-                stats.trace_pruned_assert_times.append(time.time()-prune_start)
+                stats.sample(stats.trace_pruned_assert, p1)
+                stats.trace_pruned_assert_times.add(time.time()-prune_start)
 
                 return True
         self.cache[cache_key] = False
+        p1.trace_depth = depth # feedback for search model
+        p1.trace_stops = stops # reused to filter expansions of the next unknown
         return False
 
@@ -5,5 +5,3 @@ MANUAL_RESULTS_PATH = os.path.join(RESULTS_PATH, "manual")
 
 BENCHMARKS_PATH = "benchmarks"
 MANUAL_BENCHMARKS_PATH = os.path.join(BENCHMARKS_PATH, "manual")
-
-TMP_PATH = ".tmp"
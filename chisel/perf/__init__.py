@@ -0,0 +1,15 @@
+"""Benchmark suite for the synthesis engine.
+
+Run from the chisel directory:
+
+    python -m perf micro [--src PROGRAM.c ... | --bundle BUNDLE ...] [--out micro.json]
+    python -m perf macro [--input_dir DIR] [--out macro.json]
+    python -m perf startup [--budget SEC] [--out startup.json]
+    python -m perf compare BASE.json NEW.json [--threshold 0.1]
+
+Micro-benchmarks time hot synthesis routines on fixed traces (loaded from trace bundles or the
+trace cache, so GDB is only needed the first time a program is used); macro-benchmarks run the whole
+pipeline over benchmark programs; startup benchmarks time fresh interpreters until synthesis can
+start, and fail if over the cold-start budget. All write results in the same JSON format, so results
+from two commits can be compared with `compare`.
+"""
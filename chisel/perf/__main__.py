@@ -0,0 +1,123 @@
+import logging
+import random
+import shlex
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from tabulate import tabulate
+
+from args import get_cline_args
+from perf.results import compare, load_results, write_results
+
+DEFAULT_MICRO_SRCS = [
+    Path("benchmarks/obfuscated/obfus1/basic-algorithms/binarysearch-000.c"),
+    Path("benchmarks/obfuscated/obfus1/basic-algorithms/armstrong-000.c"),
+]
+DEFAULT_MACRO_DIR = Path("benchmarks/obfuscated/obfus1/basic-algorithms")
+
+
+def micro(args):
+    if args.src is None:
+        args.src = [] if args.bundle else DEFAULT_MICRO_SRCS
+    # synthesis components read global command line arguments
+    get_cline_args(["--seed", str(args.seed), str((args.src or args.bundle)[0])])
+    random.seed(args.seed)
+
+    from perf.micro import MICRO_BENCHMARKS, load_workload, run_micro
+
+    names = args.bench or list(MICRO_BENCHMARKS)
+    for name in names:
+        if name not in MICRO_BENCHMARKS:
+            sys.exit("Unknown micro-benchmark '{}' -- options are {}".format(name, set(MICRO_BENCHMARKS)))
+
+    workloads = [load_workload(src, args.func_name) for src in args.src] + \
+                [load_workload(None, args.func_name, bundle) for bundle in args.bundle]
+    results = run_micro(workloads, names, args.repeat, args.warmup)
+    write_results(args.out, "micro", {"src": list(map(str, args.src)), "bundle": list(map(str, args.bundle)), "repeat": args.repeat, "seed": args.seed}, results)
+    print(tabulate([[k, "{:.6f}".format(v["value"]), "{:.3e}".format(v["per_op"])] for k, v in results.items()],
+                   headers=["Benchmark", "Median (sec)", "Per op (sec)"]))
+
+
+def macro(args):
+    from perf.macro import run_macro
+
+    src_paths = sorted(args.input_dir.glob("*.c"))[:args.limit or None]
+    chisel_args = shlex.split(args.chisel_args)
+    results = run_macro(src_paths, args.timeout, args.seed, chisel_args)
+    write_results(args.out, "macro", {"input_dir": str(args.input_dir), "timeout": args.timeout, "seed": args.seed,
+                                      "chisel_args": chisel_args}, results)
+    print(tabulate([[k, v["status"], v["solved"], "{:.2f}".format(v["value"])] for k, v in results.items()],
+                   headers=["Program", "Status", "Solved", "Wall time (sec)"]))
+
+
+def startup(args):
+    from perf.startup import DEFAULT_BUDGET, STARTUP_BENCHMARKS, over_budget, run_startup
+
+    names = args.bench or list(STARTUP_BENCHMARKS)
+    for name in names:
+        if name not in STARTUP_BENCHMARKS:
+            sys.exit("Unknown startup benchmark '{}' -- options are {}".format(name, set(STARTUP_BENCHMARKS)))
+
+    results = run_startup(names, args.repeat, args.warmup)
+    budget = {name: args.budget for name in DEFAULT_BUDGET} if args.budget is not None else DEFAULT_BUDGET
+    write_results(args.out, "startup", {"repeat": args.repeat, "budget": budget}, results)
+    print(tabulate([[k, "{:.3f}".format(v["value"]), budget.get(k, "")] for k, v in results.items()],
+                   headers=["Benchmark", "Median (sec)", "Budget (sec)"]))
+
+    exceeded = over_budget(results, budget)
+    if exceeded:
+        sys.exit("Cold-start budget exceeded: {}".format(", ".join(exceeded)))
+
+
+def compare_results(args):
+    rows, regressed = compare(load_results(args.base), load_results(args.new), args.threshold)
+    print(tabulate(rows, headers=["Benchmark", "Base", "New", "New/Base", "Verdict"]))
+    sys.exit(1 if regressed else 0)
+
+
+def main():
+    parser = ArgumentParser(prog="python -m perf", description="benchmarks for the synthesis engine")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("micro", help="time hot synthesis routines on fixed (cached) traces")
+    p.add_argument("--src", help="benchmark programs to load traces of (default: a few basic algorithms, unless --bundle is given)", type=Path, nargs="+", default=None)
+    p.add_argument("--bundle", help="trace bundles (see runner.py --save_trace_bundle) to load traces from instead", type=Path, nargs="+", default=[])
+    p.add_argument("--bench", help="micro-benchmarks to run (default all)", type=str, nargs="+", default=None)
+    p.add_argument("--func_name", help="name of obfuscated function (default is 'OBF_FUNC')", type=str, default="OBF_FUNC")
+    p.add_argument("--repeat", help="number of timed repetitions (default 5)", type=int, default=5)
+    p.add_argument("--warmup", help="number of untimed repetitions (default 1)", type=int, default=1)
+    p.add_argument("--seed", help="random seed (default 0)", type=int, default=0)
+    p.add_argument("--out", help="path to write JSON results to (default micro.json)", type=Path, default=Path("micro.json"))
+    p.set_defaults(func=micro)
+
+    p = sub.add_parser("macro", help="deobfuscate benchmark programs end to end")
+    p.add_argument("--input_dir", help="directory of obfuscated programs (default {})".format(DEFAULT_MACRO_DIR), type=Path, default=DEFAULT_MACRO_DIR)
+    p.add_argument("--limit", help="only run the first N programs (default 0, i.e., all)", type=int, default=0)
+    p.add_argument("--timeout", help="synthesis timeout in seconds per program (default 300)", type=int, default=300)
+    p.add_argument("--seed", help="random seed (default 0)", type=int, default=0)
+    p.add_argument("--chisel_args", help="additional arguments to runner.py (default '--disable_parallel')", type=str, default="--disable_parallel")
+    p.add_argument("--out", help="path to write JSON results to (default macro.json)", type=Path, default=Path("macro.json"))
+    p.set_defaults(func=macro)
+
+    p = sub.add_parser("startup", help="time cold starts of runner.py (exits with 1 if over budget)")
+    p.add_argument("--bench", help="startup benchmarks to run (default all)", type=str, nargs="+", default=None)
+    p.add_argument("--repeat", help="number of timed repetitions (default 10)", type=int, default=10)
+    p.add_argument("--warmup", help="number of untimed repetitions (default 2)", type=int, default=2)
+    p.add_argument("--budget", help="maximum median time (sec) of budgeted benchmarks (default per benchmark, see perf/startup.py)", type=float, default=None)
+    p.add_argument("--out", help="path to write JSON results to (default startup.json)", type=Path, default=Path("startup.json"))
+    p.set_defaults(func=startup)
+
+    p = sub.add_parser("compare", help="compare two benchmark results (exits with 1 on regression)")
+    p.add_argument("base", help="baseline results", type=Path)
+    p.add_argument("new", help="new results", type=Path)
+    p.add_argument("--threshold", help="relative slowdown counted as regression (default 0.1)", type=float, default=0.1)
+    p.set_defaults(func=compare_results)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Macro-benchmarks: end-to-end deobfuscation of benchmark programs."""
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import *
+
+CHISEL_DIR = Path(__file__).parent.parent
+
+
+def run_program(src_path: Path, timeout: int, seed: int, chisel_args: List[str]) -> Dict[str, Any]:
+    """ Deobfuscates one program in a fresh process and reports its timings.
+
+    Arguments:
+    src_path (Path) -- path to obfuscated program
+    timeout (int) -- synthesis timeout (sec); the process is killed after twice that
+    seed (int) -- random seed for synthesis
+    chisel_args ([str]) -- additional arguments to runner.py
+
+    Returns:
+    result (dict) -- result summary, where "value" (wall-clock time) is used for comparison
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_path = Path(tmp_dir) / "result.json"
+        cmd = [sys.executable, "runner.py", "--save_results", str(out_path), "--timeout", str(timeout),
+               "--seed", str(seed), *chisel_args, str(src_path.resolve())]
+
+        start = time.perf_counter()
+        try:
+            subprocess.run(cmd, cwd=CHISEL_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           timeout=2 * timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        wall_time = time.perf_counter() - start
+
+        try:
+            res = json.loads(out_path.read_text())
+        except (OSError, ValueError):
+            # killed, or runner.py failed before reporting (results then hold the traceback)
+            res = {}
+
+    return {
+        "value": wall_time,
+        "solved": res.get("Status") == "COMPLETE" and res.get("Result", "None") != "None",
+        "status": res.get("Status", "ERROR"),
+        "synthesis_time": float(res.get("Time (sec)", "nan")),
+        "num_iterations": res.get("Num Iterations"),
+        "num_candidates": res.get("Num Candidates"),
+    }
+
+
+def run_macro(src_paths: List[Path], timeout: int, seed: int, chisel_args: List[str]) -> Dict[str, Dict[str, Any]]:
+    """ Runs end-to-end benchmarks on each program (sequentially, so timings do not interfere).
+
+    Arguments:
+    src_paths ([Path]) -- obfuscated programs
+    timeout (int) -- synthesis timeout (sec) per program
+    seed (int) -- random seed for synthesis
+    chisel_args ([str]) -- additional arguments to runner.py
+
+    Returns:
+    results (dict) -- "<obfuscation>/<group>/<program>" to result summary
+    """
+    results = {}
+    for src_path in src_paths:
+        name = "/".join(src_path.resolve().parts[-3:])
+        logging.info(f"Running {name}")
+        results[name] = run_program(src_path, timeout, seed, chisel_args)
+        logging.info(f"{name}: {results[name]['status']} in {results[name]['value']:.2f} sec")
+    return results
@@ -0,0 +1,173 @@
+"""Micro-benchmarks of hot synthesis routines on fixed traces."""
+import gc
+import time
+from argparse import Namespace
+from itertools import islice
+from pathlib import Path
+from typing import *
+
+import objregex as ore
+from config import HeuristicConfig, get_minimal_config
+from deobfuscators.control_flow_sketch_enumerator import ControlFlowSketchEnumerator
+from langs.c import CFormatter, CGrammar
+from langs.c.c_runner import CRunner, TraceRunnerState
+from runners import TraceIdxNotFoundException, UnknownEncounterException, TraceEndException
+from stats import Stats
+from trace import Trace, TraceSourceKind
+from perf.results import summarize
+
+MAX_SKETCHES = 50 # number of sketches enumerated (and used as programs by other benchmarks)
+
+
+class Workload():
+    """Fixed inputs (traces and variable info of one program) shared by all micro-benchmarks."""
+
+    def __init__(self, name: str, traces: List[Trace], decl_vars: Dict[str, Set[Tuple[str, str]]],
+                 used_vars: Dict[str, Set[str]], left_vars: Dict[str, Set[str]], has_ret_value: bool,
+                 config: Optional[HeuristicConfig] = None):
+        self.name = name
+        self.traces = traces
+        self.decl_vars = decl_vars
+        self.used_vars = used_vars
+        self.left_vars = left_vars
+        self.has_ret_value = has_ret_value
+        self.config = config or get_minimal_config()
+        self.grammar = CGrammar()
+        self.trace_list = tuple(tuple(t.items) for t in traces)
+
+        self.runner = CRunner()
+        self.runner.decl_vars = decl_vars
+        self.runner.used_vars = used_vars
+        self.runner.left_vars = left_vars
+
+        self.progs = [sk.prog for sk in islice(self.enumerator().generate_sketches(
+            self.trace_list, has_ret_value=has_ret_value), MAX_SKETCHES)]
+
+    def enumerator(self) -> ControlFlowSketchEnumerator:
+        return ControlFlowSketchEnumerator(self.grammar, self.used_vars, self.left_vars,
+                                           Stats(self.name, CFormatter()), self.config)
+
+
+def load_workload(src_path: Optional[Path], func_name: str, bundle_path: Optional[Path] = None) -> Workload:
+    """ Loads the workload of a benchmark program (traces are generated with GDB unless cached or bundled).
+
+    Arguments:
+    src_path (Path) -- path to (obfuscated) program (None if loading from bundle)
+    func_name (str) -- name of obfuscated function
+    bundle_path (Path) -- path to trace bundle of program (default None)
+
+    Returns:
+    workload (Workload) -- workload for micro-benchmarks
+    """
+    from runner import prepare_run
+
+    args = Namespace(src_path=src_path, func_name=func_name, from_trace_bundle=bundle_path, save_trace_bundle=None)
+    (_, _, signature, decl_vars, used_vars, left_vars, traces, _, _, _) = prepare_run(args)
+    return Workload(args.src_path.name, traces, decl_vars, used_vars, left_vars, signature.return_type != "void")
+
+
+def bench_execute_node(w: Workload) -> Tuple[Callable[[], Any], int]:
+    def run():
+        for prog in w.progs:
+            for t in w.traces:
+                state = TraceRunnerState(state=t.items[0].pre_state.copy())
+                try:
+                    w.runner.execute_node(prog, t, prog.root, state, True)
+                except (TraceIdxNotFoundException, UnknownEncounterException, TraceEndException):
+                    pass
+    return run, len(w.progs) * len(w.traces)
+
+
+def bench_minimized_copy(w: Workload) -> Tuple[Callable[[], Any], int]:
+    min_vars = set().union(*w.used_vars.values())
+
+    def run():
+        for t in w.traces:
+            t.minimized_copy(min_vars, w.decl_vars, w.used_vars, True)
+    return run, len(w.traces)
+
+
+def bench_generate_sketches(w: Workload) -> Tuple[Callable[[], Any], int]:
+    def run():
+        for _ in islice(w.enumerator().generate_sketches(w.trace_list, has_ret_value=w.has_ret_value), MAX_SKETCHES):
+            pass
+    return run, 1
+
+
+def bench_searchall(w: Workload) -> Tuple[Callable[[], Any], int]:
+    # find every guard evaluation together with the items up to the next evaluation of the same guard
+    guards = sorted({it.source for t in w.trace_list for it in t if it.source.kind == TraceSourceKind.GUARD},
+                    key=lambda s: (s.src, s.val))
+    patterns = []
+    for g in guards:
+        is_g = lambda m, g=g: 1 if m.next.source == g else 0
+        patterns.append([is_g, ore.zero_or_more(ore.negate(is_g))])
+
+    def run():
+        for t in w.trace_list:
+            for p in patterns:
+                for _ in ore.searchall(p, t):
+                    pass
+    return run, len(w.trace_list) * len(patterns)
+
+
+def bench_program_copy(w: Workload) -> Tuple[Callable[[], Any], int]:
+    def run():
+        for prog in w.progs:
+            for _ in range(100):
+                prog.copy()
+    return run, 100 * len(w.progs)
+
+
+def bench_program_copy_write(w: Workload) -> Tuple[Callable[[], Any], int]:
+    # first write to a copy pays for the actual copy
+    def run():
+        for prog in w.progs:
+            for _ in range(100):
+                c = prog.copy()
+                c.set_node(c.root.id, c.root)
+    return run, 100 * len(w.progs)
+
+
+MICRO_BENCHMARKS: Dict[str, Callable[[Workload], Tuple[Callable[[], Any], int]]] = {
+    "execute_node": bench_execute_node,
+    "minimized_copy": bench_minimized_copy,
+    "generate_sketches": bench_generate_sketches,
+    "objregex_searchall": bench_searchall,
+    "program_copy": bench_program_copy,
+    "program_copy_write": bench_program_copy_write,
+}
+
+
+def run_micro(workloads: List[Workload], names: Optional[List[str]] = None, repeat: int = 5,
+              warmup: int = 1) -> Dict[str, Dict[str, Any]]:
+    """ Runs micro-benchmarks on each workload.
+
+    Arguments:
+    workloads ([Workload]) -- workloads to run benchmarks on
+    names ([str]) -- benchmarks to run (default all)
+    repeat (int) -- number of timed repetitions
+    warmup (int) -- number of untimed repetitions before timing
+
+    Returns:
+    results (dict) -- "<benchmark>[<program>]" to result summary
+    """
+    results = {}
+    for w in workloads:
+        for name in names or MICRO_BENCHMARKS:
+            func, ops = MICRO_BENCHMARKS[name](w)
+            for _ in range(warmup):
+                func()
+
+            samples = []
+            gc.collect()
+            gc.disable()
+            try:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    func()
+                    samples.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+            results["{}[{}]".format(name, w.name)] = summarize(samples, ops)
+    return results
@@ -0,0 +1,117 @@
+"""Benchmark result format (JSON) and comparison between runs."""
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import *
+
+FORMAT_VERSION = 1
+
+
+def _git(*cmd: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *cmd], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Returns information identifying where and on which commit benchmarks were run."""
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def summarize(samples: List[float], ops: int = 1) -> Dict[str, Any]:
+    """ Summarizes repeated timings of one benchmark.
+
+    Arguments:
+    samples ([float]) -- time (sec) of each repetition
+    ops (int) -- number of operations performed per repetition
+
+    Returns:
+    result (dict) -- summary, where "value" (median time per repetition) is used for comparison
+    """
+    return {
+        "value": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.mean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops": ops,
+        "per_op": statistics.median(samples) / max(ops, 1),
+        "samples": samples,
+    }
+
+
+def write_results(path: Path, kind: str, params: Dict[str, Any], results: Dict[str, Dict[str, Any]]):
+    """ Writes benchmark results to a JSON file.
+
+    Arguments:
+    path (Path) -- output path
+    kind (str) -- kind of benchmarks ('micro', 'macro' or 'startup')
+    params (dict) -- parameters the benchmarks were run with
+    results (dict) -- benchmark name to result
+    """
+    with open(path, "w") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "kind": kind,
+            "env": environment(),
+            "params": params,
+            "results": results,
+        }, f, indent=2)
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    with open(path) as f:
+        res = json.load(f)
+    if res.get("format") != FORMAT_VERSION:
+        raise Exception("Unsupported benchmark result format in {}: {}".format(path, res.get("format")))
+    return res
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Tuple[List[List[Any]], bool]:
+    """ Compares two benchmark runs.
+
+    Arguments:
+    base (dict) -- baseline results (as loaded by load_results)
+    new (dict) -- new results
+    threshold (float) -- relative slowdown above which a benchmark counts as regressed
+
+    Returns:
+    rows ([[Any]]) -- table of (benchmark, base, new, ratio, verdict)
+    regressed (bool) -- whether any benchmark regressed
+    """
+    if base["kind"] != new["kind"]:
+        raise Exception("Cannot compare {} results against {} results".format(base["kind"], new["kind"]))
+
+    rows = []
+    regressed = False
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        b = base["results"].get(name)
+        n = new["results"].get(name)
+        if b is None or n is None:
+            rows.append([name, b and b["value"], n and n["value"], None, "missing"])
+            continue
+
+        ratio = n["value"] / b["value"] if b["value"] > 0 else float("inf")
+        if b.get("solved", True) and not n.get("solved", True):
+            verdict = "REGRESSED (unsolved)"
+        elif ratio > 1 + threshold:
+            verdict = "REGRESSED"
+        elif ratio < 1 - threshold:
+            verdict = "improved"
+        else:
+            verdict = "same"
+        regressed |= verdict.startswith("REGRESSED")
+        rows.append([name, round(b["value"], 6), round(n["value"], 6), round(ratio, 3), verdict])
+    return rows, regressed
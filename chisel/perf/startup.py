@@ -0,0 +1,57 @@
+"""Cold-start benchmarks: time until a fresh interpreter is ready to run synthesis."""
+import subprocess
+import sys
+import time
+from typing import *
+
+from perf.macro import CHISEL_DIR
+from perf.results import summarize
+
+# each is run in a fresh interpreter
+STARTUP_BENCHMARKS = {
+    "interpreter": "pass",
+    "import_runner": "import runner",
+    "runner_help": "import sys; sys.argv = ['runner.py', '--help']; import runner; runner.main()",
+    # everything a run loads before synthesis starts (except for tracing the program)
+    "import_synthesis": "import sys; sys.argv = ['runner.py', 'DUMMY.c']; import runner; "
+                        "runner.get_lang_tools('c'); runner.get_search_models(); "
+                        "import deobfuscators, extractor, input_spec_data, langs.c.c_parser",
+}
+
+DEFAULT_BUDGET = {
+    "import_runner": 0.2,
+    "runner_help": 0.2,
+}
+
+
+def time_startup(code: str) -> float:
+    """Runs code in a fresh interpreter (from the chisel directory) and returns its wall-clock time."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=CHISEL_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def run_startup(names: List[str], repeat: int, warmup: int) -> Dict[str, Dict[str, Any]]:
+    """ Runs cold-start benchmarks (the OS file cache is warmed up by untimed runs).
+
+    Arguments:
+    names ([str]) -- benchmarks to run (see STARTUP_BENCHMARKS)
+    repeat (int) -- number of timed repetitions
+    warmup (int) -- number of untimed repetitions
+
+    Returns:
+    results (dict) -- benchmark name to result summary
+    """
+    results = {}
+    for name in names:
+        code = STARTUP_BENCHMARKS[name]
+        for _ in range(warmup):
+            time_startup(code)
+        results[name] = summarize([time_startup(code) for _ in range(repeat)])
+    return results
+
+
+def over_budget(results: Dict[str, Dict[str, Any]], budget: Dict[str, float]) -> List[str]:
+    """Returns benchmarks whose median time exceeds their budget (sec)."""
+    return [name for name, limit in budget.items() if name in results and results[name]["value"] > limit]
@@ -2,17 +2,57 @@ import heapq
 from typing import *
 
 class PriorityQueue():
-    """Queue which orders elements by priority (lowest first)."""
+    """Queue which orders elements by priority (lowest first), breaking ties by insertion order.
 
-    def __init__(self, priority):
+    If a key function is given, items whose key was already added are dropped at insertion.
+    If a maximum size is given, the lowest priority items are dropped once it is exceeded (beam-style).
+    """
+
+    def __init__(self, priority, key: Optional[Callable[[Any], Hashable]] = None, max_size: Optional[int] = None):
         self.queue = []
         self.priority = priority
+        self.key = key
+        self.max_size = max_size
+        self.seen = set() # keys of items added (and not dropped)
+        self.counter = 0 # insertion counter for stable tie-breaking
+
+    def add(self, item, stats) -> bool:
+        """ Add item.
+
+        Arguments:
+        item (Any) -- item to add
+        stats (Stats) -- object to track statistics
+
+        Returns:
+        added (bool) -- false if item is a duplicate
+        """
+        key = None
+        if self.key is not None:
+            key = self.key(item)
+            if key in self.seen:
+                stats.num_worklist_duplicates += 1
+                return False
+            self.seen.add(key)
+
+        heapq.heappush(self.queue, (self.priority(item, stats), self.counter, item, key))
+        self.counter += 1
+
+        if self.max_size and len(self.queue) > self.max_size:
+            self._truncate(stats)
+        return True
 
-    def add(self, item, stats):
-        heapq.heappush(self.queue, (self.priority(item, stats), item))
+    def _truncate(self, stats):
+        """Drop lowest priority items (down to 3/4 of the maximum size so truncation is amortized)."""
+        keep = max(1, self.max_size * 3 // 4)
+        dropped = len(self.queue) - keep
+        self.queue.sort()
+        for entry in self.queue[keep:]:
+            self.seen.discard(entry[-1])
+        del self.queue[keep:] # NOTE: sorted list is a valid heap
+        stats.num_worklist_truncated += dropped
 
     def pop(self):
-        return heapq.heappop(self.queue)[1]
+        return heapq.heappop(self.queue)[2]
 
     def __len__(self):
         return len(self.queue)
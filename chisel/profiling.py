@@ -0,0 +1,120 @@
+"""Lightweight per-phase profiling of synthesis (disabled unless `enable` is called)."""
+import functools
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import *
+
+MAX_TRACE_EVENTS = 500000 # maximum number of events kept for Chrome trace output
+
+_enabled = False
+_totals : Dict[str, float] = defaultdict(float) # cumulative time (sec) per phase
+_calls : Dict[str, int] = defaultdict(int) # number of calls per phase
+_events : Optional[List[dict]] = None # Chrome trace events (None if not recorded)
+_null_phase = nullcontext()
+
+
+def enable(chrome_trace: bool = False):
+    """ Enables profiling (and clears results so far).
+
+    Arguments:
+    chrome_trace (bool) -- whether to also record individual events for Chrome trace output
+    """
+    global _enabled, _events
+
+    reset()
+    _enabled = True
+    _events = [] if chrome_trace else None
+
+
+def disable():
+    """Disables profiling (results so far are kept)."""
+    global _enabled
+
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Clears all profiling results."""
+    _totals.clear()
+    _calls.clear()
+    if _events is not None:
+        _events.clear()
+
+
+class _Phase():
+    """Context manager timing one execution of a phase."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _totals[self.name] += end - self.start
+        _calls[self.name] += 1
+        if _events is not None and len(_events) < MAX_TRACE_EVENTS:
+            _events.append({
+                "name": self.name,
+                "ph": "X",
+                "ts": self.start * 1e6,
+                "dur": (end - self.start) * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+            })
+        return False
+
+
+def phase(name: str):
+    """ Context manager which times the enclosed code as the given phase (no-op if profiling is disabled).
+
+    Arguments:
+    name (str) -- phase name
+    """
+    return _Phase(name) if _enabled else _null_phase
+
+
+def profiled(name: str):
+    """ Decorator which times each call of the function as the given phase (no-op if profiling is disabled).
+
+    Arguments:
+    name (str) -- phase name
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Returns cumulative time and call count per phase (phases are inclusive of nested phases)."""
+    return {
+        name: {"Calls": _calls[name], "Total (sec)": round(_totals[name], 4)}
+        for name in sorted(_totals, key=lambda n: -_totals[n])
+    }
+
+
+def write_chrome_trace(path: str):
+    """ Writes recorded events in Chrome trace format (viewable in chrome://tracing or Perfetto).
+
+    Arguments:
+    path (str) -- output path
+    """
+    with open(path, "w") as f:
+        json.dump({"traceEvents": _events or [], "displayTimeUnit": "ms"}, f)
@@ -4,6 +4,7 @@ from enum import Enum, auto
 from dataclasses import dataclass
 
 import copy
+import weakref
 
 # from extractor.decl_extractor import FunctionSignature
 from grammar import *
@@ -110,20 +111,30 @@ class DummyNode(ValueNode):
         return self.codes
 
 class Program():
-    """DAG representation of both complete and partial programs."""
+    """DAG representation of both complete and partial programs.
+
+    Copies share their node, children, parent, unknown and hash maps with the original (copy-on-write).
+    Children are stored as tuples, so a map only needs a shallow copy the first time a program mutates it.
+    Mutations must therefore go through the methods below rather than writing to the maps directly.
+    """
 
     pid  = 0 # global program id counter
+    _COW_FIELDS = ("nodes", "children", "parent", "unknowns", "_hashes") # maps shared between copies
 
     def __init__(self, nonterm=None, name=None, function_signature=None):
         self.name = name or "prog_{}".format(Program.pid)
         Program.pid += 1
 
         self.signature = function_signature
+        self.trace_depth = 0.0 # Fraction of traces matched before first unknown (set by trace pruner)
+        self.trace_stops = None # Trace position -> (last matched trace index, unknown reached) (set by trace pruner)
 
         self.nodes : Dict[int, Node] = {} # Maps each unique id to a node
-        self.children : Dict[int, List[int]] = defaultdict(list) # Maps each node id to its children ids
+        self.children : Dict[int, Tuple[int, ...]] = defaultdict(tuple) # Maps each node id to its children ids
         self.parent : Dict[int, int] = {} # Maps each node to its parent
         self.unknowns : List[int] = [] # Keeps track of all nodes which correspond to unknowns
+        self._hashes : Dict[int, int] = {} # Caches structural hash of subtree rooted at each node id
+        self._shared : Set[str] = set() # Maps still shared with other programs (see `_own`)
 
         self.curr_id = 1 # Node id to be assigned to next new node added
 
@@ -143,6 +154,8 @@ class Program():
     
     def __delitem__(self, key):
         assert isinstance(key, int) and key in self.nodes
+        self._own(*Program._COW_FIELDS)
+        self.invalidate(key)
         del self.nodes[key]
         for c in self.children[key]:
             if self.parent[c] == key:
@@ -164,9 +177,8 @@ class Program():
         assert nid not in self.children[tid]
 
         pid = self.parent[nid]
-        self.children[pid].remove(nid)
-        self.children[pid].append(tid)
-        self.parent[tid] = pid
+        self.remove_child(pid, nid)
+        self.add_child(pid, tid)
         del self[nid]
 
 
@@ -184,16 +196,32 @@ class Program():
 
         return None
 
+    def _own(self, *fields: str):
+        """ Takes ownership of the given maps before mutating them (shallow copy if still shared).
+
+        Arguments:
+        fields ([str]) -- names of maps to be mutated
+        """
+        for f in fields:
+            if f in self._shared:
+                setattr(self, f, getattr(self, f).copy())
+                self._shared.discard(f)
+        # NOTE: cached hashes are only valid for programs with the same structure
+        if "_hashes" in self._shared and ("nodes" in fields or "children" in fields):
+            self._hashes = self._hashes.copy()
+            self._shared.discard("_hashes")
+
     def copy(self):
+        """Copy program in O(1); maps are shared until either program mutates them."""
         new_prog = Program()
         new_prog.name = "prog_{}".format(Program.pid)
         Program.pid += 1
         new_prog.signature = self.signature
-        new_prog.nodes = self.nodes.copy()
-        for n,cs in self.children.items():
-            new_prog.children[n] = cs.copy()
-        new_prog.parent = self.parent.copy()
-        new_prog.unknowns = self.unknowns.copy()
+        new_prog.trace_depth = self.trace_depth
+        for f in Program._COW_FIELDS:
+            setattr(new_prog, f, getattr(self, f))
+        self._shared = set(Program._COW_FIELDS)
+        new_prog._shared = set(Program._COW_FIELDS)
         new_prog.curr_id = self.curr_id
         new_prog.root = self.root # NOTE: Shouldn't need to copy b/c nodes immutable
 
@@ -203,6 +231,7 @@ class Program():
         prog = copy.deepcopy(self)
         prog.name = "prog_{}".format(Program.pid)
         Program.pid += 1
+        prog._shared = set()
         return prog
 
     def get_subprogram(self, node: Node):
@@ -224,7 +253,7 @@ class Program():
         while len(node_ids) > 0:
             nid = node_ids.pop(0)
             subprog.nodes[nid] = self.nodes[nid]
-            subprog.children[nid] = self.children[nid].copy()
+            subprog.children[nid] = self.children[nid]
             if self.parent[nid] in subprog.nodes:
                 subprog.parent[nid] = self.parent[nid]
             if nid in self.unknowns:
@@ -248,13 +277,55 @@ class Program():
         n.id = self.curr_id
         self.curr_id += 1
 
+        self._own("nodes")
         self.nodes[n.id] = n
         if parent_id != -1:
-            self.children[parent_id].append(n.id)
-            self.parent[n.id] = parent_id
+            self.add_child(parent_id, n.id)
         else:
             self.root = n
 
+    def add_child(self, parent_id: int, child_id: int):
+        """ Appends node as last child of parent.
+
+        Arguments:
+        parent_id (int) -- parent node id
+        child_id (int) -- child node id
+        """
+        self._own("children", "parent")
+        self.invalidate(parent_id)
+        self.children[parent_id] += (child_id,)
+        self.parent[child_id] = parent_id
+
+    def remove_child(self, parent_id: int, child_id: int):
+        """ Removes node from children of parent (node itself is kept).
+
+        Arguments:
+        parent_id (int) -- parent node id
+        child_id (int) -- child node id
+        """
+        assert child_id in self.children[parent_id]
+        self._own("children")
+        self.invalidate(parent_id)
+        self.children[parent_id] = tuple(c for c in self.children[parent_id] if c != child_id)
+
+    def add_unknowns(self, nids: Iterable[int]):
+        """ Marks nodes as unknowns to be completed.
+
+        Arguments:
+        nids ([int]) -- node ids
+        """
+        self._own("unknowns")
+        self.unknowns.extend(nids)
+
+    def remove_unknown(self, nid: int):
+        """ Removes node from unknowns to be completed (node itself is kept).
+
+        Arguments:
+        nid (int) -- node id
+        """
+        self._own("unknowns")
+        self.unknowns.remove(nid)
+
     def expand(self, unk_id: int, prod: Production):
         """ Expands the unk with the production by replacing leftmost occurence
             of nonterminal with RHS of production.
@@ -264,14 +335,10 @@ class Program():
         prod (Production) -- grammar production
         """
         # Remove unknown from unknown list
-        self.unknowns.remove(unk_id)
+        self.remove_unknown(unk_id)
 
         # Construct and add replacement node
-        rep_node = ValueNode(unk_id, prod, prod.fname)
-        self.nodes[unk_id] = rep_node
-        if unk_id == self.root.id:
-            # Replace root if root is expanded
-            self.root = rep_node
+        self.set_node(unk_id, ValueNode(unk_id, prod, prod.fname))
 
         # Construct and add children
         for c in prod.args:
@@ -279,7 +346,7 @@ class Program():
                 # Add unknown node for nonterminal
                 u = UnknownNode(None, c)
                 self.add_node(u, unk_id)
-                self.unknowns.append(u.id)
+                self.add_unknowns([u.id])
             else:
                 # Add value node for terminal
                 if prod.fname in [SOURCE_GUARD_NAME, SOURCE_STMT_NAME]:
@@ -306,7 +373,9 @@ class Program():
         prog (Program) -- subprogram to be added
         """
         # Remove unknown
+        self._own(*Program._COW_FIELDS)
         self.unknowns.remove(unk_id)
+        self.invalidate(unk_id)
         if unk_id == 0:
             # Replace root if root is expanded
             self.root = prog.root
@@ -330,7 +399,7 @@ class Program():
 
         # Update children mapping with subprog items
         for nid,cs in prog.children.items():
-            self.children[num_map[nid]] = [num_map[cnid] for cnid in cs]
+            self.children[num_map[nid]] = tuple(num_map[cnid] for cnid in cs)
 
         # Update parent mapping with subprog items
         for nid,p in prog.parent.items():
@@ -340,6 +409,64 @@ class Program():
         for nid in prog.unknowns:
             self.unknowns.append(num_map[nid])
 
+    def set_node(self, nid: int, node: Node):
+        """ Replaces the node with the given id (keeps children and parent mappings).
+
+        Arguments:
+        nid (int) -- id of node to be replaced
+        node (Node) -- replacement node
+        """
+        self._own("nodes")
+        self.invalidate(nid)
+        self.nodes[nid] = node
+        if nid == self.root.id:
+            # Replace root if root is replaced
+            self.root = node
+
+    def invalidate(self, nid: int):
+        """ Drops cached structural hashes of node and its ancestors after a mutation.
+
+        Arguments:
+        nid (int) -- id of mutated node
+        """
+        # NOTE: a hash is only cached if hashes of all descendants are cached, so can stop at the first uncached node
+        self._own("_hashes")
+        while nid in self._hashes:
+            del self._hashes[nid]
+            if nid not in self.parent:
+                break
+            nid = self.parent[nid]
+
+    def _subtree_hash(self, nid: int) -> int:
+        """Compute structural hash of subtree rooted at node (cached per node)."""
+        h = self._hashes.get(nid)
+        if h is None:
+            h = hash((str(self.nodes[nid]), tuple(self._subtree_hash(c) for c in self.children.get(nid, ()))))
+            self._hashes[nid] = h
+        return h
+
+    def same_structure(self, prog: 'Program') -> bool:
+        """Checks if the programs have the same structure (i.e., `str` is equal), stopping at the first difference."""
+        stack = [(self.root.id, prog.root.id)]
+        while stack:
+            nid1, nid2 = stack.pop()
+            h1, h2 = self._hashes.get(nid1), prog._hashes.get(nid2)
+            if h1 is not None and h2 is not None and h1 != h2:
+                return False
+            cs1, cs2 = self.children.get(nid1, ()), prog.children.get(nid2, ())
+            if len(cs1) != len(cs2) or str(self.nodes[nid1]) != str(prog.nodes[nid2]):
+                return False
+            stack.extend(zip(cs1, cs2))
+        return True
+
+    def structural_hash(self) -> int:
+        """Structural hash of program, maintained incrementally as the program is expanded."""
+        return self._subtree_hash(self.root.id)
+
+    def key(self) -> 'ProgramKey':
+        """Returns a hashable key identifying the program structure (for caches)."""
+        return ProgramKey(self)
+
     def complete(self) -> bool:
         """Checks if current program is complete (i.e., no unknowns)."""
         return len(self.unknowns) == 0
@@ -368,6 +495,37 @@ class Program():
         """Returns a list of codes for the program."""
         return [c for n in self.nodes.values() for c in n.code()]
 
+class ProgramKey():
+    """Structural key of a program, usable in dicts/sets.
+
+    Keys hash by the incrementally maintained structural hash, and structures are only compared when hashes
+    are equal. The program is only weakly referenced, so cached keys do not keep candidates alive; once either
+    program is gone (or has been modified since), equal hashes are taken as equal structures.
+    """
+
+    __slots__ = ("prog", "hash")
+
+    def __init__(self, prog: Program):
+        self.prog = weakref.ref(prog)
+        self.hash = prog.structural_hash()
+
+    def _program(self) -> Optional[Program]:
+        """Returns the program, if it still exists and has the structure the key was created for."""
+        prog = self.prog()
+        return prog if prog is not None and prog.structural_hash() == self.hash else None
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, k: Any):
+        if not isinstance(k, ProgramKey) or self.hash != k.hash:
+            return False
+        p1, p2 = self._program(), k._program()
+        return p1 is None or p2 is None or p1 is p2 or p1.same_structure(p2)
+
+    def __repr__(self):
+        return "ProgramKey({})".format(self.hash)
+
 def construct_prog(op: str, prod: Production, children: List[Program]) -> Program:
     """Constructs a program using the op with the given children."""
     prog = Program()
@@ -376,7 +534,7 @@ def construct_prog(op: str, prod: Production, children: List[Program]) -> Progra
 
     curr_id = 1
     for c in children:
-        prog.children[0].append(curr_id)
+        prog.children[0] += (curr_id,)
         prog.parent[curr_id] = 0
         if not isinstance(c, Program):
             # TODO: How to get prod here?
@@ -393,7 +551,7 @@ def construct_prog(op: str, prod: Production, children: List[Program]) -> Progra
             prog.nodes[num_map[nid]] = n
             n.id = num_map[nid]
         for nid,cs in c.children.items():
-            prog.children[num_map[nid]] = [num_map[cnid] for cnid in cs]
+            prog.children[num_map[nid]] = tuple(num_map[cnid] for cnid in cs)
         for nid,p in c.parent.items():
             prog.parent[num_map[nid]] = num_map[p]
         for nid in c.unknowns:
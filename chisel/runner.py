@@ -1,63 +1,93 @@
+from __future__ import annotations
+
 from argparse import Namespace
 import os
 import logging
 import traceback
 import time
 import json
-from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as CFTimeoutError
 import copy
+import functools
+import multiprocessing
+from pathlib import Path
+import random
+import signal
+from typing import TYPE_CHECKING
 
 from args import get_cline_args
-from checkers import *
-from deobfuscators import *
-from langs.c import *
-from pruners import *
-from search_models import *
 from stats import Stats, Status
+import profiling
+import scratch
 from utils import SynthesisTimeoutException
-from input_spec import InputSpec
-import input_spec_data as isd
-
-# FIX: rearrange imports
-from extractor import *
-import extractor.source_analyzer as src_analysis
-from langs.c.c_parser import CParser
 from config import HeuristicConfig, get_minimal_config, MAX_GDB_GENERATION_TIME, get_all_configs
 
-search_models = {
-    "size": SizeSearchModel(),
-    "random": RandomSearchModel()
-}
-
-lang_tools = {
-    "c": {
-        "analysis": CAnalysis(),
-        "checkers": {
-            "io": CIOEquivalenceChecker(),
-        },
-        "formatter": CFormatter(),
-        "grammar": CGrammar,
-        "pruners": {
-            "trace": CTracePruner(),
-        },
-        "search_models": {},
+# Heavier modules (pycparser, hypothesis, synthesis components, input spec tables) are imported where
+# they are used, so startup stays cheap for runs that do not need them (e.g., --help, trace bundles).
+if TYPE_CHECKING:
+    from extractor import TraceBundle
+    from input_spec import InputSpec
+    from langs.c import CFormatter
+
+
+@functools.lru_cache(maxsize=None)
+def get_search_models() -> dict:
+    from search_models import CostSearchModel, RandomSearchModel, SizeSearchModel
+
+    return {
+        "size": SizeSearchModel(),
+        "random": RandomSearchModel(),
+        "cost": CostSearchModel(),
     }
-}
 
 
-def parse_and_generate_trace(
+@functools.lru_cache(maxsize=None)
+def get_lang_tools(lang: str) -> dict:
+    """ Returns the language specific synthesis components (created on first use).
+
+    Arguments:
+    lang (str) -- language of the obfuscated program
+
+    Returns:
+    tools (dict) -- analysis, checkers, formatter, grammar, pruners and search models of the language
+    """
+    if lang == "c":
+        from langs.c import CAnalysis, CFormatter, CGrammar, CIOEquivalenceChecker, CTracePruner
+
+        return {
+            "analysis": CAnalysis(),
+            "checkers": {
+                "io": CIOEquivalenceChecker(),
+            },
+            "formatter": CFormatter(),
+            "grammar": CGrammar,
+            "pruners": {
+                "trace": CTracePruner(),
+            },
+            "search_models": {},
+        }
+    raise Exception("Language '{}' not supported".format(lang))
+
+
+def generate_trace_bundle(
     src_path: str,
     inputs: list[InputSpec],
     func_name: str
-):
-    # Retrieve type information of function parameters
-    func_decls = parse_c_decls(src_path)
-    obfus_func_signature = next(filter(lambda x: x.name == func_name, func_decls))
+) -> TraceBundle:
+    from extractor import TraceBundle, generate_traces, parse_c_decls
+    import extractor.source_analyzer as src_analysis
+    from langs.c.c_parser import CParser
 
     extraction_start = time.time()
 
+    # parsed once for all analyses
+    args = get_cline_args()
+    ast = CParser(cache_dir=args.ast_cache_dir).parse(src_path)
+
+    # Retrieve type information of function parameters
+    func_decls = parse_c_decls(src_path, ast)
+    obfus_func_signature = next(filter(lambda x: x.name == func_name, func_decls))
+
     # Run analysis on statements to extract declared variables and their types
-    ast = CParser().parse(src_path)
     config = src_analysis.SourceParseConfig()
     visitor = src_analysis.SourceLineExtractor(config)
     visitor.visit(ast)
@@ -82,37 +112,56 @@ def parse_and_generate_trace(
         used_vars[v] = used_vars[k]
         left_vars[v] = left_vars[k]
 
-    return inputs, func_decls, obfus_func_signature, decl_vars, used_vars, left_vars, traces, trace_time, extraction_time, num_loc
+    return TraceBundle(str(src_path), func_name, inputs, func_decls, obfus_func_signature, decl_vars, used_vars, left_vars,
+                       negation_map, traces, trace_time, extraction_time, num_loc)
+
+def parse_and_generate_trace(
+    src_path: str,
+    inputs: list[InputSpec],
+    func_name: str
+):
+    return generate_trace_bundle(src_path, inputs, func_name).trace_info()
 
 def run_inner(args: Namespace, config: HeuristicConfig, trace_info) -> tuple[bool, str, str]:
-    lang = args.lang
-    assert(lang in lang_tools)
+    from deobfuscators import BottomUpDeobfuscator, DecompositionalDeobfuscator
+    from pruners import NoPruner
+
+    lang_tools = get_lang_tools(args.lang)
+    search_models = get_search_models()
 
     # Get client specific things
-    analysis = lang_tools[lang]["analysis"]
-    formatter = lang_tools[lang]["formatter"]
-    grammar = lang_tools[lang]["grammar"](args.src_path)
+    analysis = lang_tools["analysis"]
+    formatter = lang_tools["formatter"]
+    grammar = lang_tools["grammar"](args.src_path)
     pruner = NoPruner()
     if not args.disable_trace_pruning:
-        pruner = lang_tools[lang]["pruners"]["trace"]
+        pruner = lang_tools["pruners"]["trace"]
     if args.search_model in search_models:
         search_model = search_models[args.search_model]
-    elif args.search_model in lang_tools[lang]["search_models"]:
-        search_model = lang_tools[lang]["search_models"][args.search_model]
+    elif args.search_model in lang_tools["search_models"]:
+        search_model = lang_tools["search_models"][args.search_model]
     else:
-        raise Exception("Search model '{}' not found for lang '{}'".format(args.search_model, lang))
+        raise Exception("Search model '{}' not found for lang '{}'".format(args.search_model, args.lang))
 
-    checker = lang_tools[lang]["checkers"][args.checker]
+    checker = lang_tools["checkers"][args.checker]
 
     next_unk = lambda p: p.leftmost_unknown() # Just get the first unknown to expand
 
     stats = Stats(args.src_path, formatter)
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.profile or args.profile_trace is not None:
+        profiling.enable(chrome_trace=args.profile_trace is not None)
 
     try:
         if args.deobfuscator == "decomp":
             deobfuscator = DecompositionalDeobfuscator(grammar)
             deobfuscator.deobfuscate_decomp(str(args.src_path), search_model, checker, pruner,
                                             next_unk, analysis, formatter, stats, trace_info, config, args.func_name)
+        elif args.deobfuscator == "bottomup":
+            deobfuscator = BottomUpDeobfuscator(grammar)
+            deobfuscator.deobfuscate_decomp(str(args.src_path), search_model, checker, pruner,
+                                            next_unk, analysis, formatter, stats, trace_info, config, args.func_name)
         else:
             raise Exception("[ERROR] Unrecognized deobfuscator type: {}".format(args.deobfuscator))
         stats.status = Status.COMPLETE
@@ -128,22 +177,99 @@ def run_inner(args: Namespace, config: HeuristicConfig, trace_info) -> tuple[boo
             raise
     logging.info(f"Deobfuscation complete! {stats.status}; solution? {stats.solution is not None}")
     stats.compute_deobfuscated_stats()
+    if args.check_solution_io and stats.solution is not None:
+        check_solution_io(args, formatter, stats, trace_info)
+    if args.validate_solution > 0 and stats.solution is not None:
+        validate_solution(args, formatter, stats, trace_info)
+    if profiling.is_enabled():
+        profiling.disable()
+        stats.phase_timings = profiling.snapshot()
+        if args.profile_trace is not None:
+            trace_path = args.profile_trace
+            if multiprocessing.parent_process() is not None:
+                # one trace per worker process (one per config)
+                trace_path = trace_path.with_name("{}-{}{}".format(trace_path.stem, os.getpid(), trace_path.suffix))
+            profiling.write_chrome_trace(str(trace_path))
 
     return stats.solution is not None, json.dumps(stats.to_dict(), indent=2), str(stats)
 
+def check_solution_io(args: Namespace, formatter: CFormatter, stats: Stats, trace_info):
+    """Compares outputs of the solution and the obfuscated program on the trace inputs (recorded in stats)."""
+    if not args.src_path.exists():
+        logging.warning(f"Cannot check solution I/O: {args.src_path} not found")
+        return
+
+    from langs.c.c_exec_server import ExecServer, check_io
+
+    inputs, _, signature = trace_info[:3]
+    try:
+        with ExecServer() as server:
+            stats.io_mismatches = check_io(server, args.src_path.read_text(), args.func_name,
+                                           formatter.format_function(stats.solution), "DEOBF_FUNC", signature, inputs)
+    except Exception as e:
+        # the check runs after synthesis, so its failure must not lose the results
+        stats.io_check_error = "{}: {}".format(type(e).__name__, e)
+        logging.warning(f"Cannot check solution I/O: {stats.io_check_error}")
+        return
+    if stats.io_mismatches is None:
+        stats.io_check_error = "compilation or loading failed"
+        logging.warning(f"Cannot check solution I/O: {stats.io_check_error}")
+    else:
+        logging.info(f"Solution I/O mismatches: {stats.io_mismatches}")
+
+def validate_solution(args: Namespace, formatter: CFormatter, stats: Stats, trace_info):
+    """Differentially tests the solution against the obfuscated program on generated inputs (recorded in stats)."""
+    if not args.src_path.exists():
+        logging.warning(f"Cannot validate solution: {args.src_path} not found")
+        return
+
+    from langs.c.c_io_validator import CIOValidator, ValidationResult
+
+    inputs, _, signature = trace_info[:3]
+    validation_start = time.time()
+    validator = CIOValidator(args.validate_solution, args.validation_workers)
+    try:
+        result = validator.validate(args.src_path.read_text(), args.func_name,
+                                    formatter.format_function(stats.solution), "DEOBF_FUNC", signature, inputs)
+    except Exception as e:
+        # validation runs after synthesis, so its failure must not lose the results
+        result = ValidationResult(error="{}: {}".format(type(e).__name__, e))
+    stats.validation = result.to_dict()
+    stats.validation_time = time.time() - validation_start
+    logging.info(f"Solution validation: {stats.validation}")
+
 def prepare_run(args: Namespace) -> tuple:
-    src_name = args.src_path.name.replace(".out.c", ".c")
-    if src_name not in isd.BASIC_ALGORITHMS_INPUT_MAP:
-        logging.info(f"No input spec found for {src_name}, using legacy")
-        src_name = "legacy"
-    input_specs = isd.INPUT_SPECS[isd.BASIC_ALGORITHMS_INPUT_MAP[src_name]]
-    return parse_and_generate_trace(str(args.src_path), input_specs, args.func_name)
+    from extractor import TraceBundle
+
+    if args.from_trace_bundle is not None:
+        # offline replay: no gcc/GDB or source needed
+        logging.info(f"Loading trace bundle {args.from_trace_bundle}")
+        bundle = TraceBundle.load(args.from_trace_bundle)
+        if args.src_path is None:
+            args.src_path = Path(bundle.src_path)
+        args.func_name = bundle.func_name
+    else:
+        import input_spec_data as isd
+
+        src_name = args.src_path.name.replace(".out.c", ".c")
+        input_specs = isd.get_input_specs(src_name)
+        if input_specs is None:
+            logging.info(f"No input spec found for {src_name}, using legacy")
+            input_specs = isd.INPUT_SPECS["legacy"]
+        bundle = generate_trace_bundle(str(args.src_path), input_specs, args.func_name)
+
+    if args.save_trace_bundle is not None:
+        bundle.save(args.save_trace_bundle)
+        logging.info(f"Saved trace bundle to {args.save_trace_bundle}")
+    return bundle.trace_info()
 
 def run(args: Namespace) -> tuple[bool, str, str]:
     info = prepare_run(args)
     return run_inner(args, get_minimal_config(), info)
 
 def run_processes(args: Namespace) -> tuple[bool, str, str]:
+    from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as CFTimeoutError
+
     trace_info = prepare_run(args)
 
     configs = get_all_configs()
@@ -177,6 +303,8 @@ def run_processes(args: Namespace) -> tuple[bool, str, str]:
 def main():
     args = get_cline_args()
     logging.basicConfig(level=logging.DEBUG)
+    # remove scratch files when terminated (forked workers inherit the handler)
+    signal.signal(signal.SIGTERM, scratch.on_terminate)
     
     try:
         if args.disable_parallel or args.ablation == "1a":
@@ -191,7 +319,7 @@ def main():
             raise
 
     if args.save_results is not None:
-        prog_name = args.src_path.stem.removesuffix(".out")
+        prog_name = (args.src_path or args.from_trace_bundle).stem.removesuffix(".out")
         if args.save_results.is_dir() or args.save_results.suffix != ".json":
             args.save_results.mkdir(parents=True, exist_ok=True)
             args.save_results = args.save_results / f"{prog_name}.json"
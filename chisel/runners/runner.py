@@ -2,7 +2,10 @@ class TraceIdxNotFoundException(Exception):
     pass
 
 class UnknownEncounterException(Exception):
-    pass
+    def __init__(self, trace_index: int = -1, node_id: int = -1):
+        super().__init__(trace_index, node_id)
+        self.trace_index = trace_index # index of last matched trace item before the unknown
+        self.node_id = node_id # id of unknown node encountered
 
 class TraceEndException(Exception):
     pass
@@ -0,0 +1,179 @@
+"""Per-process scratch directory for temporary build and run files.
+
+Every process (including forked workers) gets its own directory, preferably on tmpfs, so concurrent
+runs never share file names. Directories live in a root private to the user (e.g., /dev/shm/chisel-1000),
+and each holds a lock file locked by its process for as long as it runs. The directory is removed when
+the process exits, and directories whose lock is no longer held (e.g., of killed processes) are removed
+by the next run.
+"""
+import atexit
+import fcntl
+import multiprocessing.util
+import os
+import shutil
+import signal
+import stat
+import tempfile
+import threading
+import time
+from typing import *
+
+SCRATCH_ROOTS = ["/dev/shm"] # preferred (tmpfs) locations, the system temp directory is used otherwise
+SCRATCH_PREFIX = "chisel-"
+LOCK_NAME = ".lock"
+PENDING_PREFIX = ".pending-" # directories being created (not locked yet), ignored by _remove_stale
+PENDING_MAX_AGE = 60 # seconds; pending directories older than this were left by killed processes
+
+_scratch_dir : Optional[str] = None
+_owner_pid : Optional[int] = None # process that created _scratch_dir (forked children need their own)
+_lock_fd : Optional[int] = None # held lock of _scratch_dir (released when the process dies)
+_lock = threading.Lock()
+
+
+def _user_root(base: str) -> Optional[str]:
+    """Returns the root for scratch directories of this user in base (None if it cannot be used safely)."""
+    root = os.path.join(base, "{}{}".format(SCRATCH_PREFIX, os.getuid()))
+    try:
+        os.mkdir(root, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+    st = os.lstat(root)
+    # someone else may have created the path first
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) & 0o077:
+        return None
+    return root
+
+
+def _scratch_root() -> str:
+    for base in SCRATCH_ROOTS:
+        if os.path.isdir(base) and os.access(base, os.W_OK | os.X_OK):
+            root = _user_root(base)
+            if root is not None:
+                return root
+    return _user_root(tempfile.gettempdir()) or tempfile.mkdtemp(prefix=SCRATCH_PREFIX)
+
+
+def _remove_stale(root: str):
+    """Removes scratch directories of this user whose process no longer runs (e.g., killed workers)."""
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(PENDING_PREFIX):
+            try:
+                if time.time() - os.lstat(path).st_mtime > PENDING_MAX_AGE:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass # renamed in the meantime
+            continue
+        try:
+            fd = os.open(os.path.join(path, LOCK_NAME), os.O_RDONLY)
+        except OSError:
+            continue # not a scratch directory, or its lock is not created yet
+        try:
+            if os.fstat(fd).st_uid != os.getuid():
+                continue
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            continue # still in use
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+
+def _create_locked(root: str) -> Tuple[str, int]:
+    """ Creates a scratch directory and locks it.
+
+    The directory only gets its final name once it is locked, so _remove_stale never finds it unlocked.
+
+    Arguments:
+    root (str) -- root to create the directory in
+
+    Returns:
+    path (str) -- path to the directory
+    fd (int) -- file descriptor of the held lock
+    """
+    while True:
+        pending = tempfile.mkdtemp(prefix=PENDING_PREFIX, dir=root)
+        fd = os.open(os.path.join(pending, LOCK_NAME), os.O_RDONLY | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        path = os.path.join(root, "{}-{}".format(os.getpid(), os.path.basename(pending)[len(PENDING_PREFIX):]))
+        try:
+            # fails if the name is taken (scratch directories are never empty)
+            os.rename(pending, path)
+            return path, fd
+        except OSError:
+            os.close(fd)
+            shutil.rmtree(pending, ignore_errors=True)
+
+
+def scratch_dir() -> str:
+    """Returns the scratch directory of this process (created on first use)."""
+    global _scratch_dir, _owner_pid, _lock_fd
+
+    pid = os.getpid()
+    with _lock:
+        if _scratch_dir is None or _owner_pid != pid:
+            if _owner_pid != pid:
+                atexit.register(cleanup)
+                # multiprocessing workers exit without running atexit handlers
+                multiprocessing.util.Finalize(None, cleanup, exitpriority=0)
+                if _lock_fd is not None:
+                    # inherited from the parent, which keeps its own lock
+                    os.close(_lock_fd)
+                    _lock_fd = None
+
+            root = _scratch_root()
+            _remove_stale(root)
+            _scratch_dir, _lock_fd = _create_locked(root)
+            _owner_pid = pid
+        return _scratch_dir
+
+
+def scratch_file(suffix: str = "", prefix: str = "tmp") -> str:
+    """ Creates an empty file with a unique name in the scratch directory.
+
+    Arguments:
+    suffix (str) -- file name suffix (e.g., ".c")
+    prefix (str) -- file name prefix
+
+    Returns:
+    path (str) -- path to the file (removed at exit at the latest)
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix, dir=scratch_dir())
+    os.close(fd)
+    return path
+
+
+def scratch_subdir(prefix: str = "tmp") -> str:
+    """ Creates a directory with a unique name in the scratch directory.
+
+    Arguments:
+    prefix (str) -- directory name prefix
+
+    Returns:
+    path (str) -- path to the directory (removed at exit at the latest)
+    """
+    return tempfile.mkdtemp(prefix=prefix, dir=scratch_dir())
+
+
+def cleanup():
+    """Removes the scratch directory of this process (a new one is created on next use)."""
+    global _scratch_dir, _lock_fd
+
+    if _scratch_dir is not None and _owner_pid == os.getpid():
+        shutil.rmtree(_scratch_dir, ignore_errors=True)
+        os.close(_lock_fd)
+        _scratch_dir = None
+        _lock_fd = None
+
+
+def on_terminate(signum, frame):
+    """Signal handler which removes the scratch directory and then terminates as the default handler would.
+
+    Entry points install it for SIGTERM, e.g., signal.signal(signal.SIGTERM, scratch.on_terminate).
+    """
+    cleanup()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
@@ -1,3 +1,4 @@
 from search_models.search_model import SearchModel
 from search_models.size_search_model import SizeSearchModel
 from search_models.random_search_model import RandomSearchModel
+from search_models.cost_search_model import CostSearchModel
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from statistics import mean
+from typing import *
+
+from grammar import Grammar, SOURCE_STMT_NAME, SOURCE_STMT_NONTERM
+from program import Program, ValueNode
+from search_models.search_model import SearchModel
+from stats import Stats
+from trace import Trace, TraceSourceKind
+
+class CostSearchModel(SearchModel):
+    """Model for choosing program order by size, adjusted with feedback from trace pruning.
+
+    Besides size, the score accounts for how much of the traces the program (or its parent) already matched,
+    how many unknowns are left relative to the available statements, and whether its statements follow the
+    order observed in the traces.
+    """
+
+    def __init__(self, depth_weight: float = 6.0, unknown_weight: float = 2.0, order_weight: float = 3.0):
+        self.depth_weight = depth_weight # cost of not matching any of the traces
+        self.unknown_weight = unknown_weight # cost of having as many unknowns as available statements
+        self.order_weight = order_weight # cost of each statement out of trace order
+        self.stmt_positions: Dict[str, float] = {} # average relative position of statement in traces
+        self.num_stmts = 0 # number of available statements in grammar
+
+    def reset(self, traces: List[Trace], grammar: Grammar):
+        """ Prepares the model for a new search (e.g., for a hole) over the given traces and grammar.
+
+        Arguments:
+        traces ([Trace]) -- traces of the search specification
+        grammar (Grammar) -- grammar used for the search
+        """
+        positions = defaultdict(list)
+        for trace in traces:
+            seen = set()
+            for i, source in enumerate(trace.sources):
+                if source.kind == TraceSourceKind.STATEMENT and source.src not in seen:
+                    seen.add(source.src)
+                    positions[source.src].append(i / max(1, len(trace) - 1))
+        self.stmt_positions = {src: mean(ps) for src, ps in positions.items()}
+        self.num_stmts = len(grammar.productions[SOURCE_STMT_NONTERM])
+
+    def _num_out_of_order(self, prog: Program) -> int:
+        """Counts consecutive statements (in program order) which appear in the opposite order in the traces."""
+        count = 0
+        last = None
+        nids = [prog.root.id]
+        while nids:
+            node = prog.nodes[nids.pop()]
+            if isinstance(node, ValueNode) and node.prod is not None and node.prod.fname == SOURCE_STMT_NAME and node.val in self.stmt_positions:
+                pos = self.stmt_positions[node.val]
+                if last is not None and pos < last:
+                    count += 1
+                last = pos
+            nids += reversed(prog.children[node.id])
+        return count
+
+    def priority(self, prog: Program, stats: Stats) -> float:
+        """ Assigns a priority to the given partial program, where low score indicates high priority.
+
+        Arguments:
+        prog (Program) -- program to be assessed
+        stats (Stats) -- object to track statistics
+
+        Returns
+        score (float) -- priority score (lower indicates higher priority)
+        """
+        score = len(prog.nodes)
+        score += self.depth_weight * (1 - prog.trace_depth)
+        score += self.unknown_weight * len(prog.unknowns) / max(1, self.num_stmts)
+        score += self.order_weight * self._num_out_of_order(prog)
+        return score
@@ -1,11 +1,22 @@
 from typing import *
 
+from grammar import Grammar
 from program import Program
 from stats import Stats
+from trace import Trace
 
 class SearchModel():
     """Parent class for search model to guide search."""
 
+    def reset(self, traces: List[Trace], grammar: Grammar):
+        """ Prepares the model for a new search (e.g., for a hole) over the given traces and grammar.
+
+        Arguments:
+        traces ([Trace]) -- traces of the search specification
+        grammar (Grammar) -- grammar used for the search
+        """
+        pass
+
     def priority(self, prog: Program, stats: Stats) -> float:
         """ Assigns a priority to the given partial program, where low score indicates high priority.
 
@@ -1,9 +1,9 @@
 from args import get_cline_args
-from collections import deque
+from collections import Counter, deque
+import math
 import os
-from statistics import mean
 from enum import Enum, auto
-from program import ValueNode
+from program import Program, ValueNode
 
 from formatters import Formatter
 
@@ -13,6 +13,88 @@ class Status(Enum):
     TIMEOUT = auto()
     ERROR = auto()
 
+class TimingSeries():
+    """Streaming aggregate of a series of timings (constant memory regardless of length).
+
+    Keeps count/sum/min/max and an HDR-style histogram: each power of two is split into
+    SUB_BUCKETS linear buckets, so percentiles are accurate to within 1/SUB_BUCKETS relative error.
+    """
+
+    SUB_BUCKETS = 16 # linear buckets per power of two
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = Counter() # bucket index -> number of values
+
+    def _bucket(self, x: float) -> int:
+        if x <= 0:
+            return -(1 << 30)
+        m, e = math.frexp(x) # x = m * 2**e, 0.5 <= m < 1
+        return e * self.SUB_BUCKETS + int((2 * m - 1) * self.SUB_BUCKETS)
+
+    def _bucket_upper(self, b: int) -> float:
+        if b == -(1 << 30):
+            return 0.0
+        e, sub = divmod(b, self.SUB_BUCKETS)
+        return math.ldexp(0.5 * (1 + (sub + 1) / self.SUB_BUCKETS), e)
+
+    def add(self, x: float):
+        """ Records one timing.
+
+        Arguments:
+        x (float) -- timing (in seconds)
+        """
+        self.count += 1
+        self.total += x
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self.buckets[self._bucket(x)] += 1
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def percentile(self, q: float) -> float:
+        """ Returns (an upper bound on) the q-th percentile of recorded timings.
+
+        Arguments:
+        q (float) -- percentile in [0, 100]
+
+        Returns:
+        value (float) -- percentile (nan if no timings recorded)
+        """
+        if self.count == 0:
+            return math.nan
+
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min(self._bucket_upper(b), self.max)
+        return self.max
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __add__(self, other: "TimingSeries") -> "TimingSeries":
+        res = TimingSeries()
+        res.count = self.count + other.count
+        res.total = self.total + other.total
+        res.min = min(self.min, other.min)
+        res.max = max(self.max, other.max)
+        res.buckets = self.buckets + other.buckets
+        return res
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return "NA"
+        return "n={} mean={:.4f} min={:.4f} p50={:.4f} p99={:.4f} max={:.4f}".format(
+            self.count, self.mean(), self.min, self.percentile(50), self.percentile(99), self.max)
+
+
 class Stats():
     """Class for evaluating runtime statistics."""
 
@@ -22,6 +104,8 @@ class Stats():
         self.src_path = src_path
         self.formatter = formatter
 
+        # program samples are stored formatted (and only if --max_cand_record > 0)
+        self.max_cand_record = args.max_cand_record
         self.candidates = deque([], args.max_cand_record) # track last N complete candidates processed
         self.pruned = deque([], args.max_cand_record) # track last N partial candidates pruned
         self.trace_pruned = deque([], args.max_cand_record) # track last N trace pruned candidates
@@ -32,14 +116,14 @@ class Stats():
         self.syntax_pruned = deque([], args.max_cand_record) # track last N candidates pruned using syntactic constraints
         self.not_pruned = deque([], args.max_cand_record) # track last N partial candidates not pruned
 
-        self.pruned_times = [] # track time taken for each time a candidate is pruned
-        self.not_pruned_times = [] # track time taken for each time a candidate is not pruned
-        self.trace_pruned_times = [] # track time taken for each time a candidate is trace pruned
-        self.analysis_pruned_times = [] # Track time for each time candidate prune w/ analysis
-        self.trace_pruned_assert_times = [] # track time taken for each time a candidate is trace pruned b/c of assert failure
-        self.trace_pruned_compile_times = [] # track time taken for each time a candidate is trace pruned b/c of compile error
-        self.trace_pruned_timeout_times = [] # track time taken for each time a candidate is trace pruned b/c of timeout
-        self.gdb_times = [] # track time taken to generate gdb traces
+        self.pruned_times = TimingSeries() # track time taken for each time a candidate is pruned
+        self.not_pruned_times = TimingSeries() # track time taken for each time a candidate is not pruned
+        self.trace_pruned_times = TimingSeries() # track time taken for each time a candidate is trace pruned
+        self.analysis_pruned_times = TimingSeries() # Track time for each time candidate prune w/ analysis
+        self.trace_pruned_assert_times = TimingSeries() # track time taken for each time a candidate is trace pruned b/c of assert failure
+        self.trace_pruned_compile_times = TimingSeries() # track time taken for each time a candidate is trace pruned b/c of compile error
+        self.trace_pruned_timeout_times = TimingSeries() # track time taken for each time a candidate is trace pruned b/c of timeout
+        self.gdb_times = TimingSeries() # track time taken to generate gdb traces
         self.extraction_time = 0 # track time taken to extract gdb traces
 
         self.num_iter = 0 # track total iterations of synthesis loop
@@ -55,6 +139,11 @@ class Stats():
         self.num_analysis_pruned = 0 # track total number of candidates pruned using analysis
         self.num_syntax_pruned = 0 # track total number of candidates pruned using syntactic constraints
         self.num_not_pruned = 0 # track total number of candidates not pruned
+        self.num_aligned_holes = 0 # track total number of holes solved by aligning traces (without enumeration)
+        self.num_worklist_duplicates = 0 # track total number of duplicate candidates dropped when added to worklist
+        self.num_worklist_truncated = 0 # track total number of candidates dropped because worklist was full
+        self.num_equivalent_pruned = 0 # track total number of candidates dropped as equivalent on the traces to an earlier one (bottom-up)
+        self.trace_rejection_counts = Counter() # track number of candidates rejected by each trace (keyed by inputs)
 
         # source code statistics
         self.num_lines = 0 # track total number of lines in source code
@@ -73,9 +162,14 @@ class Stats():
         self.solution = None # record satisfying program (or None if not found)
         self.phantom_solution = None # record satisfying program (or None if not found)
         self.deobfuscation_time = 1 # time to find solution (in seconds)
+        self.io_mismatches = None # indices of inputs solution and obfuscated program disagree on (None if not checked)
+        self.io_check_error = None # why the I/O check could not be completed (None if it was or was not run)
+        self.validation = None # differential validation summary (None if not validated)
+        self.validation_time = 0 # time taken to validate solution (in seconds)
 
-        self.prune_times = []
+        self.prune_times = TimingSeries()
         self.total_pruner_calls = 0
+        self.phase_timings = {} # cumulative time and calls per phase (only if profiling is enabled)
 
         self.status = Status.PENDING
         self.comment = "None"
@@ -89,11 +183,21 @@ class Stats():
         self.num_statements_deobfuscated = sum(1 for _ in self.solution.nodes.values() if isinstance(_, ValueNode) and _.val == "SourceStmt")
 
 
-    def my_mean(self, x):
+    def sample(self, samples: deque, prog: Program):
+        """ Records formatted program in given sample buffer (no-op unless recording is enabled).
+
+        Arguments:
+        samples (deque) -- sample buffer (e.g., self.candidates)
+        prog (Program) -- program to record
+        """
+        if self.max_cand_record > 0:
+            samples.append(self.formatter.format(prog))
+
+    def my_mean(self, x: TimingSeries):
         if len(x) == 0:
             return "NA"
 
-        return "{:.4f}".format(mean(x))
+        return "{:.4f}".format(x.mean())
 
     def gen_report(self):
         res = [["Source", "Result", "Time (sec)", "# Cands", "# Pruned", "Avg Prune Time (sec)", "Total/Avg GDB Time (sec)", "Extraction Time (sec)"], []]
@@ -104,7 +208,7 @@ class Stats():
         res[1].append(self.num_candidates)
         res[1].append(self.num_pruned)
         res[1].append(self.my_mean(self.pruned_times+self.not_pruned_times))
-        res[1].append("{:.2f}/{}".format(sum(self.gdb_times), self.my_mean(self.gdb_times)))
+        res[1].append("{:.2f}/{}".format(self.gdb_times.total, self.my_mean(self.gdb_times)))
         res[1].append("{:.2f}".format(self.extraction_time))
 
         return res
@@ -124,7 +228,7 @@ class Stats():
             "Formatted Result": self.formatter.format(self.solution),
             "Phantom Result": self.phantom_solution,
             "Time (sec)": "{:.2f}".format(self.deobfuscation_time),
-            "Total/Avg GDB Time (sec)": "{:.2f}/{}".format(sum(self.gdb_times), self.my_mean(self.gdb_times)),
+            "Total/Avg GDB Time (sec)": "{:.2f}/{}".format(self.gdb_times.total, self.my_mean(self.gdb_times)),
             "Extraction Time (sec)": "{:.2f}".format(self.extraction_time),
 
             "Num Complete Sketches": self.num_complete_sketches,
@@ -136,7 +240,18 @@ class Stats():
             "Num Candidates": self.num_candidates,
             "Num Pruned": self.num_pruned,
             "Num Trace Pruned": self.num_trace_pruned,
+            "Num Aligned Holes": self.num_aligned_holes,
+            "Num Worklist Duplicates": self.num_worklist_duplicates,
+            "Num Worklist Truncated": self.num_worklist_truncated,
+            "Num Equivalent Pruned": self.num_equivalent_pruned,
+            "Trace Rejection Counts": dict(self.trace_rejection_counts.most_common()),
             "Avg Prune Time (sec)": self.my_mean(self.pruned_times+self.not_pruned_times),
+            "Prune Time Distribution (sec)": (self.pruned_times+self.not_pruned_times).summary(),
+            "IO Mismatches": self.io_mismatches,
+            "IO Check Error": self.io_check_error,
+            "Validation": self.validation,
+            "Validation Time (sec)": "{:.2f}".format(self.validation_time),
+            "Phase Timings": self.phase_timings,
             "Comment": self.comment,
         }
 
@@ -151,7 +266,7 @@ class Stats():
         s.append("Time (seconds): {}".format(self.deobfuscation_time))
 
         s.append("\nPreprocessing Statistics:")
-        s.append("  - Total/Avg GDB time (sec): \t{}".format("{:.2f}/{}".format(sum(self.gdb_times), self.my_mean(self.gdb_times))))
+        s.append("  - Total/Avg GDB time (sec): \t{}".format("{:.2f}/{}".format(self.gdb_times.total, self.my_mean(self.gdb_times))))
         s.append("  - Extraction time (sec): \t{:.2f}".format(self.extraction_time))
         s.append("  - Num Lines: \t\t\t{}".format(self.num_lines))
         s.append("  - Num Lines Deobfuscated: \t{}".format(self.num_lines_deobfuscated))
@@ -177,12 +292,14 @@ class Stats():
         s.append("  - Avg Pruning Times (all/pruned/not pruned): {}/{}/{}".format(self.my_mean(self.pruned_times+self.not_pruned_times),
                                                                               self.my_mean(self.pruned_times),
                                                                               self.my_mean(self.not_pruned_times)))
+        s.append("  - Pruning Time Distribution (sec): {}".format((self.pruned_times+self.not_pruned_times).summary()))
 
         s.append("  - Num Trace Pruning Evaluations: {}".format(self.num_trace_pruning_eval))
         s.append("  - Num Trace Pruning Evaluations Cached: {}".format(self.num_trace_pruning_eval_cached))
         s.append("  - Num Trace Pruned: {}".format(self.num_trace_pruned))
         s.append("  - Num Trace Prune Calls Cached: {}".format(self.num_trace_pruned_cached))
         s.append("  - Avg Trace Pruning Times (pruned not including cached): {}".format(self.my_mean(self.trace_pruned_times)))
+        s.append("  - Trace Rejection Counts (by inputs): {}".format(", ".join("[{}]: {}".format(k, v) for k, v in self.trace_rejection_counts.most_common())))
 
         s.append("  - Num Trace Assert Pruned: {}".format(self.num_trace_pruned_assert))
         s.append("  - Avg Trace Assert Pruning Times (pruned): {}".format(self.my_mean(self.trace_pruned_assert_times)))
@@ -197,4 +314,19 @@ class Stats():
         s.append("  - Avg Analysis Pruning Times (pruned): {}".format(self.my_mean(self.analysis_pruned_times)))
 
         s.append("  - Num Syntax Pruned: {}".format(self.num_syntax_pruned))
+        s.append("  - Num Aligned Holes: {}".format(self.num_aligned_holes))
+        s.append("  - Num Worklist Duplicates: {}".format(self.num_worklist_duplicates))
+        s.append("  - Num Worklist Truncated: {}".format(self.num_worklist_truncated))
+        s.append("  - Num Equivalent Pruned: {}".format(self.num_equivalent_pruned))
+        if self.io_mismatches is not None:
+            s.append("  - IO Mismatches (input indices): {}".format(self.io_mismatches))
+        if self.io_check_error is not None:
+            s.append("  - IO Check Error: {}".format(self.io_check_error))
+        if self.validation is not None:
+            s.append("  - Validation (inputs/skipped/mismatches): {}/{}/{}".format(self.validation["Inputs"], self.validation["Skipped"], self.validation["Mismatches"]))
+
+        if self.phase_timings:
+            s.append("\nPhase Timings (calls/total sec):")
+            for name, t in self.phase_timings.items():
+                s.append("  - {}: {}/{:.4f}".format(name, t["Calls"], t["Total (sec)"]))
         return "\n".join(s)
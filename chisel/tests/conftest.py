@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+CHISEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CHISEL_DIR)
+
+
+@pytest.fixture(autouse=True)
+def cline_args(monkeypatch):
+    """Runs each test from the chisel directory with default command-line arguments."""
+    from args import clear_global_args, get_cline_args
+
+    monkeypatch.chdir(CHISEL_DIR)
+    clear_global_args()
+    yield get_cline_args(["--disable_parallel", "DUMMY.c"])
+    clear_global_args()
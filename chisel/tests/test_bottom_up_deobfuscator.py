@@ -0,0 +1,58 @@
+import time
+from types import MappingProxyType
+
+from config import get_synthesis_config
+from deobfuscators import BottomUpDeobfuscator
+from extractor.decl_extractor import FunctionParameter, FunctionSignature
+from grammar import Nonterminal
+from input_spec import InputSpec
+from langs.c import CAnalysis, CFormatter, CGrammar, CIOEquivalenceChecker, CTracePruner
+from search_models import SizeSearchModel
+from stats import Stats
+from trace import SlimTraceItem, Trace, TraceSource, TraceSourceKind
+
+# j = 7; does not change j (a parameter), so skipping it is equivalent to executing it
+SOURCES = ["j = 7;", "int x = a;", "x = x + 1;", "return x;"]
+DECL_VARS = {"j = 7;": set(), "int x = a;": {("int", "x")}, "x = x + 1;": set(), "return x;": set()}
+USED_VARS = {"j = 7;": {"j"}, "int x = a;": {"a", "x"}, "x = x + 1;": {"x"}, "return x;": {"x"}}
+LEFT_VARS = {"j = 7;": {"j"}, "int x = a;": {"x"}, "x = x + 1;": {"x"}, "return x;": set()}
+
+
+def make_trace(a: int) -> Trace:
+    states = [
+        {"a": str(a), "j": "7"},
+        {"a": str(a), "j": "7"},
+        {"a": str(a), "j": "7", "x": str(a)},
+        {"a": str(a), "j": "7", "x": str(a + 1)},
+        {"a": str(a), "j": "7", "x": str(a + 1)},
+    ]
+    items = [
+        SlimTraceItem(TraceSource(src, TraceSourceKind.STATEMENT), MappingProxyType(states[i]), MappingProxyType(states[i + 1]))
+        for i, src in enumerate(SOURCES)
+    ]
+    return Trace(items, (str(a),))
+
+
+def test_deobfuscate():
+    traces = [make_trace(a) for a in (1, 4)]
+    inputs = [InputSpec.from_vals(*trace.inputs) for trace in traces]
+    formatter = CFormatter()
+    formatter.stmt_decl_vars = DECL_VARS
+    checker = CIOEquivalenceChecker()
+    checker.runner.decl_vars, checker.runner.used_vars, checker.runner.left_vars = DECL_VARS, USED_VARS, LEFT_VARS
+    pruner = CTracePruner()
+    pruner.runner.decl_vars, pruner.runner.used_vars, pruner.runner.left_vars = DECL_VARS, USED_VARS, LEFT_VARS
+    stats = Stats("DUMMY.c", formatter)
+    signature = FunctionSignature("OBF_FUNC", [FunctionParameter("a", "int", "int a")], "int")
+
+    timed_out, results = BottomUpDeobfuscator(CGrammar()).deobfuscate(
+        "DUMMY.c", SizeSearchModel(), checker, pruner, lambda p: p.leftmost_unknown(), CAnalysis(), formatter,
+        Nonterminal("P"), traces, inputs, DECL_VARS, USED_VARS, signature, time.time(), stats,
+        get_synthesis_config(), None)
+
+    assert not timed_out
+    assert [str(prog) for prog in results.values()] == [
+        "Seq(Stmt(SourceStmt(int x = a;)), Seq(Stmt(SourceStmt(x = x + 1;)), Single(Stmt(SourceStmt(return x;)))))"]
+    # j = 7; int x = a; has the same effect on the traces as int x = a;
+    assert stats.num_equivalent_pruned > 0
+    assert stats.num_worklist_duplicates == 0
@@ -0,0 +1,26 @@
+from extractor.decl_extractor import FunctionParameter, FunctionSignature
+from input_spec import InputSpec
+from langs.c.c_exec_server import ExecServer, ExecStatus, check_io
+
+SQRT_SRC = "double sqrt(double);\nint f(int a) { return (int)sqrt((double)a); }\n"
+MISSING_SRC = "int missing(int);\nint f(int a) { return missing(a); }\n"
+SIGNATURE = FunctionSignature("f", [FunctionParameter("a", "int", "int a")], "int")
+
+
+def test_run_reports_load_errors(tmp_path):
+    with ExecServer(cache_dir=tmp_path) as server:
+        so_path = server.compile("int missing(void);\nint main() { return missing(); }\n")
+        res = server.run(so_path, [])
+        assert res.status == ExecStatus.LOAD_ERROR
+        assert "missing" in res.stdout
+
+        # the server keeps working afterwards
+        so_path = server.compile("int main(int argc, char **argv) { return argc; }\n")
+        assert server.run(so_path, ["x"]).ret == 2
+
+
+def test_check_io_with_libm_and_load_errors(tmp_path):
+    inputs = [InputSpec.from_vals("16"), InputSpec.from_vals("17")]
+    with ExecServer(cache_dir=tmp_path) as server:
+        assert check_io(server, SQRT_SRC, "f", SQRT_SRC, "f", SIGNATURE, inputs) == []
+        assert check_io(server, SQRT_SRC, "f", MISSING_SRC, "f", SIGNATURE, inputs) is None
@@ -0,0 +1,30 @@
+from extractor.decl_extractor import FunctionParameter, FunctionSignature
+from input_spec import InputSpec
+from langs.c.c_exec_server import ExecServer
+from langs.c.c_io_validator import CIOValidator
+
+SRC = "int f(int a) { return a * 2; }\n"
+MISSING_SRC = "int missing(int);\nint f(int a) { return missing(a); }\n"
+SIGNATURE = FunctionSignature("f", [FunctionParameter("a", "int", "int a")], "int")
+INPUTS = [InputSpec.from_vals("1"), InputSpec.from_vals("5")]
+
+
+def test_validate(tmp_path):
+    res = CIOValidator(num_inputs=20, workers=2, cache_dir=tmp_path).validate(SRC, "f", SRC, "f", SIGNATURE, INPUTS)
+    assert res.error is None
+    assert len(INPUTS) <= res.num_inputs <= 20 and res.num_skipped == 0 and res.num_mismatches == 0
+
+
+def test_validate_reports_load_errors(tmp_path):
+    res = CIOValidator(num_inputs=4, workers=2, cache_dir=tmp_path).validate(SRC, "f", MISSING_SRC, "f", SIGNATURE, INPUTS)
+    assert res.error is not None and "deobfuscated program does not load" in res.error
+    assert "missing" in res.error
+
+
+def test_validate_reports_worker_errors(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("harness unavailable")
+
+    monkeypatch.setattr(ExecServer, "run", fail)
+    res = CIOValidator(num_inputs=4, workers=2, cache_dir=tmp_path).validate(SRC, "f", SRC, "f", SIGNATURE, INPUTS)
+    assert res.error is not None and "harness unavailable" in res.error
@@ -0,0 +1,132 @@
+import time
+from types import MappingProxyType
+
+from config import get_synthesis_config
+from deobfuscators import DecompositionalDeobfuscator
+from extractor.decl_extractor import FunctionParameter, FunctionSignature
+from grammar import SOURCE_STMT_NAME, SOURCE_STMT_NONTERM, Nonterminal, Production
+from input_spec import InputSpec
+from langs.c import CAnalysis, CFormatter, CGrammar, CIOEquivalenceChecker, CTracePruner
+from program import Program
+from search_models import SizeSearchModel
+from stats import Stats
+from trace import SlimTraceItem, Trace, TraceSource, TraceSourceKind
+
+SOURCES = ["int x = a;", "x = x + 1;", "int y = a * 2;", "return x + y;"]
+DEAD_CODE_SOURCES = ["int j = 7;", "int x = a;", "return x;"]
+DECL_VARS = {"int x = a;": {("int", "x")}, "x = x + 1;": set(), "int y = a * 2;": {("int", "y")}, "return x + y;": set(),
+             "int j = 7;": {("int", "j")}, "return x;": set()}
+USED_VARS = {"int x = a;": {"a", "x"}, "x = x + 1;": {"x"}, "int y = a * 2;": {"a", "y"}, "return x + y;": {"x", "y"},
+             "int j = 7;": {"j"}, "return x;": {"x"}}
+LEFT_VARS = {"int x = a;": {"x"}, "x = x + 1;": {"x"}, "int y = a * 2;": {"y"}, "return x + y;": set(),
+             "int j = 7;": {"j"}, "return x;": set()}
+
+
+def build_trace(sources: list[str], states: list[dict[str, str]], inputs: tuple[str, ...]) -> Trace:
+    items = [
+        SlimTraceItem(TraceSource(src, TraceSourceKind.STATEMENT), MappingProxyType(states[i]), MappingProxyType(states[i + 1]))
+        for i, src in enumerate(sources)
+    ]
+    return Trace(items, inputs)
+
+
+def make_trace(a: int) -> Trace:
+    return build_trace(SOURCES, [
+        {"a": str(a)},
+        {"a": str(a), "x": str(a)},
+        {"a": str(a), "x": str(a + 1)},
+        {"a": str(a), "x": str(a + 1), "y": str(2 * a)},
+        {"a": str(a), "x": str(a + 1), "y": str(2 * a)},
+    ], (str(a),))
+
+
+def make_dead_code_trace(a: int) -> Trace:
+    # j is never used, so variable pruning should drop its declaration
+    return build_trace(DEAD_CODE_SOURCES, [
+        {"a": str(a)},
+        {"a": str(a), "j": "7"},
+        {"a": str(a), "j": "7", "x": str(a)},
+        {"a": str(a), "j": "7", "x": str(a)},
+    ], (str(a),))
+
+
+def make_pruner() -> CTracePruner:
+    pruner = CTracePruner()
+    pruner.runner.decl_vars, pruner.runner.used_vars, pruner.runner.left_vars = DECL_VARS, USED_VARS, LEFT_VARS
+    pruner.formatter.stmt_decl_vars = DECL_VARS
+    return pruner
+
+
+def test_trace_order_with_input_specs():
+    pruner = make_pruner()
+    traces = [make_trace(a) for a in (1, 2, 5)]
+    inputs = [InputSpec.from_vals(str(a)) for a in (1, 2)]
+
+    # traces without inputs (e.g., subtraces of loop bodies) are not checked
+    order = pruner.trace_order(traces, inputs)
+    assert sorted(order) == [0, 1]
+
+    first, second = order
+    stats = Stats("DUMMY.c", CFormatter())
+    pruner.record_rejection(order, 1, inputs[second], stats)
+    assert order == [second, first]
+    assert stats.trace_rejection_counts == {", ".join(inputs[second].args): 1}
+
+    # a new hole starts with the trace which rejected the most candidates
+    assert pruner.trace_order(traces[:2], inputs)[0] == second
+
+
+def deobfuscate(traces: list[Trace], pruner: CTracePruner) -> tuple[bool, list, Stats]:
+    inputs = [InputSpec.from_vals(*trace.inputs) for trace in traces]
+    formatter = CFormatter()
+    formatter.stmt_decl_vars = DECL_VARS
+    checker = CIOEquivalenceChecker()
+    checker.runner.decl_vars, checker.runner.used_vars, checker.runner.left_vars = DECL_VARS, USED_VARS, LEFT_VARS
+    checker.formatter.stmt_decl_vars = DECL_VARS
+    stats = Stats("DUMMY.c", formatter)
+    signature = FunctionSignature("OBF_FUNC", [FunctionParameter("a", "int", "int a")], "int")
+
+    timed_out, results = DecompositionalDeobfuscator(CGrammar()).deobfuscate(
+        "DUMMY.c", SizeSearchModel(), checker, pruner, lambda p: p.leftmost_unknown(), CAnalysis(), formatter,
+        Nonterminal("P"), traces, inputs, DECL_VARS, USED_VARS, signature, time.time(), stats,
+        get_synthesis_config(), None)
+    return timed_out, results, stats
+
+
+def test_deobfuscate_with_input_specs():
+    pruner = make_pruner()
+    timed_out, results, stats = deobfuscate([make_trace(a) for a in (1, 2, 5)], pruner)
+
+    assert not timed_out
+    assert results
+    # rejections are keyed by the arguments of the InputSpecs
+    assert stats.trace_rejection_counts
+    assert set(stats.trace_rejection_counts) <= {"1", "2", "5"}
+    assert sum(pruner.rejections.values()) == sum(stats.trace_rejection_counts.values())
+
+
+def test_deobfuscate_removes_dead_code():
+    timed_out, results, _ = deobfuscate([make_dead_code_trace(a) for a in (1, 3)], make_pruner())
+
+    assert not timed_out
+    assert [str(prog) for prog in results.values()] == ["Seq(Stmt(SourceStmt(int x = a;)), Single(Stmt(SourceStmt(return x;))))"]
+
+
+def test_trace_consistent_prods_match_later_trace_items():
+    traces = [make_trace(a) for a in (1, 2)]
+    inputs = [InputSpec.from_vals(*trace.inputs) for trace in traces]
+    pruner = make_pruner()
+    grammar = CGrammar()
+    stmt_prods = [Production(SOURCE_STMT_NONTERM, SOURCE_STMT_NAME, [src]) for src in SOURCES]
+
+    # int x = a; followed by a statement unknown
+    prog = Program(Nonterminal("P"))
+    for prod in [grammar.get_prod("Seq"), grammar.get_prod("Stmt"), stmt_prods[0], grammar.get_prod("Single"), grammar.get_prod("Stmt")]:
+        prog.expand(prog.leftmost_unknown().id, prod)
+    unk = prog.leftmost_unknown()
+    assert unk.nonterm == SOURCE_STMT_NONTERM
+
+    assert not pruner.prune(prog, "DUMMY.c", traces, inputs, Stats("DUMMY.c", CFormatter()))
+    prods = DecompositionalDeobfuscator._trace_consistent_prods(prog, unk, stmt_prods, traces, pruner)
+    # any later statement can match (unmatched trace items are skipped), but not an earlier one
+    assert prods == stmt_prods[1:]
@@ -0,0 +1,67 @@
+from types import MappingProxyType
+
+from deobfuscators import DecompositionalDeobfuscator
+from grammar import Nonterminal
+from langs.c import CGrammar
+from langs.c.c_runner import CRunner
+from trace import SlimTraceItem, Trace, TraceSource, TraceSourceKind
+
+INC_X, INC_Y = "x = x + 1;", "y = y + 1;"
+
+
+def build_trace(sources: list[str], states: list[dict[str, str]]) -> Trace:
+    items = [
+        SlimTraceItem(TraceSource(src, TraceSourceKind.STATEMENT), MappingProxyType(states[i]), MappingProxyType(states[i + 1]))
+        for i, src in enumerate(sources)
+    ]
+    return Trace(items, ())
+
+
+def make_runner() -> CRunner:
+    runner = CRunner()
+    runner.decl_vars = {INC_X: set(), INC_Y: set()}
+    runner.used_vars = {INC_X: {"x"}, INC_Y: {"y"}}
+    runner.left_vars = {INC_X: {"x"}, INC_Y: {"y"}}
+    return runner
+
+
+def test_lcs():
+    lcs = DecompositionalDeobfuscator._lcs
+    assert lcs(["a", "b", "c", "d"], ["b", "d"]) == ["b", "d"]
+    assert lcs(["a", "b", "c"], ["a", "x", "c", "y"]) == ["a", "c"]
+    assert lcs(["a", "b"], ["c", "d"]) == []
+    assert lcs([], ["a"]) == []
+
+
+def test_align_straight_line():
+    deobfuscator = DecompositionalDeobfuscator(CGrammar())
+    start = deobfuscator.grammar.start
+    traces = [
+        build_trace([INC_X, INC_Y], [{"x": "0", "y": "0"}, {"x": "1", "y": "0"}, {"x": "1", "y": "1"}]),
+        build_trace([INC_Y], [{"x": "0", "y": "0"}, {"x": "0", "y": "1"}]),
+    ]
+
+    prog = deobfuscator._align_straight_line(start, traces, None)
+    assert str(prog) == "Single(Stmt(SourceStmt({})))".format(INC_Y)
+
+    # only statement sequences (the start nonterminal) are aligned
+    assert deobfuscator._align_straight_line(Nonterminal("SourceGuard"), traces, None) is None
+    assert deobfuscator._align_straight_line(start, [], None) is None
+    # nothing in common
+    disjoint = [traces[1], build_trace([INC_X], [{"x": "0", "y": "0"}, {"x": "1", "y": "0"}])]
+    assert deobfuscator._align_straight_line(start, disjoint, None) is None
+
+
+def test_aligned_program_must_match_every_trace():
+    deobfuscator = DecompositionalDeobfuscator(CGrammar())
+    runner = make_runner()
+    # e.g., repeated loop body subtraces, of which only the first has an input
+    traces = [
+        build_trace([INC_X], [{"x": "0", "y": "0"}, {"x": "1", "y": "0"}]),
+        build_trace([INC_X, INC_Y], [{"x": "0", "y": "0"}, {"x": "1", "y": "0"}, {"x": "1", "y": "1"}]),
+    ]
+
+    prog = deobfuscator._align_straight_line(deobfuscator.grammar.start, traces, None)
+    assert str(prog) == "Single(Stmt(SourceStmt({})))".format(INC_X)
+    assert deobfuscator._satisfied_traces_pruned_vars(prog, traces[:1], runner) is not None
+    assert deobfuscator._satisfied_traces_pruned_vars(prog, traces, runner) is None
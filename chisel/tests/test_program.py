@@ -0,0 +1,46 @@
+import gc
+import weakref
+
+from langs.c import CGrammar
+from program import Program
+
+
+def expand_leftmost(prog: Program, grammar: CGrammar, prod_idx: int) -> Program:
+    prog = prog.copy()
+    unk = prog.leftmost_unknown()
+    prog.expand(unk.id, grammar.productions[unk.nonterm][prod_idx])
+    return prog
+
+
+def test_key_is_structural():
+    grammar = CGrammar()
+    start = Program(grammar.start)
+    p1, p2, p3 = (expand_leftmost(start, grammar, i) for i in (0, 0, 1))
+
+    assert str(p1) == str(p2) and p1.key() == p2.key() and hash(p1.key()) == hash(p2.key())
+    assert str(p1) != str(p3) and p1.key() != p3.key()
+    assert len({p1.key(), p2.key(), p3.key()}) == 2
+
+
+def test_key_compares_structure_on_hash_collision():
+    grammar = CGrammar()
+    start = Program(grammar.start)
+    p1, p2 = (expand_leftmost(start, grammar, i) for i in (0, 1))
+
+    # forge a collision of the root hashes
+    p2._own("_hashes")
+    p2._hashes[p2.root.id] = p1.structural_hash()
+    assert hash(p1.key()) == hash(p2.key())
+    assert p1.key() != p2.key()
+
+
+def test_key_does_not_keep_program_alive():
+    prog = Program(CGrammar().start)
+    ref = weakref.ref(prog)
+    cache = {prog.key(): True}
+
+    del prog
+    gc.collect()
+    assert ref() is None
+    assert len(cache) == 1
+    assert Program(CGrammar().start).key() in cache
@@ -0,0 +1,45 @@
+import fcntl
+import os
+
+import scratch
+
+
+def make_dir(root, name: str, locked: bool):
+    path = root / name
+    path.mkdir()
+    fd = os.open(path / scratch.LOCK_NAME, os.O_RDONLY | os.O_CREAT, 0o600)
+    if locked:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    return path, fd
+
+
+def test_remove_stale(tmp_path):
+    live, live_fd = make_dir(tmp_path, "1-live", locked=True)
+    dead, dead_fd = make_dir(tmp_path, "2-dead", locked=False)
+    # being created by another process, which has not taken the lock yet
+    pending, pending_fd = make_dir(tmp_path, scratch.PENDING_PREFIX + "new", locked=False)
+    other = tmp_path / "unrelated"
+    other.mkdir()
+
+    scratch._remove_stale(str(tmp_path))
+    assert live.exists() and pending.exists() and other.exists()
+    assert not dead.exists()
+
+    # pending directories of killed processes are removed eventually
+    os.utime(pending, (0, 0))
+    scratch._remove_stale(str(tmp_path))
+    assert not pending.exists()
+    for fd in (live_fd, dead_fd, pending_fd):
+        os.close(fd)
+
+
+def test_create_locked(tmp_path):
+    path, fd = scratch._create_locked(str(tmp_path))
+    assert os.path.basename(path).startswith("{}-".format(os.getpid()))
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+    scratch._remove_stale(str(tmp_path))
+    assert os.path.isdir(path)
+    os.close(fd)
+    scratch._remove_stale(str(tmp_path))
+    assert not os.path.exists(path)
@@ -7,10 +7,10 @@ from typing import *
 from warnings import warn
 from types import MappingProxyType
 
-import yaml
 
-from paths import TMP_PATH
+from scratch import scratch_dir
 from utils import statement_contains_control_flow
+from profiling import profiled
 
 cpp_headers = """#include <iostream>
 #include <map>
@@ -309,6 +309,7 @@ class Trace:
         self.trace_id = Trace.trace_id  # Unique id for this trace
         Trace.trace_id += 1
 
+    @profiled("minimized_copy")
     def minimized_copy(
         self,
         min_vars: set[str],
@@ -487,14 +488,10 @@ class Trace:
         c_lib_str = c_lib_str.replace("$LCURLY$", "{")
         c_lib_str = c_lib_str.replace("$RCURLY$", "}")
 
-        if not os.path.exists(TMP_PATH):
-            # Make tmp directory if not already made
-            os.makedirs(TMP_PATH)
-
         # Build paths
-        self.header_path = os.path.join(TMP_PATH, "libtrace_{}.h".format(self.trace_id))
-        self.c_path = os.path.join(TMP_PATH, "libtrace_{}.c".format(self.trace_id))
-        self.c_o_path = os.path.join(TMP_PATH, "libtrace_{}.o".format(self.trace_id))
+        self.header_path = os.path.join(scratch_dir(), "libtrace_{}.h".format(self.trace_id))
+        self.c_path = os.path.join(scratch_dir(), "libtrace_{}.c".format(self.trace_id))
+        self.c_o_path = os.path.join(scratch_dir(), "libtrace_{}.o".format(self.trace_id))
 
         # Write header/cpp to file
         with open(self.header_path, "w") as f:
@@ -555,14 +552,10 @@ class Trace:
             tid=self.trace_id,
         )
 
-        if not os.path.exists(TMP_PATH):
-            # Make tmp directory if not already made
-            os.makedirs(TMP_PATH)
-
         # Build paths
-        self.header_path = os.path.join(TMP_PATH, "libtrace_{}.h".format(self.trace_id))
-        self.cpp_path = os.path.join(TMP_PATH, "libtrace_{}.cpp".format(self.trace_id))
-        self.cpp_o_path = os.path.join(TMP_PATH, "libtrace_{}.o".format(self.trace_id))
+        self.header_path = os.path.join(scratch_dir(), "libtrace_{}.h".format(self.trace_id))
+        self.cpp_path = os.path.join(scratch_dir(), "libtrace_{}.cpp".format(self.trace_id))
+        self.cpp_o_path = os.path.join(scratch_dir(), "libtrace_{}.o".format(self.trace_id))
 
         # Write header/cpp to file
         with open(self.header_path, "w") as f:
@@ -596,4 +589,6 @@ class Trace:
         results["srcs"] = list(map(str, self.items))
         results["trace"] = [format_state(s.post_state) for s in self.items]
 
+        import yaml # imported on use (slow to import)
+
         return yaml.safe_dump(results)
@@ -5,8 +5,6 @@ from typing import *
 from dataclasses import dataclass
 from itertools import repeat, combinations, chain, combinations
 
-import dill
-
 
 class SynthesisTimeoutException(BaseException):
     def __init__(self, message: str = "Synthesis timed out"):
@@ -68,6 +66,8 @@ def save_to_bin(obj: Any, out_path: str):
         # Delete existing binary file if it exists
         os.remove(out_path)
 
+    import dill # imported on use (slow to import)
+
     dill.dump(obj, open(out_path, "wb"))
 
 
@@ -83,6 +83,8 @@ def load_from_bin(src_path: str) -> Any:
             "Cannot load binary from {} -- path does not exist!".format(src_path)
         )
 
+    import dill # imported on use (slow to import)
+
     return dill.load(open(src_path, "rb"))
 
 